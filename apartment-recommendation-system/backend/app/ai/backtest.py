@@ -0,0 +1,341 @@
+"""
+Walk-forward backtest of MarketPredictor price predictions over PriceHistory
+
+History is streamed in recorded_at order and applied to per-unit state
+arrays. At every as-of date the predictor sees only observations up to
+that date; each prediction is scored once the stream has moved past its
+horizon, so there is no lookahead and memory stays bounded by the number
+of units and open predictions rather than the length of history.
+"""
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+from datetime import datetime, date, timedelta, timezone
+import heapq
+import itertools
+import logging
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.market_predictor import MarketPredictor, PRICE_HORIZONS, PRICE_DROP_THRESHOLD
+from app.models.property import Property, Unit, PriceHistory
+from app.models.market import MarketVelocity
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip while streaming price history
+HISTORY_CHUNK_SIZE = 10000
+
+# Bins of predicted price_drop_probability for the calibration table
+CALIBRATION_BINS = 10
+
+SECONDS_PER_DAY = 86400.0
+
+
+def _to_days(value: Any) -> float:
+    """Date or datetime as fractional days since the epoch"""
+    if value is None:
+        return np.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp() / SECONDS_PER_DAY
+    return datetime.combine(value, datetime.min.time(), tzinfo=timezone.utc).timestamp() / SECONDS_PER_DAY
+
+
+def _from_days(days: float) -> datetime:
+    return datetime.fromtimestamp(days * SECONDS_PER_DAY, tz=timezone.utc)
+
+
+@dataclass
+class _OpenPredictions:
+    """Predictions from one as-of date waiting for their horizon to pass"""
+    target: float
+    horizon_index: int
+    units: np.ndarray
+    base_price: np.ndarray
+    predicted_price: np.ndarray
+    drop_probability: np.ndarray
+
+
+@dataclass
+class BacktestReport:
+    """Accuracy and throughput of one backtest run"""
+    model_version: str
+    as_of_dates: int = 0
+    predictions: int = 0
+    history_rows: int = 0
+    prediction_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    peak_traced_mb: Optional[float] = None
+    abs_error_sum: Dict[int, float] = field(default_factory=lambda: {h: 0.0 for h in PRICE_HORIZONS})
+    abs_pct_error_sum: Dict[int, float] = field(default_factory=lambda: {h: 0.0 for h in PRICE_HORIZONS})
+    evaluated: Dict[int, int] = field(default_factory=lambda: {h: 0 for h in PRICE_HORIZONS})
+    calibration_count: np.ndarray = field(default_factory=lambda: np.zeros(CALIBRATION_BINS))
+    calibration_predicted: np.ndarray = field(default_factory=lambda: np.zeros(CALIBRATION_BINS))
+    calibration_observed: np.ndarray = field(default_factory=lambda: np.zeros(CALIBRATION_BINS))
+    brier_sum: float = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary metrics"""
+        drop_samples = int(self.calibration_count.sum())
+        return {
+            'model_version': self.model_version,
+            'as_of_dates': self.as_of_dates,
+            'predictions': self.predictions,
+            'history_rows': self.history_rows,
+            'accuracy': {
+                f'{horizon}d': {
+                    'samples': self.evaluated[horizon],
+                    'mae': round(self.abs_error_sum[horizon] / self.evaluated[horizon], 2) if self.evaluated[horizon] else None,
+                    'mape': round(self.abs_pct_error_sum[horizon] / self.evaluated[horizon] * 100, 3) if self.evaluated[horizon] else None
+                }
+                for horizon in PRICE_HORIZONS
+            },
+            'price_drop_calibration': {
+                'samples': drop_samples,
+                'brier_score': round(self.brier_sum / drop_samples, 4) if drop_samples else None,
+                'bins': [
+                    {
+                        'range': [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS],
+                        'count': int(self.calibration_count[i]),
+                        'mean_predicted': round(self.calibration_predicted[i] / self.calibration_count[i], 4),
+                        'observed_rate': round(self.calibration_observed[i] / self.calibration_count[i], 4)
+                    }
+                    for i in range(CALIBRATION_BINS) if self.calibration_count[i]
+                ]
+            },
+            'throughput': {
+                'predictions_per_second': round(self.predictions / self.prediction_seconds, 1) if self.prediction_seconds else None,
+                'prediction_seconds': round(self.prediction_seconds, 3),
+                'wall_seconds': round(self.wall_seconds, 3),
+                'peak_rss_mb': round(self.peak_rss_mb, 1),
+                'peak_traced_mb': round(self.peak_traced_mb, 1) if self.peak_traced_mb is not None else None
+            }
+        }
+
+
+class MarketBacktest:
+    """
+    Replays price history through a MarketPredictor
+    
+    Unit attributes (bedrooms, city, listing dates) are loaded up front;
+    prices and concessions arrive only through the history stream.
+    """
+    
+    def __init__(self,
+                 predictor: Optional[MarketPredictor] = None,
+                 step_days: int = 7,
+                 chunk_size: int = HISTORY_CHUNK_SIZE):
+        self.predictor = predictor or MarketPredictor()
+        self.step_days = step_days
+        self.chunk_size = chunk_size
+    
+    async def run(self,
+                  db: AsyncSession,
+                  start: Optional[date] = None,
+                  end: Optional[date] = None,
+                  trace_memory: bool = False) -> BacktestReport:
+        """
+        Run the backtest
+        
+        Args:
+            db: Database session
+            start: First as-of date, defaults to the first history row
+            end: Last date of history to replay, defaults to all of it
+            trace_memory: Also record peak Python allocations (slower)
+        
+        Returns:
+            Accuracy and throughput report
+        """
+        report = BacktestReport(model_version=self.predictor.model_version)
+        wall_start = time.perf_counter()
+        if trace_memory:
+            tracemalloc.start()
+        
+        try:
+            await self._load_units(db)
+            await self._replay(db, report, start, end)
+        finally:
+            if trace_memory:
+                report.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+        
+        report.wall_seconds = time.perf_counter() - wall_start
+        report.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return report
+    
+    async def _load_units(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(
+                Unit.id,
+                Unit.bedrooms,
+                Unit.bathrooms,
+                Unit.square_feet,
+                Unit.first_seen_date,
+                Unit.last_seen_date,
+                Unit.is_available,
+                Property.city,
+                MarketVelocity.first_seen_date.label('velocity_first_seen'),
+                MarketVelocity.last_seen_date.label('velocity_last_seen')
+            )
+            .join(Property, Unit.property_id == Property.id)
+            .outerjoin(MarketVelocity, MarketVelocity.unit_id == Unit.id)
+        )
+        rows = {row.id: row for row in result.all()}
+        
+        self.unit_index = {unit_id: i for i, unit_id in enumerate(rows)}
+        n_units = len(rows)
+        cities = {}
+        self.bedrooms = np.empty(n_units)
+        self.bathrooms = np.empty(n_units)
+        self.square_feet = np.empty(n_units)
+        self.first_seen = np.full(n_units, np.nan)
+        self.listed_until = np.full(n_units, np.inf)
+        self.group = np.empty(n_units, dtype=np.int64)
+        
+        for i, row in enumerate(rows.values()):
+            self.bedrooms[i] = row.bedrooms
+            self.bathrooms[i] = float(row.bathrooms or 1)
+            self.square_feet[i] = row.square_feet or 800
+            self.first_seen[i] = _to_days(row.first_seen_date or row.velocity_first_seen)
+            last_seen = row.last_seen_date or row.velocity_last_seen
+            if not row.is_available and last_seen is not None:
+                # Leased: off the market after its last sighting
+                self.listed_until[i] = _to_days(last_seen) + 1
+            # Comparable-market group: (city, bedrooms)
+            self.group[i] = cities.setdefault((row.city, row.bedrooms), len(cities))
+        
+        self.n_groups = max(len(cities), 1)
+        self.last_price = np.full(n_units, np.nan)
+        self.has_concessions = np.zeros(n_units)
+    
+    async def _replay(self,
+                      db: AsyncSession,
+                      report: BacktestReport,
+                      start: Optional[date],
+                      end: Optional[date]) -> None:
+        query = select(
+            PriceHistory.unit_id,
+            PriceHistory.price,
+            PriceHistory.concessions,
+            PriceHistory.recorded_at
+        ).order_by(PriceHistory.recorded_at)
+        if end is not None:
+            query = query.where(PriceHistory.recorded_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        
+        # Min-heap of (target, sequence, batch): horizons interleave, so scoring follows target date
+        open_predictions: List[Any] = []
+        sequence = itertools.count()
+        next_as_of = _to_days(start) if start is not None else None
+        now = None
+        
+        stream = await db.stream(query.execution_options(yield_per=self.chunk_size))
+        async for chunk in stream.partitions(self.chunk_size):
+            for unit_id, price, concessions, recorded_at in chunk:
+                unit = self.unit_index.get(unit_id)
+                if unit is None:
+                    continue
+                
+                now = _to_days(recorded_at)
+                if next_as_of is None:
+                    next_as_of = np.floor(now) + 1
+                
+                # Events before this observation see only earlier rows
+                while True:
+                    target = open_predictions[0][0] if open_predictions else np.inf
+                    if min(next_as_of, target) >= now:
+                        break
+                    if target <= next_as_of:
+                        self._score(heapq.heappop(open_predictions)[2], report)
+                    else:
+                        for batch in self._predict_as_of(next_as_of, report):
+                            heapq.heappush(open_predictions, (batch.target, next(sequence), batch))
+                        next_as_of += self.step_days
+                
+                self.last_price[unit] = float(price)
+                self.has_concessions[unit] = 1.0 if concessions else 0.0
+                if np.isnan(self.first_seen[unit]):
+                    self.first_seen[unit] = now
+                report.history_rows += 1
+        
+        # Score whatever matured before the end of the replayed history
+        while open_predictions and now is not None and open_predictions[0][0] <= now:
+            self._score(heapq.heappop(open_predictions)[2], report)
+    
+    def _predict_as_of(self, as_of: float, report: BacktestReport) -> List[_OpenPredictions]:
+        """Predict every listed unit at as_of and queue the predictions"""
+        active = (
+            ~np.isnan(self.last_price)
+            & (self.first_seen <= as_of)
+            & (self.listed_until > as_of)
+        )
+        units = np.flatnonzero(active)
+        if len(units) == 0:
+            return []
+        
+        price = self.last_price[units]
+        days_on_market = np.floor(as_of - self.first_seen[units])
+        group = self.group[units]
+        group_count = np.bincount(group, minlength=self.n_groups)
+        market_rent = np.bincount(group, weights=price, minlength=self.n_groups) / np.maximum(group_count, 1)
+        market_dom = np.bincount(group, weights=days_on_market, minlength=self.n_groups) / np.maximum(group_count, 1)
+        
+        features = self.predictor.build_feature_matrix({
+            'current_price': price,
+            'bedrooms': self.bedrooms[units],
+            'bathrooms': self.bathrooms[units],
+            'square_feet': self.square_feet[units],
+            'days_on_market': days_on_market,
+            'market_avg_rent': market_rent[group],
+            'market_avg_days_on_market': market_dom[group],
+            'has_concessions': self.has_concessions[units]
+        })
+        
+        started = time.perf_counter()
+        predictions = self.predictor.predict_price_change_batch(features)
+        report.prediction_seconds += time.perf_counter() - started
+        report.predictions += len(units)
+        report.as_of_dates += 1
+        
+        return [
+            _OpenPredictions(
+                target=as_of + horizon,
+                horizon_index=i,
+                units=units,
+                base_price=price,
+                predicted_price=predictions[f'predicted_price_{horizon}d'],
+                drop_probability=predictions['price_drop_probability']
+            )
+            for i, horizon in enumerate(PRICE_HORIZONS)
+        ]
+    
+    def _score(self, batch: _OpenPredictions, report: BacktestReport) -> None:
+        """Compare matured predictions with the price in effect at their horizon"""
+        still_listed = self.listed_until[batch.units] > batch.target
+        actual = self.last_price[batch.units][still_listed]
+        predicted = batch.predicted_price[still_listed]
+        base = batch.base_price[still_listed]
+        if len(actual) == 0:
+            return
+        
+        horizon = PRICE_HORIZONS[batch.horizon_index]
+        errors = np.abs(predicted - actual)
+        report.abs_error_sum[horizon] += float(errors.sum())
+        report.abs_pct_error_sum[horizon] += float((errors / np.where(actual > 0, actual, 1)).sum())
+        report.evaluated[horizon] += len(actual)
+        
+        # price_drop_probability refers to the longest horizon
+        if batch.horizon_index == len(PRICE_HORIZONS) - 1:
+            probability = batch.drop_probability[still_listed]
+            dropped = (actual / np.where(base > 0, base, 1) - 1 < PRICE_DROP_THRESHOLD).astype(float)
+            bins = np.minimum((probability * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+            report.calibration_count += np.bincount(bins, minlength=CALIBRATION_BINS)
+            report.calibration_predicted += np.bincount(bins, weights=probability, minlength=CALIBRATION_BINS)
+            report.calibration_observed += np.bincount(bins, weights=dropped, minlength=CALIBRATION_BINS)
+            report.brier_sum += float(((probability - dropped) ** 2).sum())
@@ -5,10 +5,223 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+import hashlib
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
+# Number of features produced by extract_interaction_features
+INTERACTION_FEATURE_COUNT = 10
+
+# Time constant of the decayed "recent activity" counter; a steady stream of
+# events decays to the same count as a hard 7-day window
+RECENCY_WINDOW_DAYS = 7.0
+
+
+class HyperLogLog:
+    """
+    Fixed-size distinct-count sketch (HyperLogLog with linear counting
+    for small cardinalities)
+    """
+    
+    def __init__(self, precision: int = 8, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+        
+        # Bias correction constant for m >= 128
+        self._alpha = 0.7213 / (1 + 1.079 / self.size)
+    
+    def add(self, value: Any) -> None:
+        """Add a value to the sketch"""
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def count(self) -> float:
+        """Estimate the number of distinct values added"""
+        harmonic_sum = sum(2.0 ** -register for register in self.registers)
+        estimate = self._alpha * self.size * self.size / harmonic_sum
+        
+        # Linear counting is far more accurate at small cardinalities
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        
+        return estimate
+    
+    def merge(self, other: "HyperLogLog") -> None:
+        """Merge another sketch with the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        
+        for i, register in enumerate(other.registers):
+            if register > self.registers[i]:
+                self.registers[i] = register
+
+
+@dataclass
+class UserInteractionAggregate:
+    """
+    Rolling per-user interaction aggregate
+    
+    Every event is folded in with O(1) work, so the interaction feature
+    vector costs the same for a user with five views as for one with
+    fifty thousand.
+    """
+    total_views: int = 0
+    favorites: int = 0
+    
+    # Running moments for price and bedrooms
+    price_count: int = 0
+    price_sum: float = 0.0
+    price_sum_sq: float = 0.0
+    bedroom_count: int = 0
+    bedroom_sum: float = 0.0
+    
+    # Distinct-count sketches
+    cities: HyperLogLog = field(default_factory=HyperLogLog)
+    search_criteria: HyperLogLog = field(default_factory=HyperLogLog)
+    
+    # Exponentially decayed activity counter anchored at recency_at
+    recency_score: float = 0.0
+    recency_at: Optional[datetime] = None
+    
+    first_interaction_at: Optional[datetime] = None
+    
+    def update(self, interaction: Dict[str, Any]) -> None:
+        """
+        Fold a single interaction into the aggregate
+        
+        Args:
+            interaction: Interaction event (price, bedrooms, city,
+                is_favorite, timestamp, search_criteria)
+        """
+        self.total_views += 1
+        
+        if interaction.get('is_favorite'):
+            self.favorites += 1
+        
+        price = interaction.get('price')
+        if price:
+            price = float(price)
+            self.price_count += 1
+            self.price_sum += price
+            self.price_sum_sq += price * price
+        
+        bedrooms = interaction.get('bedrooms')
+        if bedrooms:
+            self.bedroom_count += 1
+            self.bedroom_sum += float(bedrooms)
+        
+        city = interaction.get('city')
+        if city:
+            self.cities.add(city)
+        
+        self.search_criteria.add(str(interaction.get('search_criteria', {})))
+        
+        timestamp = interaction.get('timestamp')
+        if timestamp:
+            self._record_activity(timestamp)
+            if self.first_interaction_at is None or timestamp < self.first_interaction_at:
+                self.first_interaction_at = timestamp
+    
+    def _record_activity(self, timestamp: datetime) -> None:
+        """Add one event to the decayed activity counter"""
+        if self.recency_at is None:
+            self.recency_at = timestamp
+            self.recency_score = 1.0
+        elif timestamp >= self.recency_at:
+            self.recency_score = self.recency_score * self._decay(timestamp - self.recency_at) + 1.0
+            self.recency_at = timestamp
+        else:
+            # Late event: discount it relative to the current anchor
+            self.recency_score += self._decay(self.recency_at - timestamp)
+    
+    @staticmethod
+    def _decay(elapsed: timedelta) -> float:
+        """Decay factor for an elapsed time span"""
+        days = elapsed.total_seconds() / 86400
+        return math.exp(-max(days, 0.0) / RECENCY_WINDOW_DAYS)
+    
+    def recent_activity(self, now: Optional[datetime] = None) -> float:
+        """Decayed count of recent interactions as of now"""
+        if self.recency_at is None:
+            return 0.0
+        now = now or datetime.now()
+        return self.recency_score * self._decay(now - self.recency_at)
+    
+    def price_mean(self) -> Optional[float]:
+        """Mean price of viewed units"""
+        return self.price_sum / self.price_count if self.price_count else None
+    
+    def price_std(self) -> Optional[float]:
+        """Population standard deviation of viewed unit prices"""
+        if self.price_count < 2:
+            return None
+        mean = self.price_sum / self.price_count
+        variance = self.price_sum_sq / self.price_count - mean * mean
+        return math.sqrt(max(variance, 0.0))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for storage (Redis, JSON column, etc.)"""
+        return {
+            'total_views': self.total_views,
+            'favorites': self.favorites,
+            'price_count': self.price_count,
+            'price_sum': self.price_sum,
+            'price_sum_sq': self.price_sum_sq,
+            'bedroom_count': self.bedroom_count,
+            'bedroom_sum': self.bedroom_sum,
+            'cities': self.cities.registers.hex(),
+            'search_criteria': self.search_criteria.registers.hex(),
+            'recency_score': self.recency_score,
+            'recency_at': self.recency_at.isoformat() if self.recency_at else None,
+            'first_interaction_at': (
+                self.first_interaction_at.isoformat() if self.first_interaction_at else None
+            )
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UserInteractionAggregate":
+        """Restore an aggregate serialized with to_dict"""
+        return cls(
+            total_views=data.get('total_views', 0),
+            favorites=data.get('favorites', 0),
+            price_count=data.get('price_count', 0),
+            price_sum=data.get('price_sum', 0.0),
+            price_sum_sq=data.get('price_sum_sq', 0.0),
+            bedroom_count=data.get('bedroom_count', 0),
+            bedroom_sum=data.get('bedroom_sum', 0.0),
+            cities=HyperLogLog(registers=bytes.fromhex(data['cities'])) if data.get('cities') else HyperLogLog(),
+            search_criteria=(
+                HyperLogLog(registers=bytes.fromhex(data['search_criteria']))
+                if data.get('search_criteria') else HyperLogLog()
+            ),
+            recency_score=data.get('recency_score', 0.0),
+            recency_at=datetime.fromisoformat(data['recency_at']) if data.get('recency_at') else None,
+            first_interaction_at=(
+                datetime.fromisoformat(data['first_interaction_at'])
+                if data.get('first_interaction_at') else None
+            )
+        )
+    
+    @classmethod
+    def from_history(cls, user_history: List[Dict[str, Any]]) -> "UserInteractionAggregate":
+        """Build an aggregate from a full interaction history"""
+        aggregate = cls()
+        for interaction in user_history:
+            aggregate.update(interaction)
+        return aggregate
+
 
 class FeatureExtractor:
     """
@@ -234,6 +447,10 @@ class FeatureExtractor:
         """
         Extract features from user interaction history
         
+        Callers that persist a UserInteractionAggregate (to_dict/from_dict)
+        should fold new events with update() and call
+        extract_aggregate_features instead; this rebuilds the aggregate.
+        
         Args:
             user_history: List of user interactions (views, favorites, etc.)
             
@@ -241,62 +458,70 @@ class FeatureExtractor:
             Feature vector as numpy array
         """
         if not user_history:
-            return np.zeros(10, dtype=np.float32)
+            return np.zeros(INTERACTION_FEATURE_COUNT, dtype=np.float32)
         
-        features = []
+        return self.extract_aggregate_features(
+            UserInteractionAggregate.from_history(user_history)
+        )
+    
+    def extract_aggregate_features(self,
+                                   aggregate: UserInteractionAggregate,
+                                   now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Build the interaction feature vector from a rolling aggregate
+        in constant time
+        
+        Args:
+            aggregate: User interaction aggregate
+            now: Reference time for recency features
+            
+        Returns:
+            Feature vector as numpy array
+        """
+        total_views = aggregate.total_views
+        if total_views == 0:
+            return np.zeros(INTERACTION_FEATURE_COUNT, dtype=np.float32)
+        
+        now = now or datetime.now()
         
         # View patterns
-        total_views = len(user_history)
-        features.append(float(min(total_views, 100)))  # Cap at 100
-        
-        # Average price of viewed properties
-        prices = [h.get('price', 0) for h in user_history if h.get('price')]
-        avg_price = np.mean(prices) if prices else 1500
-        features.append(float(avg_price))
-        
-        # Price variance (indicates flexibility)
-        price_std = np.std(prices) if len(prices) > 1 else 500
-        features.append(float(price_std))
-        
-        # Bedroom preferences from history
-        bedrooms = [h.get('bedrooms', 1) for h in user_history if h.get('bedrooms')]
-        avg_bedrooms = np.mean(bedrooms) if bedrooms else 2
-        features.append(float(avg_bedrooms))
-        
-        # Location diversity
-        cities = set(h.get('city', '') for h in user_history if h.get('city'))
-        features.append(float(len(cities)))
-        
-        # Favorite rate
-        favorites = sum(1 for h in user_history if h.get('is_favorite'))
-        favorite_rate = favorites / total_views if total_views > 0 else 0
-        features.append(float(favorite_rate))
-        
-        # Recent activity (last 7 days)
-        recent_views = sum(1 for h in user_history 
-                          if h.get('timestamp') and 
-                          (datetime.now() - h['timestamp']).days <= 7)
-        features.append(float(recent_views))
-        
-        # Search refinement (how many times filters were changed)
-        search_count = len(set(str(h.get('search_criteria', {})) for h in user_history))
-        features.append(float(min(search_count, 20)))
+        avg_price = aggregate.price_mean()
+        price_std = aggregate.price_std()
+        avg_bedrooms = (
+            aggregate.bedroom_sum / aggregate.bedroom_count
+            if aggregate.bedroom_count else 2
+        )
+        
+        # Location diversity and search refinement from sketches
+        city_count = round(aggregate.cities.count())
+        search_count = round(aggregate.search_criteria.count())
+        
+        favorite_rate = aggregate.favorites / total_views
+        recent_views = aggregate.recent_activity(now)
         
         # Time since first interaction
-        timestamps = [h.get('timestamp') for h in user_history if h.get('timestamp')]
-        if timestamps:
-            days_active = (datetime.now() - min(timestamps)).days
-            features.append(float(min(days_active, 365)))
+        if aggregate.first_interaction_at:
+            days_active = min((now - aggregate.first_interaction_at).days, 365)
         else:
-            features.append(0.0)
+            days_active = 0
         
         # Engagement score (composite)
         engagement = (favorite_rate * 0.3 + 
                      min(recent_views / 10, 1) * 0.3 + 
                      min(total_views / 50, 1) * 0.4)
-        features.append(float(engagement))
         
-        return np.array(features, dtype=np.float32)
+        return np.array([
+            min(total_views, 100),  # Cap at 100
+            avg_price if avg_price is not None else 1500,
+            price_std if price_std is not None else 500,
+            avg_bedrooms,
+            city_count,
+            favorite_rate,
+            recent_views,
+            min(search_count, 20),
+            days_active,
+            engagement
+        ], dtype=np.float32)
     
     def create_feature_matrix(self, 
                             properties: List[Dict[str, Any]],
@@ -0,0 +1,237 @@
+"""
+Flat-array tree ensemble inference for trained random forests
+
+A forest is exported as a handful of contiguous arrays (one row per node
+across all trees) and memory-mapped read-only at load time, so every
+worker process shares one copy through the page cache and prediction is
+a vectorized walk over node indices.
+"""
+from typing import Any, Optional
+from pathlib import Path
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FOREST_META_FILE = "forest.json"
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+# Tolerance for the export-time check against the sklearn estimator
+PARITY_RTOL = 1e-6
+PARITY_ATOL = 1e-8
+PARITY_SAMPLES = 512
+
+
+class FlatForest:
+    """
+    Random forest regressor stored as flat node arrays
+    
+    Leaves point to themselves, so walking max_depth levels from every
+    root lands each (tree, sample) pair on its leaf without branching.
+    """
+    
+    def __init__(self,
+                 feature: np.ndarray,
+                 threshold: np.ndarray,
+                 left: np.ndarray,
+                 right: np.ndarray,
+                 value: np.ndarray,
+                 roots: np.ndarray,
+                 max_depth: int,
+                 n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value  # (n_nodes, n_outputs)
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+    
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+    
+    @property
+    def n_outputs(self) -> int:
+        return self.value.shape[1]
+    
+    @classmethod
+    def from_sklearn(cls, forest: Any) -> 'FlatForest':
+        """
+        Flatten a fitted sklearn forest (or single tree) regressor
+        
+        Args:
+            forest: Fitted RandomForestRegressor, ExtraTreesRegressor or
+                DecisionTreeRegressor
+        
+        Returns:
+            Equivalent flat forest
+        """
+        estimators = getattr(forest, 'estimators_', [forest])
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        
+        for estimator in estimators:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+            rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+            values.append(tree.value[:, :, 0].astype(np.float64))
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+        
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=int(max_depth),
+            n_features=int(forest.n_features_in_)
+        )
+    
+    def save(self, path: Path) -> None:
+        """Write the arrays as .npy files plus a small metadata file"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            np.save(path / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        (path / FOREST_META_FILE).write_text(json.dumps({
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'n_trees': self.n_trees,
+            'n_outputs': self.n_outputs
+        }))
+    
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> 'FlatForest':
+        """
+        Load an exported forest
+        
+        Args:
+            path: Directory written by save
+            mmap: Map the arrays read-only instead of reading them into memory
+        
+        Returns:
+            Loaded forest
+        """
+        path = Path(path)
+        meta = json.loads((path / FOREST_META_FILE).read_text())
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None)
+            for name in FOREST_ARRAYS
+        }
+        return cls(max_depth=meta['max_depth'], n_features=meta['n_features'], **arrays)
+    
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf node index reached by every sample in every tree
+        
+        Args:
+            X: Feature matrix of shape (n_samples, n_features)
+        
+        Returns:
+            Node indices of shape (n_trees, n_samples)
+        """
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        
+        # Gather from the flattened matrix: row offset + feature index
+        flat_X = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * self.n_features)[None, :]
+        nodes = np.repeat(np.asarray(self.roots)[:, None], X.shape[0], axis=1)
+        
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        
+        return nodes
+    
+    def predict_trees(self, X: np.ndarray) -> np.ndarray:
+        """
+        Per-tree predictions
+        
+        Returns:
+            Array of shape (n_trees, n_samples) for single-output forests,
+            (n_trees, n_samples, n_outputs) otherwise
+        """
+        values = self.value[self.apply(X)]
+        return values[..., 0] if self.n_outputs == 1 else values
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Forest prediction: the mean over trees, shaped like sklearn's predict"""
+        return self.predict_trees(X).mean(axis=0)
+
+
+def tree_predictions(model: Any, X: np.ndarray) -> np.ndarray:
+    """
+    Stack the per-tree predictions of a flat or sklearn forest
+    
+    Args:
+        model: FlatForest or fitted sklearn forest
+        X: Feature matrix
+    
+    Returns:
+        Array with trees on the first axis
+    """
+    if isinstance(model, FlatForest):
+        return model.predict_trees(X)
+    return np.stack([tree.predict(X) for tree in model.estimators_])
+
+
+def _parity_samples(forest: FlatForest, n_samples: int, seed: int = 0) -> np.ndarray:
+    """Random points spanning each feature's split thresholds"""
+    rng = np.random.default_rng(seed)
+    samples = np.empty((n_samples, forest.n_features))
+    internal = forest.left != np.arange(len(forest.left))
+    
+    for i in range(forest.n_features):
+        splits = forest.threshold[internal & (forest.feature == i)]
+        low, high = (splits.min(), splits.max()) if len(splits) else (0.0, 1.0)
+        margin = max(high - low, 1.0) * 0.1
+        samples[:, i] = rng.uniform(low - margin, high + margin, n_samples)
+    
+    return samples
+
+
+def export_forest(forest: Any, path: Path, check_features: Optional[np.ndarray] = None) -> FlatForest:
+    """
+    Flatten a fitted forest, verify it against sklearn and save it
+    
+    Args:
+        forest: Fitted sklearn forest regressor
+        path: Output directory
+        check_features: Rows to compare predictions on; defaults to random
+            points spanning the split thresholds
+    
+    Returns:
+        The exported flat forest
+    
+    Raises:
+        ValueError: If flat predictions differ from sklearn beyond tolerance
+    """
+    flat = FlatForest.from_sklearn(forest)
+    if check_features is None:
+        check_features = _parity_samples(flat, PARITY_SAMPLES)
+    
+    expected = forest.predict(check_features)
+    actual = flat.predict(check_features)
+    if not np.allclose(actual, expected, rtol=PARITY_RTOL, atol=PARITY_ATOL):
+        max_error = float(np.max(np.abs(actual - expected)))
+        raise ValueError(f"Flat forest does not match sklearn (max abs error {max_error})")
+    
+    flat.save(path)
+    logger.info(f"Exported {flat.n_trees}-tree forest ({len(flat.feature)} nodes) to {path}")
+    return flat
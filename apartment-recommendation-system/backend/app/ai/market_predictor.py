@@ -3,47 +3,140 @@ Market prediction module for price forecasting and trend analysis
 """
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
 import logging
 
 from app.ai.feature_extractor import FeatureExtractor
+from app.ai.forest_engine import tree_predictions
+from app.ai.model_registry import ModelRegistry, MarketModelBundle, model_registry
+from app.ai.trend_analysis import group_trends
+from app.core.executors import compute_executors
 
 logger = logging.getLogger(__name__)
 
+# Feature layout shared by the training pipeline and inference
+MARKET_FEATURE_NAMES = [
+    'current_price',
+    'bedrooms',
+    'bathrooms',
+    'square_feet',
+    'days_on_market',
+    'market_avg_rent',
+    'market_avg_days_on_market',
+    'has_concessions'
+]
+
+# Column position of each feature in prediction matrices
+FEATURE_INDEX = {name: i for i, name in enumerate(MARKET_FEATURE_NAMES)}
+
+# Values used for missing unit/market data
+FEATURE_DEFAULTS = {
+    'current_price': 0.0,
+    'bedrooms': 1.0,
+    'bathrooms': 1.0,
+    'square_feet': 800.0,
+    'days_on_market': 0.0,
+    'market_avg_rent': 1500.0,
+    'market_avg_days_on_market': 20.0,
+    'has_concessions': 0.0
+}
+
+# Horizons (days) predicted by the price model, one output column each
+PRICE_HORIZONS = [30, 60, 90]
+
+# Relative change below which a tree's prediction counts as a price drop
+PRICE_DROP_THRESHOLD = -0.005
+
+
+def fallback_market_rent(avg_rent: Any, current_price: Any) -> Any:
+    """
+    Market average rent, with the fallback used wherever it is missing
+    
+    A unit without market data is treated as priced at market, so its own
+    price stands in; the feature default applies when that is missing too.
+    Single-unit and batch predictions both go through here.
+    
+    Args:
+        avg_rent: Market average rent, None/NaN when unknown; scalar or array
+        current_price: Unit asking price; scalar or array
+    
+    Returns:
+        Rent as a float, or an array for array input
+    """
+    avg_rent = np.asarray(np.nan if avg_rent is None else avg_rent, dtype=np.float64)
+    current_price = np.asarray(np.nan if current_price is None else current_price, dtype=np.float64)
+    fallback = np.where(current_price > 0, current_price, FEATURE_DEFAULTS['market_avg_rent'])
+    rent = np.where(avg_rent > 0, avg_rent, fallback)
+    return float(rent) if rent.ndim == 0 else rent
+
+
+def compute_market_trends(historical_data: List[Dict]) -> Dict[str, Any]:
+    """
+    Fit a linear price trend and classify volatility
+    
+    Module-level so it can run in the compute process pool.
+    
+    Args:
+        historical_data: List of historical price/availability data
+        
+    Returns:
+        Dictionary with trend analysis
+    """
+    if not historical_data:
+        return {
+            'trend_direction': 'stable',
+            'trend_strength': 0,
+            'volatility': 'low',
+            'seasonality_detected': False
+        }
+    
+    try:
+        df = pd.DataFrame(historical_data)
+        
+        # Ensure we have price data
+        if 'price' not in df.columns:
+            return {
+                'trend_direction': 'stable',
+                'trend_strength': 0,
+                'volatility': 'low',
+                'seasonality_detected': False
+            }
+        
+        # Closed-form OLS on the observation index (same fit as a single-series LinearRegression)
+        prices = df['price'].astype(float).values
+        return group_trends(np.zeros(len(prices), dtype=np.int8), prices).to_records()[0]
+        
+    except Exception as e:
+        logger.error(f"Error analyzing market trends: {e}")
+        return {
+            'trend_direction': 'error',
+            'trend_strength': 0,
+            'volatility': 'unknown',
+            'seasonality_detected': False
+        }
+
 
 class MarketPredictor:
     """
     Predicts market trends, price changes, and optimal timing
     """
     
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None):
         self.feature_extractor = FeatureExtractor()
-        self.price_model = None
-        self.days_on_market_model = None
-        self.concession_model = None
-        self.scaler = StandardScaler()
-        self._initialize_models()
-    
-    def _initialize_models(self):
-        """Initialize ML models"""
-        # Use RandomForest for better performance on complex patterns
-        self.price_model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
-        
-        self.days_on_market_model = RandomForestRegressor(
-            n_estimators=50,
-            max_depth=8,
-            random_state=42
-        )
-        
-        self.concession_model = LinearRegression()
+        # Trained models are loaded lazily and shared across instances
+        self.registry = registry or model_registry
+    
+    @property
+    def models(self) -> Optional[MarketModelBundle]:
+        """Trained model bundle, or None when only heuristics are available"""
+        return self.registry.get_market_models()
+    
+    @property
+    def model_version(self) -> str:
+        """Version identifier of the models backing predictions"""
+        bundle = self.models
+        return bundle.version if bundle else 'heuristic_v1'
     
     def predict_price_change(self, 
                             unit_data: Dict,
@@ -61,40 +154,31 @@ class MarketPredictor:
             Dictionary with price predictions
         """
         try:
-            # Extract features
-            features = self._prepare_prediction_features(unit_data, market_data)
-            
-            # For demo purposes, use heuristic model
-            # In production, this would use trained ML model
             current_price = float(unit_data.get('current_price', 0))
-            days_on_market = unit_data.get('days_on_market', 0)
+            bundle = self.models
             
-            # Price drop probability based on days on market
-            if days_on_market > 60:
-                price_drop_prob = 0.8
-                expected_drop = current_price * 0.05  # 5% drop
-            elif days_on_market > 30:
-                price_drop_prob = 0.6
-                expected_drop = current_price * 0.03  # 3% drop
-            elif days_on_market > 14:
-                price_drop_prob = 0.3
-                expected_drop = current_price * 0.02  # 2% drop
-            else:
-                price_drop_prob = 0.1
-                expected_drop = 0
+            if bundle is None or bundle.price_model is None:
+                return self._heuristic_price_change(unit_data, market_data)
             
-            # Calculate predictions
-            predicted_price_30d = current_price - (expected_drop * 0.5)
-            predicted_price_60d = current_price - (expected_drop * 0.8)
-            predicted_price_90d = current_price - expected_drop
+            features = self._prepare_prediction_features(unit_data, market_data)
+            
+            # Relative price change per horizon, plus per-tree votes for a drop
+            per_tree = tree_predictions(bundle.price_model, features)
+            changes = per_tree.mean(axis=0)[0]
+            price_drop_prob = float(np.mean(per_tree[:, 0, -1] < PRICE_DROP_THRESHOLD))
+            
+            predicted = {
+                horizon: float(current_price * (1 + changes[i]))
+                for i, horizon in enumerate(PRICE_HORIZONS)
+            }
             
             return {
                 'current_price': current_price,
-                'predicted_price_30d': predicted_price_30d,
-                'predicted_price_60d': predicted_price_60d,
-                'predicted_price_90d': predicted_price_90d,
+                'predicted_price_30d': predicted[30],
+                'predicted_price_60d': predicted[60],
+                'predicted_price_90d': predicted[90],
                 'price_drop_probability': price_drop_prob,
-                'expected_drop_amount': expected_drop,
+                'expected_drop_amount': max(current_price - predicted[90], 0),
                 'confidence': self._calculate_confidence(unit_data, market_data)
             }
             
@@ -124,44 +208,23 @@ class MarketPredictor:
             Dictionary with lease timing predictions
         """
         try:
-            # Extract relevant features
-            current_price = float(unit_data.get('current_price', 0))
-            days_on_market = unit_data.get('days_on_market', 0)
-            has_concessions = bool(unit_data.get('concessions'))
+            bundle = self.models
+            
+            if bundle is None or bundle.days_on_market_model is None:
+                return self._heuristic_days_to_lease(unit_data, market_data)
             
-            # Get market averages
             avg_days = market_data.get('market_stats', {}).get('avg_days_on_market', 20)
-            avg_price = market_data.get('market_stats', {}).get('avg_rent', current_price)
-            
-            # Calculate price position
-            price_ratio = current_price / avg_price if avg_price > 0 else 1.0
-            
-            # Predict days to lease based on factors
-            if price_ratio < 0.9:  # Below market
-                if has_concessions:
-                    predicted_days = 5
-                else:
-                    predicted_days = 10
-            elif price_ratio < 1.1:  # At market
-                if has_concessions:
-                    predicted_days = 10
-                else:
-                    predicted_days = 15
-            else:  # Above market
-                if has_concessions:
-                    predicted_days = 20
-                else:
-                    predicted_days = 30
-            
-            # Adjust for current days on market
-            if days_on_market > 30:
-                predicted_days += 10
+            features = self._prepare_prediction_features(unit_data, market_data)
+            
+            # Spread of the per-tree predictions gives the lease-time distribution
+            per_tree = tree_predictions(bundle.days_on_market_model, features)[:, 0]
+            predicted_days = max(int(round(per_tree.mean())), 0)
             
             return {
                 'predicted_days_to_lease': predicted_days,
-                'probability_7_days': 1.0 if predicted_days <= 7 else 0.3,
-                'probability_14_days': 1.0 if predicted_days <= 14 else 0.5,
-                'probability_30_days': 1.0 if predicted_days <= 30 else 0.7,
+                'probability_7_days': float(np.mean(per_tree <= 7)),
+                'probability_14_days': float(np.mean(per_tree <= 14)),
+                'probability_30_days': float(np.mean(per_tree <= 30)),
                 'market_average': avg_days,
                 'relative_speed': 'fast' if predicted_days < avg_days else 'slow'
             }
@@ -193,39 +256,21 @@ class MarketPredictor:
         try:
             days_on_market = unit_data.get('days_on_market', 0)
             current_concessions = unit_data.get('concessions', {})
+            bundle = self.models
             
-            # Base probability on days on market
-            if days_on_market > 45:
-                base_prob = 0.9
-                expected_value = 1500  # High concession
-            elif days_on_market > 30:
-                base_prob = 0.7
-                expected_value = 1000  # Medium concession
-            elif days_on_market > 14:
-                base_prob = 0.4
-                expected_value = 500  # Small concession
-            else:
-                base_prob = 0.2
-                expected_value = 0
-            
-            # Adjust if already has concessions
-            if current_concessions:
-                base_prob = min(base_prob + 0.2, 1.0)
-            
-            # Predict optimal negotiation date
-            if days_on_market < 7:
-                optimal_date = datetime.now() + timedelta(days=14)
-            elif days_on_market < 14:
-                optimal_date = datetime.now() + timedelta(days=7)
-            else:
-                optimal_date = datetime.now() + timedelta(days=3)
+            if bundle is None or bundle.concession_model is None:
+                return self._heuristic_concession_probability(unit_data, market_data)
+            
+            features = self._prepare_prediction_features(unit_data, market_data)
+            probability = float(bundle.concession_model.predict_proba(features)[0, 1])
+            typical_value = float(bundle.metadata.get('typical_concession_value', 1000))
             
             return {
-                'concession_probability': base_prob,
-                'expected_concession_value': expected_value,
-                'optimal_negotiation_date': optimal_date.isoformat(),
+                'concession_probability': probability,
+                'expected_concession_value': round(probability * typical_value, 2),
+                'optimal_negotiation_date': self._optimal_negotiation_date(days_on_market).isoformat(),
                 'current_has_concessions': bool(current_concessions),
-                'recommendation': self._get_concession_recommendation(base_prob, days_on_market)
+                'recommendation': self._get_concession_recommendation(probability, days_on_market)
             }
             
         except Exception as e:
@@ -251,88 +296,49 @@ class MarketPredictor:
         Returns:
             Dictionary with trend analysis
         """
-        if not historical_data:
-            return {
-                'trend_direction': 'stable',
-                'trend_strength': 0,
-                'volatility': 'low',
-                'seasonality_detected': False
-            }
+        return compute_market_trends(historical_data)
+    
+    async def analyze_market_trends_async(self,
+                                          historical_data: List[Dict],
+                                          time_period: str = 'monthly') -> Dict[str, Any]:
+        """
+        Analyze market trends in the compute process pool
         
-        try:
-            df = pd.DataFrame(historical_data)
-            
-            # Ensure we have price data
-            if 'price' not in df.columns:
-                return {
-                    'trend_direction': 'stable',
-                    'trend_strength': 0,
-                    'volatility': 'low',
-                    'seasonality_detected': False
-                }
-            
-            # Calculate trend
-            prices = df['price'].values
-            if len(prices) > 1:
-                # Simple linear regression for trend
-                X = np.arange(len(prices)).reshape(-1, 1)
-                y = prices
-                
-                model = LinearRegression()
-                model.fit(X, y)
-                
-                slope = model.coef_[0]
-                
-                # Determine trend direction
-                if slope > 50:  # $50+ increase per period
-                    trend_direction = 'increasing'
-                elif slope < -50:  # $50+ decrease per period
-                    trend_direction = 'decreasing'
-                else:
-                    trend_direction = 'stable'
-                
-                # Calculate volatility
-                price_std = np.std(prices)
-                price_mean = np.mean(prices)
-                cv = price_std / price_mean if price_mean > 0 else 0
-                
-                if cv > 0.2:
-                    volatility = 'high'
-                elif cv > 0.1:
-                    volatility = 'medium'
-                else:
-                    volatility = 'low'
-                
-                # Simple seasonality check (would be more complex in production)
-                seasonality_detected = len(prices) > 12 and cv > 0.15
-                
-                return {
-                    'trend_direction': trend_direction,
-                    'trend_strength': abs(slope),
-                    'volatility': volatility,
-                    'seasonality_detected': seasonality_detected,
-                    'average_price': float(price_mean),
-                    'price_range': {
-                        'min': float(np.min(prices)),
-                        'max': float(np.max(prices))
-                    }
-                }
-            else:
-                return {
-                    'trend_direction': 'insufficient_data',
-                    'trend_strength': 0,
-                    'volatility': 'unknown',
-                    'seasonality_detected': False
-                }
-                
-        except Exception as e:
-            logger.error(f"Error analyzing market trends: {e}")
-            return {
-                'trend_direction': 'error',
-                'trend_strength': 0,
-                'volatility': 'unknown',
-                'seasonality_detected': False
-            }
+        Args:
+            historical_data: List of historical price/availability data
+            time_period: Analysis period ('daily', 'weekly', 'monthly')
+            
+        Returns:
+            Dictionary with trend analysis
+        """
+        return await compute_executors.run_cpu(compute_market_trends, historical_data)
+    
+    def analyze_market_trends_batch(self, series: Dict[Any, List[Dict]]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Analyze trends for many series (units, zip codes, cities) at once
+        
+        Args:
+            series: Historical price data keyed by series id
+            
+        Returns:
+            Trend analysis per series id, as analyze_market_trends returns it
+        """
+        # Series are grouped by position: ids may be tuples or otherwise unsortable
+        codes = []
+        prices = []
+        for code, history in enumerate(series.values()):
+            for point in history:
+                if point.get('price') is not None:
+                    codes.append(code)
+                    prices.append(float(point['price']))
+        
+        results = group_trends(np.array(codes, dtype=np.int64), prices).to_records() if codes else {}
+        
+        # Series without any price points get the same default as a single call
+        return {
+            key: results[code] if code in results else compute_market_trends(history)
+            for code, (key, history) in enumerate(series.items())
+        }
     
     def calculate_optimal_offer_price(self,
                                      unit_data: Dict,
@@ -354,15 +360,13 @@ class MarketPredictor:
             days_on_market = unit_data.get('days_on_market', 0)
             has_concessions = bool(unit_data.get('concessions'))
             
-            # Base discount based on days on market
-            if days_on_market > 60:
-                base_discount = 0.10  # 10% discount
-            elif days_on_market > 30:
-                base_discount = 0.07  # 7% discount
-            elif days_on_market > 14:
-                base_discount = 0.05  # 5% discount
+            if self.models is not None and self.models.price_model is not None and current_price > 0:
+                # Anchor the discount on the predicted 60-day price
+                price_prediction = self.predict_price_change(unit_data, market_data)
+                predicted_drop = (current_price - price_prediction['predicted_price_60d']) / current_price
+                base_discount = min(max(predicted_drop + 0.03, 0.02), 0.15)
             else:
-                base_discount = 0.03  # 3% discount
+                base_discount = self._heuristic_base_discount(days_on_market)
             
             # Adjust for existing concessions
             if has_concessions:
@@ -417,20 +421,414 @@ class MarketPredictor:
                 'recommendation': 'Start with moderate offer'
             }
     
+    def build_feature_matrix(self, columns: Any) -> np.ndarray:
+        """
+        Build a prediction feature matrix from columnar unit data
+        
+        Args:
+            columns: Mapping (dict of arrays or DataFrame) keyed by
+                MARKET_FEATURE_NAMES; missing columns and NaNs get the
+                same defaults as single-unit predictions
+            
+        Returns:
+            Feature matrix of shape (n_units, len(MARKET_FEATURE_NAMES))
+        """
+        n_rows = len(np.asarray(columns['current_price']))
+        matrix = np.empty((n_rows, len(MARKET_FEATURE_NAMES)), dtype=np.float64)
+        
+        for i, name in enumerate(MARKET_FEATURE_NAMES):
+            if name in columns:
+                values = np.asarray(columns[name], dtype=np.float64)
+                matrix[:, i] = np.where(np.isnan(values), FEATURE_DEFAULTS[name], values)
+            else:
+                matrix[:, i] = FEATURE_DEFAULTS[name]
+        
+        # Missing market rent falls back per unit, as in single-unit predictions
+        avg_rent = (
+            np.asarray(columns['market_avg_rent'], dtype=np.float64)
+            if 'market_avg_rent' in columns else np.full(n_rows, np.nan)
+        )
+        matrix[:, FEATURE_INDEX['market_avg_rent']] = fallback_market_rent(
+            avg_rent, matrix[:, FEATURE_INDEX['current_price']]
+        )
+        
+        return matrix
+    
+    def units_to_columns(self, units: List[Dict], market_data: Dict) -> Dict[str, np.ndarray]:
+        """
+        Convert unit dicts sharing one market context to columnar data
+        
+        Args:
+            units: Unit information dicts
+            market_data: Market context data
+            
+        Returns:
+            Columnar data for build_feature_matrix
+        """
+        market_stats = market_data.get('market_stats', {})
+        avg_rent = market_stats.get('avg_rent')
+        n_rows = len(units)
+        
+        return {
+            'current_price': np.array([float(u.get('current_price', 0)) for u in units]),
+            'bedrooms': np.array([float(u.get('bedrooms', 1)) for u in units]),
+            'bathrooms': np.array([float(u.get('bathrooms', 1)) for u in units]),
+            'square_feet': np.array([float(u.get('square_feet') or 800) for u in units]),
+            'days_on_market': np.array([float(u.get('days_on_market', 0)) for u in units]),
+            'market_avg_rent': np.full(n_rows, np.nan if avg_rent is None else float(avg_rent)),
+            'market_avg_days_on_market': np.full(n_rows, float(market_stats.get('avg_days_on_market', 20))),
+            'has_concessions': np.array([1.0 if u.get('concessions') else 0.0 for u in units])
+        }
+    
+    def predict_price_change_batch(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Predict 30/60/90-day prices and drop probability for many units
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            
+        Returns:
+            Dictionary of arrays, one entry per unit
+        """
+        current_price = features[:, FEATURE_INDEX['current_price']]
+        bundle = self.models
+        
+        if bundle is None or bundle.price_model is None:
+            days_on_market = features[:, FEATURE_INDEX['days_on_market']]
+            drop_rate = np.select(
+                [days_on_market > 60, days_on_market > 30, days_on_market > 14],
+                [0.05, 0.03, 0.02], default=0.0
+            )
+            expected_drop = current_price * drop_rate
+            return {
+                'current_price': current_price,
+                'predicted_price_30d': current_price - expected_drop * 0.5,
+                'predicted_price_60d': current_price - expected_drop * 0.8,
+                'predicted_price_90d': current_price - expected_drop,
+                'price_drop_probability': np.select(
+                    [days_on_market > 60, days_on_market > 30, days_on_market > 14],
+                    [0.8, 0.6, 0.3], default=0.1
+                ),
+                'expected_drop_amount': expected_drop
+            }
+        
+        # (n_trees, n_units, n_horizons)
+        per_tree = tree_predictions(bundle.price_model, features)
+        changes = per_tree.mean(axis=0)
+        predicted = current_price[:, None] * (1 + changes)
+        
+        return {
+            'current_price': current_price,
+            'predicted_price_30d': predicted[:, 0],
+            'predicted_price_60d': predicted[:, 1],
+            'predicted_price_90d': predicted[:, 2],
+            'price_drop_probability': np.mean(per_tree[:, :, -1] < PRICE_DROP_THRESHOLD, axis=0),
+            'expected_drop_amount': np.maximum(current_price - predicted[:, 2], 0)
+        }
+    
+    def predict_days_to_lease_batch(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Predict days until lease for many units
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            
+        Returns:
+            Dictionary of arrays, one entry per unit
+        """
+        bundle = self.models
+        
+        if bundle is None or bundle.days_on_market_model is None:
+            price_ratio = features[:, FEATURE_INDEX['current_price']] / np.where(
+                features[:, FEATURE_INDEX['market_avg_rent']] > 0,
+                features[:, FEATURE_INDEX['market_avg_rent']], np.nan
+            )
+            price_ratio = np.nan_to_num(price_ratio, nan=1.0)
+            has_concessions = features[:, FEATURE_INDEX['has_concessions']] > 0
+            predicted_days = np.select(
+                [price_ratio < 0.9, price_ratio < 1.1],
+                [np.where(has_concessions, 5, 10), np.where(has_concessions, 10, 15)],
+                default=np.where(has_concessions, 20, 30)
+            ) + np.where(features[:, FEATURE_INDEX['days_on_market']] > 30, 10, 0)
+            return {
+                'predicted_days_to_lease': predicted_days,
+                'probability_7_days': np.where(predicted_days <= 7, 1.0, 0.3),
+                'probability_14_days': np.where(predicted_days <= 14, 1.0, 0.5),
+                'probability_30_days': np.where(predicted_days <= 30, 1.0, 0.7)
+            }
+        
+        # (n_trees, n_units)
+        per_tree = tree_predictions(bundle.days_on_market_model, features)
+        
+        return {
+            'predicted_days_to_lease': np.maximum(np.rint(per_tree.mean(axis=0)), 0).astype(int),
+            'probability_7_days': np.mean(per_tree <= 7, axis=0),
+            'probability_14_days': np.mean(per_tree <= 14, axis=0),
+            'probability_30_days': np.mean(per_tree <= 30, axis=0)
+        }
+    
+    def predict_concession_probability_batch(self, features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Predict concession probability for many units
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            
+        Returns:
+            Dictionary of arrays, one entry per unit
+        """
+        bundle = self.models
+        
+        if bundle is None or bundle.concession_model is None:
+            days_on_market = features[:, FEATURE_INDEX['days_on_market']]
+            conditions = [days_on_market > 45, days_on_market > 30, days_on_market > 14]
+            probability = np.select(conditions, [0.9, 0.7, 0.4], default=0.2)
+            probability = np.where(
+                features[:, FEATURE_INDEX['has_concessions']] > 0,
+                np.minimum(probability + 0.2, 1.0), probability
+            )
+            return {
+                'concession_probability': probability,
+                'expected_concession_value': np.select(conditions, [1500.0, 1000.0, 500.0], default=0.0)
+            }
+        
+        probability = bundle.concession_model.predict_proba(features)[:, 1]
+        typical_value = float(bundle.metadata.get('typical_concession_value', 1000))
+        
+        return {
+            'concession_probability': probability,
+            'expected_concession_value': np.round(probability * typical_value, 2)
+        }
+    
+    def calculate_optimal_offer_price_batch(self,
+                                            features: np.ndarray,
+                                            user_budget: Optional[float] = None,
+                                            price_predictions: Optional[Dict[str, np.ndarray]] = None
+                                            ) -> Dict[str, np.ndarray]:
+        """
+        Calculate offer bands for many units
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            user_budget: User's maximum budget
+            price_predictions: Output of predict_price_change_batch, if
+                already computed for the same features
+            
+        Returns:
+            Dictionary of arrays, one entry per unit
+        """
+        current_price = features[:, FEATURE_INDEX['current_price']]
+        days_on_market = features[:, FEATURE_INDEX['days_on_market']]
+        has_concessions = features[:, FEATURE_INDEX['has_concessions']] > 0
+        
+        if self.models is not None and self.models.price_model is not None:
+            if price_predictions is None:
+                price_predictions = self.predict_price_change_batch(features)
+            safe_price = np.where(current_price > 0, current_price, 1.0)
+            predicted_drop = (current_price - price_predictions['predicted_price_60d']) / safe_price
+            base_discount = np.clip(predicted_drop + 0.03, 0.02, 0.15)
+        else:
+            base_discount = np.select(
+                [days_on_market > 60, days_on_market > 30, days_on_market > 14],
+                [0.10, 0.07, 0.05], default=0.03
+            )
+        
+        # Less room if already has concessions
+        base_discount = np.where(has_concessions, base_discount * 0.7, base_discount)
+        
+        aggressive_offer = current_price * (1 - base_discount - 0.03)
+        moderate_offer = current_price * (1 - base_discount)
+        conservative_offer = current_price * (1 - base_discount + 0.02)
+        
+        if user_budget:
+            aggressive_offer = np.minimum(aggressive_offer, user_budget * 0.9)
+            moderate_offer = np.minimum(moderate_offer, user_budget * 0.95)
+            conservative_offer = np.minimum(conservative_offer, user_budget)
+        
+        long_listing = days_on_market > 30
+        
+        return {
+            'current_asking': current_price,
+            'aggressive_offer': np.round(aggressive_offer, -1),  # Round to nearest $10
+            'moderate_offer': np.round(moderate_offer, -1),
+            'conservative_offer': np.round(conservative_offer, -1),
+            'max_likely_discount': current_price * base_discount,
+            'aggressive_success': np.where(long_listing, 0.3, 0.2),
+            'moderate_success': np.where(long_listing, 0.6, 0.5),
+            'conservative_success': np.where(long_listing, 0.9, 0.8)
+        }
+    
+    def predict_batch(self, features: np.ndarray, user_budget: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Run every market prediction for many units at once
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            user_budget: User's maximum budget for offer bands
+            
+        Returns:
+            Dictionary of arrays (prices, drop probability, days to lease,
+            concession probability and offer bands), one entry per unit
+        """
+        price_predictions = self.predict_price_change_batch(features)
+        
+        results: Dict[str, np.ndarray] = {}
+        results.update(price_predictions)
+        results.update(self.predict_days_to_lease_batch(features))
+        results.update(self.predict_concession_probability_batch(features))
+        results.update(self.calculate_optimal_offer_price_batch(
+            features, user_budget=user_budget, price_predictions=price_predictions
+        ))
+        return results
+    
+    async def predict_batch_async(self,
+                                  features: np.ndarray,
+                                  user_budget: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Run predict_batch in the compute thread pool
+        
+        Forest traversal releases the GIL, so a thread keeps the event
+        loop free without copying the models into another process.
+        
+        Args:
+            features: Matrix from build_feature_matrix
+            user_budget: User's maximum budget for offer bands
+            
+        Returns:
+            Dictionary of arrays, one entry per unit
+        """
+        # Resolve the lazily loaded models before leaving the event loop thread
+        self.models
+        return await compute_executors.run_numpy(self.predict_batch, features, user_budget=user_budget)
+    
+    def _heuristic_price_change(self, unit_data: Dict, market_data: Dict) -> Dict[str, float]:
+        """Rule-based price forecast used when no trained model is available"""
+        current_price = float(unit_data.get('current_price', 0))
+        days_on_market = unit_data.get('days_on_market', 0)
+        
+        # Price drop probability based on days on market
+        if days_on_market > 60:
+            price_drop_prob = 0.8
+            expected_drop = current_price * 0.05  # 5% drop
+        elif days_on_market > 30:
+            price_drop_prob = 0.6
+            expected_drop = current_price * 0.03  # 3% drop
+        elif days_on_market > 14:
+            price_drop_prob = 0.3
+            expected_drop = current_price * 0.02  # 2% drop
+        else:
+            price_drop_prob = 0.1
+            expected_drop = 0
+        
+        return {
+            'current_price': current_price,
+            'predicted_price_30d': current_price - (expected_drop * 0.5),
+            'predicted_price_60d': current_price - (expected_drop * 0.8),
+            'predicted_price_90d': current_price - expected_drop,
+            'price_drop_probability': price_drop_prob,
+            'expected_drop_amount': expected_drop,
+            'confidence': self._calculate_confidence(unit_data, market_data)
+        }
+    
+    def _heuristic_days_to_lease(self, unit_data: Dict, market_data: Dict) -> Dict[str, Any]:
+        """Rule-based lease timing used when no trained model is available"""
+        current_price = float(unit_data.get('current_price', 0))
+        days_on_market = unit_data.get('days_on_market', 0)
+        has_concessions = bool(unit_data.get('concessions'))
+        
+        # Get market averages
+        avg_days = market_data.get('market_stats', {}).get('avg_days_on_market', 20)
+        avg_price = fallback_market_rent(market_data.get('market_stats', {}).get('avg_rent'), current_price)
+        
+        # Calculate price position
+        price_ratio = current_price / avg_price
+        
+        # Predict days to lease based on factors
+        if price_ratio < 0.9:  # Below market
+            predicted_days = 5 if has_concessions else 10
+        elif price_ratio < 1.1:  # At market
+            predicted_days = 10 if has_concessions else 15
+        else:  # Above market
+            predicted_days = 20 if has_concessions else 30
+        
+        # Adjust for current days on market
+        if days_on_market > 30:
+            predicted_days += 10
+        
+        return {
+            'predicted_days_to_lease': predicted_days,
+            'probability_7_days': 1.0 if predicted_days <= 7 else 0.3,
+            'probability_14_days': 1.0 if predicted_days <= 14 else 0.5,
+            'probability_30_days': 1.0 if predicted_days <= 30 else 0.7,
+            'market_average': avg_days,
+            'relative_speed': 'fast' if predicted_days < avg_days else 'slow'
+        }
+    
+    def _heuristic_concession_probability(self, unit_data: Dict, market_data: Dict) -> Dict[str, Any]:
+        """Rule-based concession forecast used when no trained model is available"""
+        days_on_market = unit_data.get('days_on_market', 0)
+        current_concessions = unit_data.get('concessions', {})
+        
+        # Base probability on days on market
+        if days_on_market > 45:
+            base_prob = 0.9
+            expected_value = 1500  # High concession
+        elif days_on_market > 30:
+            base_prob = 0.7
+            expected_value = 1000  # Medium concession
+        elif days_on_market > 14:
+            base_prob = 0.4
+            expected_value = 500  # Small concession
+        else:
+            base_prob = 0.2
+            expected_value = 0
+        
+        # Adjust if already has concessions
+        if current_concessions:
+            base_prob = min(base_prob + 0.2, 1.0)
+        
+        return {
+            'concession_probability': base_prob,
+            'expected_concession_value': expected_value,
+            'optimal_negotiation_date': self._optimal_negotiation_date(days_on_market).isoformat(),
+            'current_has_concessions': bool(current_concessions),
+            'recommendation': self._get_concession_recommendation(base_prob, days_on_market)
+        }
+    
+    def _heuristic_base_discount(self, days_on_market: int) -> float:
+        """Rule-based negotiation discount from days on market"""
+        if days_on_market > 60:
+            return 0.10  # 10% discount
+        elif days_on_market > 30:
+            return 0.07  # 7% discount
+        elif days_on_market > 14:
+            return 0.05  # 5% discount
+        else:
+            return 0.03  # 3% discount
+    
+    def _optimal_negotiation_date(self, days_on_market: int) -> datetime:
+        """Predict the best date to open negotiations"""
+        if days_on_market < 7:
+            return datetime.now() + timedelta(days=14)
+        elif days_on_market < 14:
+            return datetime.now() + timedelta(days=7)
+        else:
+            return datetime.now() + timedelta(days=3)
+    
     def _prepare_prediction_features(self, unit_data: Dict, market_data: Dict) -> np.ndarray:
-        """Prepare features for prediction models"""
+        """Prepare features for prediction models (see MARKET_FEATURE_NAMES)"""
         features = []
         
         # Unit features
         features.append(float(unit_data.get('current_price', 0)))
         features.append(float(unit_data.get('bedrooms', 1)))
         features.append(float(unit_data.get('bathrooms', 1)))
-        features.append(float(unit_data.get('square_feet', 800)))
+        features.append(float(unit_data.get('square_feet') or 800))
         features.append(float(unit_data.get('days_on_market', 0)))
         
         # Market features
         market_stats = market_data.get('market_stats', {})
-        features.append(float(market_stats.get('avg_rent', 1500)))
+        features.append(fallback_market_rent(market_stats.get('avg_rent'), unit_data.get('current_price', 0)))
         features.append(float(market_stats.get('avg_days_on_market', 20)))
         
         # Binary features
@@ -452,6 +850,10 @@ class MarketPredictor:
         if unit_data.get('price_history'):
             confidence += 0.2
         
+        # Trained models are more reliable than the rule-based fallback
+        if self.models is not None:
+            confidence += 0.1
+        
         return min(confidence, 0.95)
     
     def _get_concession_recommendation(self, probability: float, days_on_market: int) -> str:
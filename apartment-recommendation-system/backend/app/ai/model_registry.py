@@ -0,0 +1,196 @@
+"""
+Versioned model artifact storage and lazy per-process model loading
+"""
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import threading
+
+import joblib
+
+from app.ai.forest_engine import FlatForest, export_forest
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Artifact layout: <MODEL_PATH>/market_predictor/<version>/{models.joblib,metadata.json}
+# plus flat forest exports and the concession model on its own for inference
+MARKET_MODEL_NAME = "market_predictor"
+LATEST_POINTER = "LATEST"
+MODELS_FILE = "models.joblib"
+METADATA_FILE = "metadata.json"
+CONCESSION_MODEL_FILE = "concession_model.joblib"
+PRICE_FOREST_DIR = "price_forest"
+DAYS_ON_MARKET_FOREST_DIR = "days_on_market_forest"
+
+
+@dataclass
+class MarketModelBundle:
+    """Trained MarketPredictor models sharing one feature layout"""
+    version: str
+    feature_names: List[str]
+    price_model: Any  # Multi-output forest: relative price change at 30/60/90 days
+    days_on_market_model: Any  # Forest: days until the unit leases
+    concession_model: Any  # Classifier: concession offered within 30 days
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _model_root(model_path: Optional[str] = None) -> Path:
+    """Directory holding all versions of the market models"""
+    return Path(model_path or settings.MODEL_PATH) / MARKET_MODEL_NAME
+
+
+def save_market_models(bundle: MarketModelBundle, model_path: Optional[str] = None) -> Path:
+    """
+    Persist a trained bundle as a new versioned artifact and mark it latest
+    
+    Args:
+        bundle: Trained models
+        model_path: Override for settings.MODEL_PATH
+    
+    Returns:
+        Directory the artifact was written to
+    """
+    root = _model_root(model_path)
+    version_dir = root / bundle.version
+    version_dir.mkdir(parents=True, exist_ok=True)
+    
+    joblib.dump(
+        {
+            'price_model': bundle.price_model,
+            'days_on_market_model': bundle.days_on_market_model,
+            'concession_model': bundle.concession_model
+        },
+        version_dir / MODELS_FILE,
+        compress=3
+    )
+    
+    # Inference artifacts: forests as flat arrays, the small concession model alone
+    if bundle.price_model is not None:
+        export_forest(bundle.price_model, version_dir / PRICE_FOREST_DIR)
+    if bundle.days_on_market_model is not None:
+        export_forest(bundle.days_on_market_model, version_dir / DAYS_ON_MARKET_FOREST_DIR)
+    joblib.dump(bundle.concession_model, version_dir / CONCESSION_MODEL_FILE)
+    
+    metadata = dict(bundle.metadata)
+    metadata.update({
+        'version': bundle.version,
+        'feature_names': bundle.feature_names,
+        'saved_at': datetime.utcnow().isoformat()
+    })
+    (version_dir / METADATA_FILE).write_text(json.dumps(metadata, indent=2, default=str))
+    
+    # Swap the pointer atomically so readers never see a partial write
+    pointer_tmp = root / f"{LATEST_POINTER}.tmp"
+    pointer_tmp.write_text(bundle.version)
+    pointer_tmp.replace(root / LATEST_POINTER)
+    
+    logger.info(f"Saved market models version {bundle.version} to {version_dir}")
+    return version_dir
+
+
+def load_market_models(version: Optional[str] = None,
+                       model_path: Optional[str] = None) -> Optional[MarketModelBundle]:
+    """
+    Load a market model artifact from disk
+    
+    Args:
+        version: Artifact version, defaults to the latest
+        model_path: Override for settings.MODEL_PATH
+    
+    Returns:
+        Loaded bundle or None if no artifact exists
+    """
+    root = _model_root(model_path)
+    
+    if version is None:
+        pointer = root / LATEST_POINTER
+        if not pointer.exists():
+            return None
+        version = pointer.read_text().strip()
+    
+    version_dir = root / version
+    if not (version_dir / MODELS_FILE).exists():
+        return None
+    
+    metadata = json.loads((version_dir / METADATA_FILE).read_text())
+    
+    if (version_dir / CONCESSION_MODEL_FILE).exists():
+        # Memory-mapped flat forests; the sklearn forests are never unpickled
+        price_dir = version_dir / PRICE_FOREST_DIR
+        dom_dir = version_dir / DAYS_ON_MARKET_FOREST_DIR
+        models = {
+            'price_model': FlatForest.load(price_dir) if price_dir.exists() else None,
+            'days_on_market_model': FlatForest.load(dom_dir) if dom_dir.exists() else None,
+            'concession_model': joblib.load(version_dir / CONCESSION_MODEL_FILE)
+        }
+    else:
+        models = joblib.load(version_dir / MODELS_FILE)
+    
+    return MarketModelBundle(
+        version=version,
+        feature_names=metadata.get('feature_names', []),
+        price_model=models['price_model'],
+        days_on_market_model=models['days_on_market_model'],
+        concession_model=models['concession_model'],
+        metadata=metadata
+    )
+
+
+class ModelRegistry:
+    """
+    Loads trained model artifacts once per process and shares them
+    across requests
+    """
+    
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path
+        self._market_models: Optional[MarketModelBundle] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+    
+    def get_market_models(self) -> Optional[MarketModelBundle]:
+        """
+        Get the latest market models, loading them on first use
+        
+        Returns:
+            Loaded bundle or None if no trained artifact is available
+        """
+        if self._loaded:
+            return self._market_models
+        
+        with self._lock:
+            if not self._loaded:
+                try:
+                    self._market_models = load_market_models(model_path=self.model_path)
+                except Exception as e:
+                    logger.error(f"Error loading market models: {e}")
+                    self._market_models = None
+                
+                if self._market_models:
+                    logger.info(f"Loaded market models version {self._market_models.version}")
+                else:
+                    logger.warning("No trained market models found, using heuristic predictions")
+                self._loaded = True
+        
+        return self._market_models
+    
+    @property
+    def market_model_version(self) -> Optional[str]:
+        """Version of the loaded market models"""
+        bundle = self.get_market_models()
+        return bundle.version if bundle else None
+    
+    def reload(self) -> Optional[MarketModelBundle]:
+        """Drop the cached models and load the latest artifact again"""
+        with self._lock:
+            self._loaded = False
+            self._market_models = None
+        return self.get_market_models()
+
+
+# Shared registry for the process
+model_registry = ModelRegistry()
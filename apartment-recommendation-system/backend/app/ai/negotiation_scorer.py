@@ -2,13 +2,77 @@
 Negotiation scoring and strategy recommendation module
 """
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import logging
 
+from app.core.templating import compile_template
+
 logger = logging.getLogger(__name__)
 
+# Component scores, in scoring_weights order
+SCORE_COMPONENTS = [
+    'days_on_market',
+    'price_history',
+    'concessions',
+    'market_position',
+    'seasonality',
+    'property_occupancy'
+]
+
+# Negotiation script templates by approach, compiled once at import
+SCRIPT_TEMPLATES = {
+    'aggressive': {
+        'opening': compile_template(
+            "I'm very interested in the unit at {{property_name}}. "
+            "I notice it's been available for {{days_on_market}} days. "
+            "Given the extended market time, I'd like to discuss a mutually beneficial arrangement."
+        ),
+        'offer': compile_template(
+            "I'm prepared to sign a lease immediately at ${{offer_price:.0f}}/month, "
+            "with a {{lease_months}}-month lease term. This reflects the current market conditions "
+            "and would help you secure a reliable tenant quickly."
+        ),
+        'concession_request': compile_template(
+            "Additionally, I'd like to discuss available move-in incentives. "
+            "Would you consider waiving the application fee and offering one month free rent?"
+        )
+    },
+    'moderate': {
+        'opening': compile_template(
+            "I'm interested in your unit at {{property_name}}. "
+            "I'm a qualified applicant ready to move quickly. I'd like to discuss the terms."
+        ),
+        'offer': compile_template(
+            "I can offer ${{offer_price:.0f}}/month with a standard lease term. "
+            "I have excellent credit and rental history, and can move in within a week."
+        ),
+        'concession_request': compile_template(
+            "Additionally, I'd like to discuss available move-in incentives. "
+            "Would you consider waiving the application fee and offering one month free rent?"
+        )
+    },
+    'standard': {
+        'opening': compile_template(
+            "I'm very interested in the unit at {{property_name}}. "
+            "I'm a qualified applicant and would like to submit an application."
+        ),
+        'offer': compile_template(
+            "I'm prepared to pay the asking rent with a {{lease_months}}-month lease. "
+            "I have strong credentials and am ready to move forward quickly."
+        ),
+        'concession_request': compile_template(
+            "Are there any move-in specials or incentives currently available?"
+        )
+    }
+}
+
+CLOSING_SCRIPT = compile_template(
+    "I'm ready to submit my application today with all required documentation. "
+    "When would be a good time to finalize the details?"
+)
+
 
 @dataclass
 class NegotiationStrategy:
@@ -22,6 +86,30 @@ class NegotiationStrategy:
     expected_outcome: Dict[str, float]
 
 
+@dataclass
+class NegotiationScores:
+    """Batch negotiation scores, one array element per unit"""
+    components: Dict[str, np.ndarray]  # keyed by SCORE_COMPONENTS
+    total: np.ndarray  # weighted total before rounding
+    score: np.ndarray  # 1-10 integer score
+    
+    @property
+    def potential(self) -> np.ndarray:
+        """'excellent', 'high', 'medium' or 'low' per unit"""
+        return np.select(
+            [self.score >= 8, self.score >= 6, self.score >= 4],
+            ['excellent', 'high', 'medium'], default='low'
+        )
+    
+    def top(self, n: int) -> np.ndarray:
+        """Indices of the n highest-scoring units, best first"""
+        n = min(n, len(self.total))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        best = np.argpartition(-self.total, n - 1)[:n]
+        return best[np.argsort(-self.total[best], kind='stable')]
+
+
 class NegotiationScorer:
     """
     Scores negotiation potential and provides strategy recommendations
@@ -52,12 +140,14 @@ class NegotiationScorer:
         Returns:
             NegotiationStrategy with score and recommendations
         """
+        month = datetime.now().month
+        
         # Calculate component scores
         dom_score = self._score_days_on_market(unit_data.get('days_on_market', 0))
         price_score = self._score_price_history(unit_data.get('price_history', []))
         concession_score = self._score_concessions(unit_data.get('concessions', {}))
         market_score = self._score_market_position(unit_data, market_data)
-        season_score = self._score_seasonality()
+        season_score = self._score_seasonality(month)
         occupancy_score = self._score_property_occupancy(unit_data, market_data)
         
         # Calculate weighted total score
@@ -73,6 +163,14 @@ class NegotiationScorer:
         # Round to 1-10 scale
         final_score = min(10, max(1, int(total_score)))
         
+        return self._build_strategy(final_score, unit_data, market_data, month)
+    
+    def _build_strategy(self,
+                        final_score: int,
+                        unit_data: Dict,
+                        market_data: Dict,
+                        month: int) -> NegotiationStrategy:
+        """Textual strategy for an already scored unit"""
         # Determine negotiation potential
         if final_score >= 8:
             potential = 'excellent'
@@ -86,8 +184,8 @@ class NegotiationScorer:
         # Generate strategy components
         tactics = self._generate_tactics(final_score, unit_data, market_data)
         timing = self._determine_optimal_timing(unit_data, market_data)
-        leverage = self._identify_leverage_points(unit_data, market_data, final_score)
-        risks = self._assess_risks(final_score, unit_data, market_data)
+        leverage = self._identify_leverage_points(unit_data, market_data, final_score, month)
+        risks = self._assess_risks(final_score, unit_data, market_data, month)
         outcome = self._predict_outcome(final_score, unit_data)
         
         return NegotiationStrategy(
@@ -100,6 +198,125 @@ class NegotiationScorer:
             expected_outcome=outcome
         )
     
+    def units_to_columns(self, units: List[Dict], market_data: Dict) -> Dict[str, np.ndarray]:
+        """
+        Convert unit dicts sharing one market context to columnar data
+        
+        Concession text is parsed here, once per unit, so score_batch only
+        does array arithmetic.
+        
+        Args:
+            units: Unit information dicts, as for calculate_negotiation_score
+            market_data: Market context data
+            
+        Returns:
+            Columnar data for score_batch
+        """
+        market_stats = market_data.get('market_stats', {})
+        property_stats = market_data.get('property_stats', {})
+        avg_rent = market_stats.get('avg_rent')
+        
+        return {
+            'days_on_market': np.array([float(u.get('days_on_market', 0)) for u in units]),
+            'price_reductions': np.array([
+                float(self._count_price_reductions(u['price_history'])) if u.get('price_history') else np.nan
+                for u in units
+            ]),
+            'concession_score': self.concession_scores([u.get('concessions', {}) for u in units]),
+            'current_price': np.array([float(u.get('current_price', 0)) for u in units]),
+            'market_avg_rent': np.array([
+                float(avg_rent) if avg_rent is not None else float(u.get('current_price', 0))
+                for u in units
+            ]),
+            'available_units': np.array([
+                float(property_stats[u.get('property_name', '')].get('unit_number', 1))
+                if u.get('property_name', '') in property_stats else np.nan
+                for u in units
+            ])
+        }
+    
+    def concession_scores(self, concessions: List[Dict]) -> np.ndarray:
+        """Concession component score for each unit's concessions"""
+        return np.array([self._score_concessions(c) for c in concessions], dtype=np.float64)
+    
+    def score_batch(self, columns: Any, as_of: Optional[datetime] = None) -> NegotiationScores:
+        """
+        Score many units at once
+        
+        Args:
+            columns: Mapping (dict of arrays or DataFrame) with
+                days_on_market, price_reductions (NaN when there is no
+                price history), concession_score, current_price,
+                market_avg_rent and available_units (NaN when unknown)
+            as_of: Date the seasonality score is taken for, defaults to now
+            
+        Returns:
+            Component scores, weighted totals and 1-10 scores
+        """
+        month = (as_of or datetime.now()).month
+        days_on_market = np.asarray(columns['days_on_market'], dtype=np.float64)
+        reductions = np.asarray(columns['price_reductions'], dtype=np.float64)
+        current_price = np.asarray(columns['current_price'], dtype=np.float64)
+        avg_rent = np.asarray(columns['market_avg_rent'], dtype=np.float64)
+        available = np.asarray(columns['available_units'], dtype=np.float64)
+        
+        price_ratio = np.divide(
+            current_price, avg_rent,
+            out=np.zeros_like(current_price), where=avg_rent != 0
+        )
+        
+        components = {
+            'days_on_market': np.select(
+                [days_on_market >= 60, days_on_market >= 45, days_on_market >= 30,
+                 days_on_market >= 21, days_on_market >= 14, days_on_market >= 7],
+                [10.0, 8.5, 7.0, 5.5, 4.0, 2.5], default=1.0
+            ),
+            'price_history': np.select(
+                [np.isnan(reductions), reductions == 0, reductions == 1, reductions == 2],
+                [5.0, 3.0, 6.0, 8.0], default=10.0
+            ),
+            'concessions': np.asarray(columns['concession_score'], dtype=np.float64),
+            'market_position': np.select(
+                [(current_price == 0) | (avg_rent == 0), price_ratio > 1.15, price_ratio > 1.05, price_ratio > 0.95],
+                [5.0, 8.0, 6.0, 4.0], default=2.0
+            ),
+            'seasonality': np.full(len(days_on_market), self._score_seasonality(month)),
+            'property_occupancy': np.select(
+                [np.isnan(available), available >= 10, available >= 5, available >= 3],
+                [5.0, 9.0, 7.0, 5.0], default=3.0
+            )
+        }
+        
+        total = sum(components[name] * self.scoring_weights[name] for name in SCORE_COMPONENTS)
+        score = np.clip(np.floor(total), 1, 10).astype(np.int64)
+        
+        return NegotiationScores(components=components, total=total, score=score)
+    
+    def strategies_for(self,
+                       scores: NegotiationScores,
+                       indices: Any,
+                       units: List[Dict],
+                       market_data: Dict,
+                       as_of: Optional[datetime] = None) -> List[NegotiationStrategy]:
+        """
+        Build textual strategies for the units a caller actually shows
+        
+        Args:
+            scores: Result of score_batch
+            indices: Positions of the units to describe
+            units: Unit information dicts aligned with the scored batch
+            market_data: Market context data
+            as_of: Date used for seasonal advice, defaults to now
+            
+        Returns:
+            One NegotiationStrategy per index
+        """
+        month = (as_of or datetime.now()).month
+        return [
+            self._build_strategy(int(scores.score[i]), units[i], market_data, month)
+            for i in indices
+        ]
+    
     def _score_days_on_market(self, days_on_market: int) -> float:
         """Score based on days on market"""
         if days_on_market >= 60:
@@ -122,18 +339,7 @@ class NegotiationScorer:
         if not price_history:
             return 5.0  # Neutral score
         
-        # Count price reductions
-        reductions = 0
-        total_reduction_pct = 0
-        
-        for i in range(len(price_history) - 1):
-            old_price = float(price_history[i].get('price', 0))
-            new_price = float(price_history[i + 1].get('price', 0))
-            
-            if old_price > new_price and old_price > 0:
-                reductions += 1
-                reduction_pct = (old_price - new_price) / old_price
-                total_reduction_pct += reduction_pct
+        reductions = self._count_price_reductions(price_history)
         
         if reductions == 0:
             return 3.0  # No reductions = less negotiation room
@@ -144,6 +350,11 @@ class NegotiationScorer:
         else:
             return 10.0  # Multiple reductions = desperate
     
+    def _count_price_reductions(self, price_history: List[Dict]) -> int:
+        """Number of consecutive price drops in a history"""
+        prices = np.array([float(entry.get('price', 0)) for entry in price_history])
+        return int(np.count_nonzero((prices[:-1] > prices[1:]) & (prices[:-1] > 0)))
+    
     def _score_concessions(self, concessions: Dict) -> float:
         """Score based on current concessions"""
         if not concessions:
@@ -184,9 +395,9 @@ class NegotiationScorer:
         else:
             return 2.0  # Below market = less room
     
-    def _score_seasonality(self) -> float:
+    def _score_seasonality(self, month: Optional[int] = None) -> float:
         """Score based on seasonal factors"""
-        month = datetime.now().month
+        month = month or datetime.now().month
         
         # Peak rental season (May-August) = less negotiation power
         if month in [5, 6, 7, 8]:
@@ -275,7 +486,11 @@ class NegotiationScorer:
         else:
             return "Immediate action recommended - maximum leverage"
     
-    def _identify_leverage_points(self, unit_data: Dict, market_data: Dict, score: int) -> List[str]:
+    def _identify_leverage_points(self,
+                                  unit_data: Dict,
+                                  market_data: Dict,
+                                  score: int,
+                                  month: Optional[int] = None) -> List[str]:
         """Identify specific leverage points for negotiation"""
         leverage = []
         
@@ -298,7 +513,7 @@ class NegotiationScorer:
                 leverage.append(f"Above average market time ({dom} vs {avg_days:.0f} days)")
         
         # Seasonal leverage
-        month = datetime.now().month
+        month = month or datetime.now().month
         if month in [11, 12, 1, 2]:
             leverage.append("Off-season timing provides negotiation advantage")
         
@@ -315,7 +530,11 @@ class NegotiationScorer:
         
         return leverage
     
-    def _assess_risks(self, score: int, unit_data: Dict, market_data: Dict) -> List[str]:
+    def _assess_risks(self,
+                      score: int,
+                      unit_data: Dict,
+                      market_data: Dict,
+                      month: Optional[int] = None) -> List[str]:
         """Assess risks in negotiation"""
         risks = []
         
@@ -327,7 +546,7 @@ class NegotiationScorer:
             risks.append("New listing may have multiple interested parties")
         
         # Seasonal risks
-        month = datetime.now().month
+        month = month or datetime.now().month
         if month in [5, 6, 7, 8]:
             risks.append("Peak season reduces negotiation leverage")
         
@@ -395,53 +614,30 @@ class NegotiationScorer:
         Returns:
             Dictionary with script templates
         """
-        scripts = {}
-        
         if strategy.score >= 8:
-            scripts['opening'] = (
-                f"I'm very interested in the unit at {unit_data.get('property_name', 'your property')}. "
-                f"I notice it's been available for {unit_data.get('days_on_market', 'some')} days. "
-                f"Given the extended market time, I'd like to discuss a mutually beneficial arrangement."
-            )
-            scripts['offer'] = (
-                f"I'm prepared to sign a lease immediately at ${unit_data.get('current_price', 0) * 0.9:.0f}/month, "
-                f"with a {12 if strategy.score >= 9 else 15}-month lease term. This reflects the current market conditions "
-                f"and would help you secure a reliable tenant quickly."
-            )
+            approach = 'aggressive'
+            offer_price = unit_data.get('current_price', 0) * 0.9
+            lease_months = 12 if strategy.score >= 9 else 15
         elif strategy.score >= 6:
-            scripts['opening'] = (
-                f"I'm interested in your unit at {unit_data.get('property_name', 'your property')}. "
-                f"I'm a qualified applicant ready to move quickly. I'd like to discuss the terms."
-            )
-            scripts['offer'] = (
-                f"I can offer ${unit_data.get('current_price', 0) * 0.93:.0f}/month with a standard lease term. "
-                f"I have excellent credit and rental history, and can move in within a week."
-            )
+            approach = 'moderate'
+            offer_price = unit_data.get('current_price', 0) * 0.93
+            lease_months = None
         else:
-            scripts['opening'] = (
-                f"I'm very interested in the unit at {unit_data.get('property_name', 'your property')}. "
-                f"I'm a qualified applicant and would like to submit an application."
-            )
-            scripts['offer'] = (
-                f"I'm prepared to pay the asking rent with a {12 or 15}-month lease. "
-                f"I have strong credentials and am ready to move forward quickly."
-            )
-        
-        # Add concession request script
-        if strategy.score >= 6:
-            scripts['concession_request'] = (
-                "Additionally, I'd like to discuss available move-in incentives. "
-                "Would you consider waiving the application fee and offering one month free rent?"
-            )
-        else:
-            scripts['concession_request'] = (
-                "Are there any move-in specials or incentives currently available?"
-            )
+            approach = 'standard'
+            offer_price = None
+            lease_months = 12
+        
+        context = {
+            'property_name': unit_data.get('property_name', 'your property'),
+            'days_on_market': unit_data.get('days_on_market', 'some'),
+            'offer_price': offer_price,
+            'lease_months': lease_months
+        }
         
-        # Add closing script
-        scripts['closing'] = (
-            "I'm ready to submit my application today with all required documentation. "
-            "When would be a good time to finalize the details?"
-        )
+        scripts = {
+            name: template.render(context)
+            for name, template in SCRIPT_TEMPLATES[approach].items()
+        }
+        scripts['closing'] = CLOSING_SCRIPT.render(context)
         
         return scripts
\ No newline at end of file
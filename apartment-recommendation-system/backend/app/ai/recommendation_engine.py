@@ -18,9 +18,56 @@ from app.models.property import Property, Unit, PriceHistory
 from app.models.market import MarketVelocity, AIPrediction, MarketStatus
 from app.models.user import User, UserPreference, Favorite
 from app.ai.feature_extractor import FeatureExtractor
+from app.core.executors import compute_executors, ExecutorBusyError, ExecutorTimeoutError
 
 logger = logging.getLogger(__name__)
 
+# Unit fields used by summarize_market_context
+MARKET_CONTEXT_COLUMNS = ['current_price', 'square_feet', 'days_on_market', 'property_name', 'unit_number']
+
+
+def summarize_market_context(units: List[Dict]) -> Dict:
+    """
+    Compute market statistics and percentiles for candidate units
+    
+    Runs in the compute process pool, so it must stay a module-level
+    function of plain data.
+    
+    Args:
+        units: Unit dicts with MARKET_CONTEXT_COLUMNS
+        
+    Returns:
+        Market context for relative positioning
+    """
+    df = pd.DataFrame(units)
+    
+    # Extract numeric values
+    df['rent_numeric'] = df['current_price'].astype(float)
+    df['sqft_numeric'] = df['square_feet'].fillna(800).astype(int)
+    df['rent_per_sqft'] = df['rent_numeric'] / df['sqft_numeric'].replace(0, 1)
+    df['days_on_market'] = df['days_on_market'].fillna(0).astype(int)
+    
+    context = {
+        'market_stats': {
+            'avg_rent': df['rent_numeric'].mean(),
+            'median_rent': df['rent_numeric'].median(),
+            'avg_days_on_market': df['days_on_market'].mean(),
+            'avg_rent_per_sqft': df['rent_per_sqft'].mean()
+        },
+        'percentiles': {
+            'rent': df['rent_numeric'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict(),
+            'days_on_market': df['days_on_market'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict(),
+            'rent_per_sqft': df['rent_per_sqft'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict()
+        },
+        'property_stats': df.groupby('property_name').agg({
+            'days_on_market': 'mean',
+            'rent_numeric': 'mean',
+            'unit_number': 'count'
+        }).to_dict('index') if 'property_name' in df.columns else {}
+    }
+    
+    return context
+
 
 @dataclass
 class ApartmentIQData:
@@ -280,34 +327,17 @@ class RecommendationEngine:
         if not units:
             return {}
         
-        df = pd.DataFrame(units)
+        # Only ship the columns the summary needs to the worker process
+        rows = [
+            {column: unit.get(column) for column in MARKET_CONTEXT_COLUMNS}
+            for unit in units
+        ]
         
-        # Extract numeric values
-        df['rent_numeric'] = df['current_price'].astype(float)
-        df['sqft_numeric'] = df['square_feet'].fillna(800).astype(int)
-        df['rent_per_sqft'] = df['rent_numeric'] / df['sqft_numeric'].replace(0, 1)
-        df['days_on_market'] = df['days_on_market'].fillna(0).astype(int)
-        
-        context = {
-            'market_stats': {
-                'avg_rent': df['rent_numeric'].mean(),
-                'median_rent': df['rent_numeric'].median(),
-                'avg_days_on_market': df['days_on_market'].mean(),
-                'avg_rent_per_sqft': df['rent_per_sqft'].mean()
-            },
-            'percentiles': {
-                'rent': df['rent_numeric'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict(),
-                'days_on_market': df['days_on_market'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict(),
-                'rent_per_sqft': df['rent_per_sqft'].quantile([0.1, 0.25, 0.5, 0.75, 0.9]).to_dict()
-            },
-            'property_stats': df.groupby('property_name').agg({
-                'days_on_market': 'mean',
-                'rent_numeric': 'mean',
-                'unit_number': 'count'
-            }).to_dict('index') if 'property_name' in df.columns else {}
-        }
-        
-        return context
+        try:
+            return await compute_executors.run_cpu(summarize_market_context, rows)
+        except (ExecutorBusyError, ExecutorTimeoutError) as e:
+            logger.warning(f"Market context unavailable: {e}")
+            return {}
     
     async def _convert_to_iq_data(self, unit: Dict, market_context: Dict, db: AsyncSession) -> Optional[ApartmentIQData]:
         """Convert unit to ApartmentIQ format with full analysis"""
@@ -0,0 +1,322 @@
+"""
+Offline training pipeline for MarketPredictor models
+"""
+from typing import Dict, Any, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import mean_absolute_error, roc_auc_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.market_predictor import MARKET_FEATURE_NAMES, PRICE_HORIZONS
+from app.ai.model_registry import MarketModelBundle
+from app.models.property import Property, Unit, PriceHistory
+from app.models.market import MarketVelocity
+
+logger = logging.getLogger(__name__)
+
+# Below this many samples a model is skipped and predictions stay heuristic
+MIN_TRAINING_SAMPLES = 50
+
+# Horizon over which a concession counts as "offered"
+CONCESSION_HORIZON_DAYS = 30
+
+# Share of the most recent snapshots held out for validation
+VALIDATION_FRACTION = 0.2
+
+
+@dataclass
+class MarketTrainingSet:
+    """Feature matrices and targets for the three market models"""
+    price_features: np.ndarray
+    price_targets: np.ndarray  # Relative change at each of PRICE_HORIZONS
+    dom_features: np.ndarray
+    dom_targets: np.ndarray  # Days from snapshot until the unit leased
+    concession_features: np.ndarray
+    concession_targets: np.ndarray  # 1 if a concession was offered within the horizon
+    typical_concession_value: float
+    # Per sample: when the snapshot was taken and when its target became known
+    price_times: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    dom_times: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    concession_times: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+
+def time_split(recorded_at: np.ndarray,
+               known_at: np.ndarray,
+               validation_fraction: float = VALIDATION_FRACTION) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Train and validation masks that hold out the most recent snapshots
+    
+    Snapshots from the same unit and month are near duplicates, and their
+    targets look forward in time, so a random split scores the models on
+    futures they were trained on. Validation takes every snapshot at or
+    after the cutoff date; training keeps only samples whose target was
+    already known before it.
+    
+    Args:
+        recorded_at: Snapshot time of each sample
+        known_at: Time each sample's target was observed
+        validation_fraction: Share of samples in the validation window
+    
+    Returns:
+        (train mask, validation mask)
+    """
+    order = np.sort(recorded_at)
+    cutoff = order[min(int(len(order) * (1 - validation_fraction)), len(order) - 1)]
+    return known_at < cutoff, recorded_at >= cutoff
+
+
+async def load_training_frames(db: AsyncSession) -> Dict[str, pd.DataFrame]:
+    """
+    Load units, market velocity and price history into data frames
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Dictionary with 'units' and 'history' frames
+    """
+    units_result = await db.execute(
+        select(
+            Unit.id.label('unit_id'),
+            Property.city,
+            Unit.bedrooms,
+            Unit.bathrooms,
+            Unit.square_feet,
+            Unit.is_available,
+            Unit.first_seen_date,
+            Unit.last_seen_date,
+            MarketVelocity.first_seen_date.label('velocity_first_seen'),
+            MarketVelocity.last_seen_date.label('velocity_last_seen'),
+            MarketVelocity.concession_value
+        )
+        .join(Property, Unit.property_id == Property.id)
+        .outerjoin(MarketVelocity, MarketVelocity.unit_id == Unit.id)
+    )
+    units = pd.DataFrame(units_result.all(), columns=list(units_result.keys()))
+    
+    history_result = await db.execute(
+        select(
+            PriceHistory.unit_id,
+            PriceHistory.price,
+            PriceHistory.concessions,
+            PriceHistory.recorded_at
+        ).order_by(PriceHistory.unit_id, PriceHistory.recorded_at)
+    )
+    history = pd.DataFrame(history_result.all(), columns=list(history_result.keys()))
+    
+    return {'units': units, 'history': history}
+
+
+def build_training_set(units: pd.DataFrame, history: pd.DataFrame) -> Optional[MarketTrainingSet]:
+    """
+    Turn price-history snapshots into supervised training samples
+    
+    Every PriceHistory row is an as-of snapshot of its unit. Targets look
+    forward from the snapshot: the price in effect after each horizon, the
+    days until the unit left the market, and whether a concession appeared.
+    
+    Args:
+        units: Unit frame from load_training_frames
+        history: Price history frame from load_training_frames
+    
+    Returns:
+        Training set, or None if there is no usable history
+    """
+    if units.empty or history.empty:
+        return None
+    
+    units = units.drop_duplicates('unit_id').copy()
+    units['first_seen'] = pd.to_datetime(units['first_seen_date'].fillna(units['velocity_first_seen']))
+    units['last_seen'] = pd.to_datetime(units['last_seen_date'].fillna(units['velocity_last_seen']))
+    
+    snapshots = history.copy()
+    snapshots['recorded_at'] = pd.to_datetime(snapshots['recorded_at'], utc=True).dt.tz_localize(None)
+    snapshots['price'] = snapshots['price'].astype(float)
+    snapshots['has_concessions'] = snapshots['concessions'].apply(lambda c: 1.0 if c else 0.0)
+    snapshots = snapshots.merge(units, on='unit_id', how='inner')
+    if snapshots.empty:
+        return None
+    
+    first_seen = snapshots['first_seen'].fillna(snapshots.groupby('unit_id')['recorded_at'].transform('min'))
+    snapshots['days_on_market'] = (snapshots['recorded_at'] - first_seen).dt.days.clip(lower=0)
+    last_history = snapshots.groupby('unit_id')['recorded_at'].transform('max')
+    snapshots['observed_until'] = snapshots['last_seen'].where(
+        snapshots['last_seen'] > last_history, last_history
+    )
+    
+    # Market context: comparable units (city, bedrooms) in the same month
+    snapshots['month'] = snapshots['recorded_at'].dt.to_period('M')
+    market = snapshots.groupby(['city', 'bedrooms', 'month']).agg(
+        market_avg_rent=('price', 'mean'),
+        market_avg_days_on_market=('days_on_market', 'mean')
+    ).reset_index()
+    snapshots = snapshots.merge(market, on=['city', 'bedrooms', 'month'], how='left')
+    
+    snapshots['current_price'] = snapshots['price']
+    snapshots['bathrooms'] = snapshots['bathrooms'].astype(float)
+    snapshots['square_feet'] = snapshots['square_feet'].fillna(800).astype(float)
+    snapshots = snapshots.sort_values('recorded_at').reset_index(drop=True)
+    
+    lookup = snapshots[['unit_id', 'recorded_at', 'price', 'has_concessions']].rename(
+        columns={'recorded_at': 'as_of', 'price': 'future_price', 'has_concessions': 'future_concessions'}
+    ).sort_values('as_of')
+    
+    # Price in effect at each horizon (last recorded price at or before it)
+    price_targets = []
+    price_valid = np.ones(len(snapshots), dtype=bool)
+    for horizon in PRICE_HORIZONS:
+        target_time = snapshots[['unit_id', 'recorded_at']].copy()
+        target_time['as_of'] = target_time['recorded_at'] + pd.Timedelta(days=horizon)
+        future = pd.merge_asof(
+            target_time.reset_index().sort_values('as_of'),
+            lookup, on='as_of', by='unit_id', direction='backward'
+        ).set_index('index').sort_index()
+        
+        price_valid &= (snapshots['observed_until'] >= target_time['as_of']).to_numpy()
+        price_targets.append((future['future_price'] / snapshots['price'] - 1).to_numpy())
+        
+        if horizon == CONCESSION_HORIZON_DAYS:
+            concession_targets = future['future_concessions'].to_numpy()
+            concession_valid = (snapshots['observed_until'] >= target_time['as_of']).to_numpy()
+    
+    price_targets = np.column_stack(price_targets)
+    features = snapshots[MARKET_FEATURE_NAMES].astype(float).to_numpy()
+    recorded_at = snapshots['recorded_at'].to_numpy()
+    
+    # Days to lease: only units that have left the market have a known outcome
+    leased = (~snapshots['is_available'].astype(bool)) & snapshots['last_seen'].notna()
+    dom_targets = (snapshots['last_seen'] - snapshots['recorded_at'].dt.normalize()).dt.days
+    
+    concession_values = units['concession_value'].dropna().astype(float)
+    concession_values = concession_values[concession_values > 0]
+    
+    return MarketTrainingSet(
+        price_features=features[price_valid],
+        price_targets=price_targets[price_valid],
+        dom_features=features[leased.to_numpy()],
+        dom_targets=dom_targets[leased].clip(lower=0).to_numpy(dtype=float),
+        concession_features=features[concession_valid],
+        concession_targets=concession_targets[concession_valid].astype(int),
+        typical_concession_value=float(concession_values.median()) if len(concession_values) else 1000.0,
+        price_times=(
+            recorded_at[price_valid],
+            recorded_at[price_valid] + np.timedelta64(max(PRICE_HORIZONS), 'D')
+        ),
+        dom_times=(recorded_at[leased.to_numpy()], snapshots['last_seen'][leased].to_numpy()),
+        concession_times=(
+            recorded_at[concession_valid],
+            recorded_at[concession_valid] + np.timedelta64(CONCESSION_HORIZON_DAYS, 'D')
+        )
+    )
+
+
+def fit_market_models(training_set: MarketTrainingSet,
+                      version: Optional[str] = None) -> MarketModelBundle:
+    """
+    Fit the price, days-on-market and concession models
+    
+    Args:
+        training_set: Output of build_training_set
+        version: Artifact version, defaults to a UTC timestamp
+    
+    Returns:
+        Bundle ready to be saved with save_market_models
+    """
+    version = version or datetime.utcnow().strftime("v%Y%m%d%H%M%S")
+    metrics: Dict[str, Any] = {}
+    
+    # Each model trains on older snapshots and is scored on the most recent window
+    price_model = None
+    train, test = _split(training_set.price_targets, training_set.price_times)
+    if train.sum() >= MIN_TRAINING_SAMPLES:
+        X_train, y_train = training_set.price_features[train], training_set.price_targets[train]
+        X_test, y_test = training_set.price_features[test], training_set.price_targets[test]
+        price_model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1)
+        price_model.fit(X_train, y_train)
+        metrics['price_samples'] = len(training_set.price_targets)
+        if len(y_test):
+            predictions = price_model.predict(X_test)
+            for i, horizon in enumerate(PRICE_HORIZONS):
+                metrics[f'price_change_mae_{horizon}d'] = float(mean_absolute_error(y_test[:, i], predictions[:, i]))
+    else:
+        logger.warning(f"Only {int(train.sum())} price samples before the validation window, skipping price model")
+    
+    days_on_market_model = None
+    train, test = _split(training_set.dom_targets, training_set.dom_times)
+    if train.sum() >= MIN_TRAINING_SAMPLES:
+        X_train, y_train = training_set.dom_features[train], training_set.dom_targets[train]
+        X_test, y_test = training_set.dom_features[test], training_set.dom_targets[test]
+        days_on_market_model = RandomForestRegressor(n_estimators=50, max_depth=8, random_state=42, n_jobs=-1)
+        days_on_market_model.fit(X_train, y_train)
+        metrics['dom_samples'] = len(training_set.dom_targets)
+        if len(y_test):
+            metrics['days_to_lease_mae'] = float(mean_absolute_error(y_test, days_on_market_model.predict(X_test)))
+    else:
+        logger.warning(f"Only {int(train.sum())} leased samples before the validation window, skipping days-on-market model")
+    
+    concession_model = None
+    train, test = _split(training_set.concession_targets, training_set.concession_times)
+    if (train.sum() >= MIN_TRAINING_SAMPLES
+            and len(np.unique(training_set.concession_targets[train])) == 2):
+        X_train, y_train = training_set.concession_features[train], training_set.concession_targets[train]
+        X_test, y_test = training_set.concession_features[test], training_set.concession_targets[test]
+        concession_model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+        concession_model.fit(X_train, y_train)
+        metrics['concession_samples'] = len(training_set.concession_targets)
+        if len(np.unique(y_test)) == 2:
+            metrics['concession_auc'] = float(roc_auc_score(y_test, concession_model.predict_proba(X_test)[:, 1]))
+    else:
+        logger.warning("Not enough labelled concession samples, skipping concession model")
+    
+    return MarketModelBundle(
+        version=version,
+        feature_names=list(MARKET_FEATURE_NAMES),
+        price_model=price_model,
+        days_on_market_model=days_on_market_model,
+        concession_model=concession_model,
+        metadata={
+            'trained_at': datetime.utcnow().isoformat(),
+            'price_horizons': PRICE_HORIZONS,
+            'typical_concession_value': training_set.typical_concession_value,
+            'metrics': metrics
+        }
+    )
+
+
+def _split(targets: np.ndarray, times: Optional[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Time split of a model's samples; without times everything trains"""
+    if times is None or not len(targets):
+        return np.ones(len(targets), dtype=bool), np.zeros(len(targets), dtype=bool)
+    return time_split(*times)
+
+
+async def train_market_models(db: AsyncSession, version: Optional[str] = None) -> Optional[MarketModelBundle]:
+    """
+    Build training data from the database and fit all market models
+    
+    Args:
+        db: Database session
+        version: Artifact version, defaults to a UTC timestamp
+    
+    Returns:
+        Trained bundle, or None if there is no usable history
+    """
+    frames = await load_training_frames(db)
+    training_set = build_training_set(frames['units'], frames['history'])
+    
+    if training_set is None:
+        logger.warning("No price history available, nothing to train")
+        return None
+    
+    bundle = fit_market_models(training_set, version=version)
+    logger.info(f"Trained market models {bundle.version}: {bundle.metadata['metrics']}")
+    return bundle
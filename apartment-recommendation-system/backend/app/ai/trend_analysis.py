@@ -0,0 +1,312 @@
+"""
+Vectorized price trend regression over many series at once
+"""
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+
+import numpy as np
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.property import Property, Unit, PriceHistory
+from app.models.market import MarketTrend
+
+logger = logging.getLogger(__name__)
+
+# Slope (dollars per period) beyond which a trend counts as moving
+TREND_SLOPE_THRESHOLD = 50
+
+# Coefficient of variation cut-offs for the volatility classes
+HIGH_VOLATILITY_CV = 0.2
+MEDIUM_VOLATILITY_CV = 0.1
+
+# Length of one period in days, the unit of the regression x axis
+PERIOD_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+
+# Number of periods of price history a market trend is fitted over
+TREND_WINDOW_PERIODS = 6
+
+
+@dataclass
+class GroupTrends:
+    """Per-series regression results, aligned with keys"""
+    keys: np.ndarray
+    count: np.ndarray
+    slope: np.ndarray
+    mean: np.ndarray
+    median: np.ndarray
+    std: np.ndarray
+    cv: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    
+    @property
+    def trend_direction(self) -> np.ndarray:
+        """'increasing', 'decreasing', 'stable' or 'insufficient_data' per series"""
+        direction = np.select(
+            [self.slope > TREND_SLOPE_THRESHOLD, self.slope < -TREND_SLOPE_THRESHOLD],
+            ['increasing', 'decreasing'], default='stable'
+        )
+        return np.where(self.count > 1, direction, 'insufficient_data')
+    
+    @property
+    def volatility(self) -> np.ndarray:
+        """'high', 'medium', 'low' or 'unknown' per series"""
+        volatility = np.select(
+            [self.cv > HIGH_VOLATILITY_CV, self.cv > MEDIUM_VOLATILITY_CV],
+            ['high', 'medium'], default='low'
+        )
+        return np.where(self.count > 1, volatility, 'unknown')
+    
+    @property
+    def seasonality_detected(self) -> np.ndarray:
+        """Simple seasonality check (would be more complex in production)"""
+        return (self.count > 12) & (self.cv > 0.15)
+    
+    def to_records(self) -> Dict[Any, Dict[str, Any]]:
+        """
+        Per-series results in the analyze_market_trends format
+        
+        Returns:
+            Dictionary keyed by series key
+        """
+        directions = self.trend_direction
+        volatility = self.volatility
+        seasonality = self.seasonality_detected
+        records = {}
+        
+        for i, key in enumerate(self.keys.tolist()):
+            if self.count[i] <= 1:
+                records[key] = {
+                    'trend_direction': 'insufficient_data',
+                    'trend_strength': 0,
+                    'volatility': 'unknown',
+                    'seasonality_detected': False
+                }
+                continue
+            
+            records[key] = {
+                'trend_direction': str(directions[i]),
+                'trend_strength': float(abs(self.slope[i])),
+                'volatility': str(volatility[i]),
+                'seasonality_detected': bool(seasonality[i]),
+                'average_price': float(self.mean[i]),
+                'price_range': {
+                    'min': float(self.min[i]),
+                    'max': float(self.max[i])
+                }
+            }
+        
+        return records
+
+
+def group_trends(keys: Any, y: Any, x: Optional[Any] = None) -> GroupTrends:
+    """
+    Fit an OLS line to every series of a long-format array in one pass
+    
+    Slopes come from grouped sums of centred x and y, so the cost is a
+    handful of bincounts and one sort regardless of the number of series.
+    
+    Args:
+        keys: Series key of each observation
+        y: Observed value (price) of each observation
+        x: Position of each observation (e.g. periods since a start date);
+            defaults to its index within the series, in input order
+    
+    Returns:
+        Regression results per distinct key, sorted by key
+    """
+    keys = np.asarray(keys)
+    y = np.asarray(y, dtype=np.float64)
+    
+    groups, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    n_groups = len(groups)
+    count = np.bincount(inverse, minlength=n_groups)
+    starts = np.cumsum(count) - count
+    
+    if x is None:
+        order = np.argsort(inverse, kind='stable')
+        x = np.empty(len(y), dtype=np.float64)
+        x[order] = np.arange(len(y)) - np.repeat(starts, count)
+    else:
+        x = np.asarray(x, dtype=np.float64)
+    
+    mean_x = np.bincount(inverse, weights=x, minlength=n_groups) / count
+    mean_y = np.bincount(inverse, weights=y, minlength=n_groups) / count
+    dx = x - mean_x[inverse]
+    dy = y - mean_y[inverse]
+    
+    sxx = np.bincount(inverse, weights=dx * dx, minlength=n_groups)
+    sxy = np.bincount(inverse, weights=dx * dy, minlength=n_groups)
+    syy = np.bincount(inverse, weights=dy * dy, minlength=n_groups)
+    
+    slope = np.divide(sxy, sxx, out=np.zeros(n_groups), where=sxx > 0)
+    std = np.sqrt(syy / count)
+    cv = np.divide(std, mean_y, out=np.zeros(n_groups), where=mean_y > 0)
+    
+    # Sorted by series then value: min/max/median are positional lookups
+    sorted_y = y[np.lexsort((y, inverse))]
+    last = starts + count - 1
+    median = (sorted_y[starts + (count - 1) // 2] + sorted_y[starts + count // 2]) / 2
+    
+    return GroupTrends(
+        keys=groups,
+        count=count,
+        slope=slope,
+        mean=mean_y,
+        median=median,
+        std=std,
+        cv=cv,
+        min=sorted_y[starts],
+        max=sorted_y[last]
+    )
+
+
+def _average_price(stats: Dict[str, Any], bedrooms: int) -> Optional[float]:
+    """Average asking price of available units with the given bedroom count"""
+    units, price_sum = stats['by_bedrooms'].get(bedrooms, (0, 0.0))
+    return round(price_sum / units, 2) if units else None
+
+
+async def refresh_market_trends(db: AsyncSession,
+                                period_type: str = 'monthly',
+                                as_of: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Recompute MarketTrend rows for every city and zip code in one job
+    
+    Args:
+        db: Database session
+        period_type: 'daily', 'weekly' or 'monthly'
+        as_of: End of the trend window, defaults to now
+    
+    Returns:
+        Number of city and zip trend rows written
+    """
+    if period_type not in PERIOD_DAYS:
+        raise ValueError(f"Unknown period type: {period_type}")
+    
+    as_of = as_of or datetime.utcnow()
+    period_days = PERIOD_DAYS[period_type]
+    window_start = as_of - timedelta(days=period_days * TREND_WINDOW_PERIODS)
+    
+    history_result = await db.execute(
+        select(
+            PriceHistory.price,
+            PriceHistory.recorded_at,
+            Property.city,
+            Property.state,
+            Property.zip_code
+        )
+        .join(Unit, PriceHistory.unit_id == Unit.id)
+        .join(Property, Unit.property_id == Property.id)
+        .where(
+            and_(
+                PriceHistory.recorded_at >= window_start,
+                PriceHistory.recorded_at <= as_of
+            )
+        )
+    )
+    history = history_result.all()
+    
+    if not history:
+        logger.info("No price history in the trend window")
+        return {'cities': 0, 'zip_codes': 0}
+    
+    prices = np.array([float(row.price) for row in history])
+    periods = np.array([
+        (row.recorded_at.replace(tzinfo=None) - window_start).total_seconds() / 86400 / period_days
+        for row in history
+    ])
+    city_keys = np.array([f"{row.city}|{row.state}" for row in history])
+    zip_keys = np.array([f"{row.city}|{row.state}|{row.zip_code}" for row in history])
+    has_zip = np.array([bool(row.zip_code) for row in history])
+    
+    # Current inventory by area and bedroom count
+    inventory_result = await db.execute(
+        select(
+            Property.city,
+            Property.state,
+            Property.zip_code,
+            Unit.bedrooms,
+            func.count(Unit.id).label('units'),
+            func.sum(Unit.current_price).label('price_sum'),
+            func.sum(Unit.days_on_market).label('dom_sum')
+        )
+        .join(Property, Unit.property_id == Property.id)
+        .where(and_(Unit.is_available == True, Property.is_active == True))
+        .group_by(Property.city, Property.state, Property.zip_code, Unit.bedrooms)
+    )
+    inventory: Dict[str, Dict[str, Any]] = {}
+    for row in inventory_result.all():
+        keys = [f"{row.city}|{row.state}"]
+        if row.zip_code:
+            keys.append(f"{row.city}|{row.state}|{row.zip_code}")
+        for key in keys:
+            stats = inventory.setdefault(key, {'units': 0, 'dom_sum': 0.0, 'by_bedrooms': {}})
+            stats['units'] += row.units
+            stats['dom_sum'] += float(row.dom_sum or 0)
+            units, price_sum = stats['by_bedrooms'].get(row.bedrooms, (0, 0.0))
+            stats['by_bedrooms'][row.bedrooms] = (units + row.units, price_sum + float(row.price_sum or 0))
+    
+    existing_result = await db.execute(
+        select(MarketTrend).where(
+            and_(
+                MarketTrend.period_type == period_type,
+                MarketTrend.period_end == as_of.date()
+            )
+        )
+    )
+    existing = {
+        f"{trend.city}|{trend.state}" + (f"|{trend.zip_code}" if trend.zip_code is not None else ""): trend
+        for trend in existing_result.scalars().all()
+    }
+    
+    written = {}
+    levels = (
+        ('cities', group_trends(city_keys, prices, periods)),
+        ('zip_codes', group_trends(zip_keys[has_zip], prices[has_zip], periods[has_zip]))
+    )
+    for level, trends in levels:
+        directions = trends.trend_direction
+        volatility = trends.volatility
+        
+        for i, key in enumerate(trends.keys.tolist()):
+            parts = key.split('|')
+            trend = existing.get(key)
+            if trend is None:
+                trend = MarketTrend(
+                    city=parts[0],
+                    state=parts[1],
+                    zip_code=parts[2] if len(parts) > 2 else None,
+                    period_type=period_type
+                )
+                db.add(trend)
+            
+            stats = inventory.get(key, {'units': 0, 'dom_sum': 0.0, 'by_bedrooms': {}})
+            
+            trend.period_start = window_start.date()
+            trend.period_end = as_of.date()
+            trend.avg_price_1br = _average_price(stats, 1)
+            trend.avg_price_2br = _average_price(stats, 2)
+            trend.avg_price_3br = _average_price(stats, 3)
+            trend.median_price = round(float(trends.median[i]), 2)
+            trend.min_price = round(float(trends.min[i]), 2)
+            trend.max_price = round(float(trends.max[i]), 2)
+            trend.price_change_amount = round(float(trends.slope[i]), 2)
+            trend.price_change_percentage = (
+                float(trends.slope[i] / trends.mean[i] * 100) if trends.mean[i] > 0 else None
+            )
+            trend.trend_direction = str(directions[i])
+            trend.price_volatility = float(trends.cv[i])
+            trend.volatility_class = str(volatility[i])
+            trend.total_units_available = stats['units']
+            trend.avg_days_on_market = stats['dom_sum'] / stats['units'] if stats['units'] else None
+        
+        written[level] = len(trends.keys)
+    
+    await db.commit()
+    logger.info(f"Refreshed {period_type} market trends: {written}")
+    return written
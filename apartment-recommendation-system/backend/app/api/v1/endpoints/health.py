@@ -10,6 +10,12 @@ from datetime import datetime
 
 from app.db.base import get_db
 from app.core.config import settings
+from app.core.executors import compute_executors
+from app.core.templating import template_cache
+from app.services.prediction_service import prediction_service
+from app.services.search_cache import search_cache
+from app.services.search_counts import search_counter
+from app.services.search_facets import facet_service
 
 router = APIRouter()
 
@@ -132,6 +138,12 @@ async def get_metrics(db: AsyncSession = Depends(get_db)):
             }
         },
         "database": db_metrics,
+        "executors": compute_executors.get_metrics(),
+        "prediction_cache": prediction_service.cache.stats(),
+        "template_cache": template_cache.stats(),
+        "count_cache": search_counter.cache.stats(),
+        "facet_cache": facet_service.cache.stats(),
+        "search_cache": search_cache.stats(),
         "application": {
             "name": settings.APP_NAME,
             "version": settings.APP_VERSION,
@@ -13,6 +13,9 @@ from app.models.market import MarketVelocity, MarketTrend, AIPrediction, MarketS
 from app.models.property import Property, Unit, PriceHistory
 from app.models.user import User
 from app.api.v1.endpoints.auth import get_current_user
+from app.core.executors import ExecutorBusyError, ExecutorTimeoutError
+from app.services.prediction_service import prediction_service
+from app.services.negotiation_leaderboard import negotiation_leaderboard
 
 router = APIRouter()
 
@@ -63,6 +66,8 @@ async def get_market_trends(
                 "avg_price_3br": float(trend.avg_price_3br) if trend.avg_price_3br else None,
                 "median_price": float(trend.median_price) if trend.median_price else None,
                 "price_change_percentage": trend.price_change_percentage,
+                "trend_direction": trend.trend_direction,
+                "volatility": trend.volatility_class,
                 "total_units_available": trend.total_units_available,
                 "avg_days_on_market": trend.avg_days_on_market,
                 "vacancy_rate": trend.vacancy_rate
@@ -358,7 +363,16 @@ async def get_unit_predictions(
             detail="Unit not found"
         )
     
-    # Get predictions
+    # Live market predictions, served from cache while the unit's state is unchanged
+    try:
+        market_predictions, cached = await prediction_service.get_unit_predictions(unit, db)
+    except (ExecutorBusyError, ExecutorTimeoutError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Prediction service is busy, please retry"
+        )
+    
+    # Stored recommendation for this user, if one has been generated
     query = select(AIPrediction).where(AIPrediction.unit_id == unit_id)
     
     if current_user:
@@ -377,14 +391,10 @@ async def get_unit_predictions(
     result = await db.execute(query)
     prediction = result.scalar_one_or_none()
     
-    if not prediction:
-        return {
-            "unit_id": str(unit_id),
-            "message": "No predictions available for this unit"
-        }
-    
     return {
         "unit_id": str(unit_id),
+        "source": "cache" if cached else "fresh",
+        "market_predictions": market_predictions,
         "prediction": {
             "recommendation_score": float(prediction.recommendation_score),
             "negotiation_score": prediction.negotiation_score,
@@ -401,7 +411,47 @@ async def get_unit_predictions(
             "prediction_date": prediction.prediction_date,
             "model_version": prediction.model_version,
             "explanation": prediction.explanation
-        }
+        } if prediction else None
+    }
+
+
+@router.get("/negotiation-leaderboard")
+async def get_negotiation_leaderboard(
+    city: str,
+    bedrooms: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the units with the most negotiation leverage in a city
+    """
+    rows = await negotiation_leaderboard.get_page(db, city, bedrooms=bedrooms, skip=skip, limit=limit)
+    
+    return {
+        "city": city,
+        "bedrooms": bedrooms,
+        "skip": skip,
+        "limit": limit,
+        "units": [
+            {
+                "rank": skip + i + 1,
+                "unit_id": str(row.unit_id),
+                "property_id": str(row.property_id),
+                "property_name": row.property_name,
+                "unit_number": row.unit_number,
+                "bedrooms": row.bedrooms,
+                "current_price": float(row.current_price),
+                "days_on_market": row.days_on_market,
+                "has_concessions": row.has_concessions,
+                "negotiation_score": row.negotiation_score,
+                "negotiation_potential": row.negotiation_potential,
+                "total_score": round(row.total_score, 3),
+                "component_scores": row.component_scores,
+                "scored_at": row.scored_at
+            }
+            for i, row in enumerate(rows)
+        ]
     }
 
 
@@ -3,7 +3,7 @@ Offer generation and management endpoints
 """
 from typing import List, Optional, Annotated
 from datetime import datetime, timedelta, date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, desc
 from uuid import UUID
@@ -13,7 +13,15 @@ from app.models.offer import Offer, OfferTemplate, OfferStatus
 from app.models.property import Unit, Property
 from app.models.user import User
 from app.api.v1.endpoints.auth import get_current_active_user
-from app.services.offer_service import generate_offer_pdf, send_offer_email
+from app.core.pagination import CursorError
+from app.core.templating import TemplateError
+from app.services.offer_service import (
+    generate_offer_pdf,
+    send_offer_email,
+    get_compiled_offer_template,
+    offer_template_context
+)
+from app.services.orderings import OFFER_KEYSET
 
 router = APIRouter()
 
@@ -23,11 +31,15 @@ async def get_user_offers(
     status: Optional[OfferStatus] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    response: Response = None,
     current_user: Annotated[User, Depends(get_current_active_user)],
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get current user's offers
+    Get current user's offers, newest first
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
     from sqlalchemy.orm import selectinload
     
@@ -43,10 +55,17 @@ async def get_user_offers(
     if status:
         query = query.where(Offer.status == status)
     
-    query = query.order_by(desc(Offer.created_at)).offset(skip).limit(limit)
+    # Keyset pagination; skip still works as an offset without a cursor
+    try:
+        query = OFFER_KEYSET.apply(query, cursor, limit, skip)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     result = await db.execute(query)
-    offers = result.scalars().all()
+    rows, next_cursor = OFFER_KEYSET.page(result.all(), limit)
+    offers = [row[0] for row in rows]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         {
@@ -155,8 +174,16 @@ async def generate_offer(
         template = template_result.scalar_one_or_none()
         
         if template:
-            # TODO: Process template with user and property data
-            offer.cover_letter = template.body_template
+            try:
+                compiled = get_compiled_offer_template(template)
+                _, offer.cover_letter = compiled.render(
+                    offer_template_context(offer, unit, unit.property, current_user)
+                )
+            except TemplateError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Cannot use offer template: {e}"
+                )
     
     db.add(offer)
     await db.commit()
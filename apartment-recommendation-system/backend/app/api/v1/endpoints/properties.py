@@ -2,9 +2,9 @@
 Property management endpoints
 """
 from typing import List, Optional, Annotated
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, desc
 from uuid import UUID
 
 from app.db.base import get_db
@@ -18,8 +18,16 @@ from app.schemas.property import (
     PropertyReview as PropertyReviewSchema,
     PropertyReviewCreate
 )
+from app.schemas.search import PropertySortBy
 from app.api.v1.endpoints.auth import get_current_active_user
 from app.core.config import settings
+from app.core.pagination import CursorError
+from app.services.geo_index import geo_index
+from app.services.geo_search import geo_search, with_distances
+from app.services.inventory_hooks import on_property_written
+from app.services.orderings import property_keyset
+from app.services.search_counts import count_key, search_counter
+from app.services.text_search import text_search
 
 router = APIRouter()
 
@@ -34,10 +42,14 @@ async def get_properties(
     max_price: Optional[float] = None,
     bedrooms: Optional[int] = None,
     is_active: bool = True,
+    cursor: Optional[str] = None,
+    response: Response = None,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get list of properties with optional filters
+    Get list of properties with optional filters, newest first
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
     query = select(Property).where(Property.is_active == is_active)
     
@@ -47,24 +59,30 @@ async def get_properties(
     if state:
         query = query.where(Property.state.ilike(f"%{state}%"))
     
-    # Price filter requires joining with units
+    # Price and bedroom filters match on the property's units
     if min_price is not None or max_price is not None or bedrooms is not None:
-        query = query.join(Unit)
+        unit_query = select(Unit.property_id)
         if min_price is not None:
-            query = query.where(Unit.current_price >= min_price)
+            unit_query = unit_query.where(Unit.current_price >= min_price)
         if max_price is not None:
-            query = query.where(Unit.current_price <= max_price)
+            unit_query = unit_query.where(Unit.current_price <= max_price)
         if bedrooms is not None:
-            query = query.where(Unit.bedrooms == bedrooms)
-        query = query.distinct()
+            unit_query = unit_query.where(Unit.bedrooms == bedrooms)
+        query = query.where(Property.id.in_(unit_query))
     
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
+    # Keyset pagination; skip still works as an offset without a cursor
+    keyset = property_keyset(PropertySortBy.NEWEST)
+    try:
+        query = keyset.apply(query, cursor, limit, skip)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     result = await db.execute(query)
-    properties = result.scalars().all()
+    rows, next_cursor = keyset.page(result.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return properties
+    return [row[0] for row in rows]
 
 
 @router.get("/search", response_model=dict)
@@ -78,23 +96,23 @@ async def search_properties(
     max_bedrooms: Optional[int] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    exact_total: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Search properties by name, address, or description
+    
+    Broad searches may report the planner's estimate as total unless
+    exact_total is set; total_exact says which one was returned.
     """
-    # Build search query
-    search_conditions = or_(
-        Property.name.ilike(f"%{q}%"),
-        Property.address.ilike(f"%{q}%"),
-        Property.description.ilike(f"%{q}%"),
-        Property.city.ilike(f"%{q}%")
-    )
+    # Full-text match over name, address, city and description
+    await text_search.refresh(db)
+    text_match, text_rank = text_search.match(q)
     
     query = select(Property).where(
         and_(
             Property.is_active == True,
-            search_conditions
+            text_match
         )
     )
     
@@ -104,35 +122,43 @@ async def search_properties(
     if state:
         query = query.where(Property.state.ilike(f"%{state}%"))
     
-    # For price and bedroom filters, join with units
+    # Price and bedroom filters match on available units
     if any([min_price, max_price, min_bedrooms, max_bedrooms]):
-        query = query.join(Unit).where(Unit.is_available == True)
+        unit_query = select(Unit.property_id).where(Unit.is_available == True)
         
         if min_price is not None:
-            query = query.where(Unit.current_price >= min_price)
+            unit_query = unit_query.where(Unit.current_price >= min_price)
         if max_price is not None:
-            query = query.where(Unit.current_price <= max_price)
+            unit_query = unit_query.where(Unit.current_price <= max_price)
         if min_bedrooms is not None:
-            query = query.where(Unit.bedrooms >= min_bedrooms)
+            unit_query = unit_query.where(Unit.bedrooms >= min_bedrooms)
         if max_bedrooms is not None:
-            query = query.where(Unit.bedrooms <= max_bedrooms)
+            unit_query = unit_query.where(Unit.bedrooms <= max_bedrooms)
         
-        query = query.distinct()
-    
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # Apply pagination
-    query = query.offset(skip).limit(limit)
+        query = query.where(Property.id.in_(unit_query))
+    
+    # Total from the count cache or planner estimate, else counted with the page
+    count = await search_counter.begin(db, query, count_key("properties:search", {
+        "q": q,
+        "city": city,
+        "state": state,
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_bedrooms": min_bedrooms,
+        "max_bedrooms": max_bedrooms
+    }), exact_total)
+    
+    # Best matches first
+    query = count.fold(query).order_by(desc(text_rank), Property.id).offset(skip).limit(limit)
     
     result = await db.execute(query)
-    properties = result.scalars().all()
+    properties = [row[0] for row in count.take(result.all())]
+    await search_counter.finish(db, count)
     
     return {
         "results": properties,
-        "total": total,
+        "total": count.total,
+        "total_exact": count.exact,
         "skip": skip,
         "limit": limit,
         "query": q
@@ -208,6 +234,7 @@ async def create_property(
     db.add(property)
     await db.commit()
     await db.refresh(property)
+    await on_property_written(db, property, created=True)
     
     return property
 
@@ -241,11 +268,13 @@ async def update_property(
     
     # Update property
     update_data = property_update.model_dump(exclude_unset=True)
+    changed_fields = {field for field, value in update_data.items() if getattr(property, field) != value}
     for field, value in update_data.items():
         setattr(property, field, value)
     
     await db.commit()
     await db.refresh(property)
+    await on_property_written(db, property, changed_fields)
     
     return property
 
@@ -279,6 +308,7 @@ async def delete_property(
     # Soft delete (set is_active to False)
     property.is_active = False
     await db.commit()
+    await on_property_written(db, property, {'is_active'})
     
     return {"message": "Property deleted successfully"}
 
@@ -423,6 +453,7 @@ async def create_property_review(
     
     await db.commit()
     await db.refresh(review)
+    await on_property_written(db, property, {'rating', 'review_count'})
     
     return review
 
@@ -455,27 +486,38 @@ async def get_nearby_properties(
             detail="Property does not have geographic coordinates"
         )
     
-    # Calculate nearby properties using Haversine formula
-    # For simplicity, using a rough approximation (1 degree ≈ 69 miles)
-    lat_range = radius_miles / 69
-    lon_range = radius_miles / (69 * abs(float(property.latitude)))
+    center = (property.latitude, property.longitude)
     
-    query = select(Property).where(
-        and_(
-            Property.id != property_id,
-            Property.is_active == True,
-            Property.latitude.between(
-                property.latitude - lat_range,
-                property.latitude + lat_range
-            ),
-            Property.longitude.between(
-                property.longitude - lon_range,
-                property.longitude + lon_range
+    if geo_index.ready:
+        # Nearest ids from the in-process index; load only those rows
+        await geo_index.sync(db)
+        ids, distances = geo_index.nearest(*center, limit, radius_miles=radius_miles, exclude=[property_id])
+        if not ids:
+            return []
+        
+        result = await db.execute(
+            select(Property).where(and_(Property.id.in_(ids), Property.is_active == True))
+        )
+        by_id = {nearby.id: nearby for nearby in result.scalars().all()}
+        return with_distances(
+            (by_id[nearby_id], distance) for nearby_id, distance in zip(ids, distances) if nearby_id in by_id
+        )
+    
+    # Nearest first within the radius
+    query = (
+        select(Property, geo_search.distance_miles(*center).label("distance_miles"))
+        .where(
+            and_(
+                Property.id != property_id,
+                Property.is_active == True,
+                geo_search.within_radius(*center, radius_miles)
             )
         )
-    ).limit(limit)
+        .order_by(geo_search.distance_order(*center))
+        .limit(limit)
+    )
     
     result = await db.execute(query)
-    nearby_properties = result.scalars().all()
+    nearby_properties = with_distances(result.all())
     
-    return nearby_properties
\ No newline at end of file
+    return nearby_properties
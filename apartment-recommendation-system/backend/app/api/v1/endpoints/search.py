@@ -5,17 +5,20 @@ from typing import List, Optional, Annotated, Dict, Any
 from datetime import datetime, date
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, asc, distinct, case
+from sqlalchemy import select, func, and_, or_, desc, asc, distinct, case, update
 from sqlalchemy.orm import selectinload, joinedload
 from uuid import UUID
+import bisect
 import json
 
 from app.db.base import get_db
-from app.models.property import Property, Unit, PriceHistory
-from app.models.user import User, SavedSearch
-from app.models.market import MarketVelocity, MarketStatus
+from app.models.property import Property, Unit, PriceHistory, UnitSearch
+from app.models.user import User, SavedSearch, UserPreference
+from app.models.market import MarketAlert, MarketVelocity
 from app.schemas.search import (
+    MarketStatus,
     PropertySearch,
+    PropertySortBy,
     SearchResponse,
     SearchFacets,
     GeoSearchRequest,
@@ -23,12 +26,29 @@ from app.schemas.search import (
     QuickSearchRequest,
     SearchSuggestion
 )
-from app.schemas.property import PropertyWithUnits, Unit as UnitSchema
+from app.schemas.property import Property as PropertySchema, PropertyWithUnits, Unit as UnitSchema, UnitWithProperty
 from app.api.v1.endpoints.auth import get_current_user, get_current_active_user
 from app.core.config import settings
+from app.core.features import UnknownFeatureError
+from app.core.pagination import CursorError, encode_cursor, decode_cursor
+from app.services.commute_search import CommuteSearchError, commute_grid
+from app.services.feature_search import feature_search
+from app.services.geo_index import geo_index
+from app.services.geo_search import geo_search, with_distances
+from app.services.orderings import property_keyset, unit_search_keyset
+from app.services.search_alerts import search_percolator
+from app.services.search_cache import search_cache, search_cache_key
+from app.services.search_counts import count_key, search_counter
+from app.services.search_facets import facet_service
+from app.services.search_profiler import search_profiler
+from app.services.suggestions import suggestion_service
+from app.services.text_search import text_search
 
 router = APIRouter()
 
+# Property ids per IN (...) lookup, well under asyncpg's 32767 bind parameters
+ID_LOOKUP_BATCH = 5000
+
 
 @router.post("/properties", response_model=SearchResponse)
 async def search_properties(
@@ -39,6 +59,14 @@ async def search_properties(
     """
     Advanced property search with multiple filters
     """
+    trace = search_profiler.start("properties", search_params)
+    
+    # Identical searches are served from the result cache until their city's inventory changes
+    cache_key = search_cache_key("properties", search_params)
+    cached, stamp = await search_cache.get(cache_key, search_params.city)
+    if cached is not None:
+        return search_profiler.finish(trace, cached)
+    
     # Build base query
     query = select(Property).where(Property.is_active == True)
     
@@ -51,22 +79,14 @@ async def search_properties(
         query = query.where(Property.zip_code.in_(search_params.zip_codes))
     
     # Geographic search
-    if search_params.latitude and search_params.longitude and search_params.radius_miles:
-        # Approximate geographic search
-        lat_range = search_params.radius_miles / 69
-        lon_range = search_params.radius_miles / 69
-        
-        query = query.where(
-            and_(
-                Property.latitude.between(
-                    search_params.latitude - lat_range,
-                    search_params.latitude + lat_range
-                ),
-                Property.longitude.between(
-                    search_params.longitude - lon_range,
-                    search_params.longitude + lon_range
-                )
-            )
+    geo_center = None
+    if search_params.latitude is not None and search_params.longitude is not None and search_params.radius_miles:
+        geo_center = (search_params.latitude, search_params.longitude)
+        query = query.where(geo_search.within_radius(*geo_center, search_params.radius_miles))
+    if search_params.sort_by == PropertySortBy.DISTANCE and not geo_center:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sorting by distance needs latitude, longitude and radius_miles"
         )
     
     # Property type filter
@@ -89,7 +109,15 @@ async def search_properties(
     if search_params.min_rating:
         query = query.where(Property.rating >= search_params.min_rating)
     
-    # Join with units for unit-level filters
+    # Amenity, pet, parking and utility filters match the indexed feature tags
+    try:
+        feature_conditions = feature_search.property_conditions(search_params)
+    except UnknownFeatureError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if feature_conditions:
+        query = query.where(*feature_conditions)
+    
+    # Unit-level filters select properties with at least one matching unit, from unit_search alone
     needs_unit_join = any([
         search_params.min_price,
         search_params.max_price,
@@ -99,98 +127,117 @@ async def search_properties(
         search_params.max_bathrooms,
         search_params.min_square_feet,
         search_params.max_square_feet,
-        search_params.available_only
+        search_params.available_only,
+        search_params.has_concessions is not None
     ])
     
+    unit_conditions = []
     if needs_unit_join:
-        query = query.join(Unit)
-        
         if search_params.available_only:
-            query = query.where(Unit.is_available == True)
+            unit_conditions.append(UnitSearch.is_available == True)
         if search_params.available_before:
-            query = query.where(
+            unit_conditions.append(
                 or_(
-                    Unit.available_date <= search_params.available_before,
-                    Unit.available_date.is_(None)
+                    UnitSearch.available_date <= search_params.available_before,
+                    UnitSearch.available_date.is_(None)
                 )
             )
         
         # Price filters
         if search_params.min_price:
-            query = query.where(Unit.current_price >= search_params.min_price)
+            unit_conditions.append(UnitSearch.current_price >= search_params.min_price)
         if search_params.max_price:
-            query = query.where(Unit.current_price <= search_params.max_price)
+            unit_conditions.append(UnitSearch.current_price <= search_params.max_price)
         
         # Bedroom/bathroom filters
         if search_params.min_bedrooms:
-            query = query.where(Unit.bedrooms >= search_params.min_bedrooms)
+            unit_conditions.append(UnitSearch.bedrooms >= search_params.min_bedrooms)
         if search_params.max_bedrooms:
-            query = query.where(Unit.bedrooms <= search_params.max_bedrooms)
+            unit_conditions.append(UnitSearch.bedrooms <= search_params.max_bedrooms)
         if search_params.min_bathrooms:
-            query = query.where(Unit.bathrooms >= search_params.min_bathrooms)
+            unit_conditions.append(UnitSearch.bathrooms >= search_params.min_bathrooms)
         if search_params.max_bathrooms:
-            query = query.where(Unit.bathrooms <= search_params.max_bathrooms)
+            unit_conditions.append(UnitSearch.bathrooms <= search_params.max_bathrooms)
         
         # Square feet filters
         if search_params.min_square_feet:
-            query = query.where(Unit.square_feet >= search_params.min_square_feet)
+            unit_conditions.append(UnitSearch.square_feet >= search_params.min_square_feet)
         if search_params.max_square_feet:
-            query = query.where(Unit.square_feet <= search_params.max_square_feet)
+            unit_conditions.append(UnitSearch.square_feet <= search_params.max_square_feet)
         
-        query = query.distinct()
+        # Concessions
+        if search_params.has_concessions is not None:
+            unit_conditions.append(UnitSearch.has_concessions == search_params.has_concessions)
+        
+        query = query.where(Property.id.in_(select(UnitSearch.property_id).where(*unit_conditions)))
     
     # Market filters
     if search_params.market_status or search_params.max_days_on_market or search_params.recent_price_drop:
-        query = query.join(MarketVelocity, MarketVelocity.property_id == Property.id)
+        market_query = select(MarketVelocity.property_id)
         
         if search_params.market_status and search_params.market_status != MarketStatus.ALL:
-            query = query.where(MarketVelocity.market_status == search_params.market_status)
+            market_query = market_query.where(MarketVelocity.market_status == search_params.market_status)
         if search_params.max_days_on_market:
-            query = query.where(MarketVelocity.days_on_market <= search_params.max_days_on_market)
+            market_query = market_query.where(MarketVelocity.days_on_market <= search_params.max_days_on_market)
         if search_params.recent_price_drop:
-            query = query.where(MarketVelocity.price_drop_percentage > 0)
+            market_query = market_query.where(MarketVelocity.price_drop_percentage > 0)
+        
+        query = query.where(Property.id.in_(market_query))
     
-    # Count total results
-    count_query = select(func.count(distinct(Property.id))).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    # Facets over the whole filtered result set, not just this page
+    facets = None
+    if search_params.include_facets:
+        facets = await facet_service.facets(db, query, unit_conditions, count_key("facets:properties", search_params))
     
-    # Apply sorting
-    sort_column = Property.created_at  # Default
-    if search_params.sort_by == "price_low" and needs_unit_join:
-        sort_column = Unit.current_price
-    elif search_params.sort_by == "price_high" and needs_unit_join:
-        sort_column = desc(Unit.current_price)
-    elif search_params.sort_by == "newest":
-        sort_column = desc(Property.created_at)
-    elif search_params.sort_by == "rating":
-        sort_column = desc(Property.rating)
-    elif search_params.sort_by == "bedrooms" and needs_unit_join:
-        sort_column = desc(Unit.bedrooms)
-    
-    query = query.order_by(sort_column)
-    
-    # Apply pagination
-    offset = (search_params.page - 1) * search_params.per_page
-    query = query.offset(offset).limit(search_params.per_page)
+    # Total from the count cache or planner estimate, else counted with the page
+    count = await search_counter.begin(
+        db, query, count_key("search:properties", search_params), search_params.exact_total, search_params.cursor
+    )
+    
+    # Apply sorting; availability alone is covered by the aggregates stored on properties
+    unit_filters = unit_conditions[1:] if search_params.available_only else unit_conditions
+    keyset = property_keyset(search_params.sort_by, geo_center, unit_conditions if unit_filters else None)
+    if geo_center:
+        query = query.add_columns(geo_search.distance_miles(*geo_center).label("distance_miles"))
+    query = count.fold(query)
     
     # Include related data if requested
     if search_params.include_units:
         query = query.options(selectinload(Property.units))
     
+    # Keyset pagination; page numbers still work as an offset without a cursor
+    offset = (search_params.page - 1) * search_params.per_page
+    try:
+        query = keyset.apply(query, search_params.cursor, search_params.per_page, offset)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     # Execute query
     result = await db.execute(query)
-    properties = result.scalars().unique().all()
+    rows, next_cursor = keyset.page(result.all(), search_params.per_page)
+    rows = count.take(rows)
+    await search_counter.finish(db, count)
+    if geo_center:
+        properties = with_distances(rows)
+    else:
+        properties = [row[0] for row in rows]
     
     # Build response
-    return SearchResponse(
-        results=properties,
-        total=total,
-        page=search_params.page,
-        per_page=search_params.per_page,
-        pages=(total + search_params.per_page - 1) // search_params.per_page,
-        applied_filters=search_params.model_dump(exclude_unset=True, exclude={"page", "per_page", "sort_by"})
-    )
+    schema = PropertyWithUnits if search_params.include_units else PropertySchema
+    with trace.serializing():
+        response = SearchResponse(
+            results=[schema.model_validate(property) for property in properties],
+            total=count.total,
+            total_exact=count.exact,
+            page=search_params.page,
+            per_page=search_params.per_page,
+            pages=(count.total + search_params.per_page - 1) // search_params.per_page,
+            next_cursor=next_cursor,
+            facets=facets,
+            applied_filters=search_params.model_dump(exclude_unset=True, exclude={"page", "per_page", "sort_by", "cursor"})
+        )
+    await search_cache.set(cache_key, stamp, response)
+    return search_profiler.finish(trace, response)
 
 
 @router.post("/units", response_model=SearchResponse)
@@ -201,73 +248,117 @@ async def search_units(
     """
     Search for individual units
     """
-    # Build base query
-    query = select(Unit).join(Property).where(
-        and_(
-            Unit.is_available == True,
-            Property.is_active == True
-        )
-    )
+    trace = search_profiler.start("units", search_params)
     
-    # Apply all property-level filters
+    # Identical searches are served from the result cache until their city's inventory changes
+    cache_key = search_cache_key("units", search_params)
+    cached, stamp = await search_cache.get(cache_key, search_params.city)
+    if cached is not None:
+        return search_profiler.finish(trace, cached)
+    
+    # Filter and order unit_search alone; only the page's units are loaded
+    query = select(UnitSearch.unit_id).where(UnitSearch.is_available == True)
+    
+    # Location filters
     if search_params.city:
-        query = query.where(Property.city.ilike(f"%{search_params.city}%"))
+        query = query.where(UnitSearch.city.ilike(f"%{search_params.city}%"))
     if search_params.state:
-        query = query.where(Property.state == search_params.state)
+        query = query.where(UnitSearch.state == search_params.state)
     if search_params.zip_codes:
-        query = query.where(Property.zip_code.in_(search_params.zip_codes))
+        query = query.where(UnitSearch.zip_code.in_(search_params.zip_codes))
+    if search_params.property_types:
+        query = query.where(UnitSearch.property_type.in_(search_params.property_types))
+    
+    # Geographic search
+    geo_center = None
+    if search_params.latitude is not None and search_params.longitude is not None and search_params.radius_miles:
+        geo_center = (search_params.latitude, search_params.longitude)
+        query = query.where(geo_search.within_radius(*geo_center, search_params.radius_miles, UnitSearch))
+    if search_params.sort_by == PropertySortBy.DISTANCE and not geo_center:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sorting by distance needs latitude, longitude and radius_miles"
+        )
     
     # Unit-level filters
     if search_params.min_price:
-        query = query.where(Unit.current_price >= search_params.min_price)
+        query = query.where(UnitSearch.current_price >= search_params.min_price)
     if search_params.max_price:
-        query = query.where(Unit.current_price <= search_params.max_price)
+        query = query.where(UnitSearch.current_price <= search_params.max_price)
     if search_params.min_bedrooms:
-        query = query.where(Unit.bedrooms >= search_params.min_bedrooms)
+        query = query.where(UnitSearch.bedrooms >= search_params.min_bedrooms)
     if search_params.max_bedrooms:
-        query = query.where(Unit.bedrooms <= search_params.max_bedrooms)
+        query = query.where(UnitSearch.bedrooms <= search_params.max_bedrooms)
     if search_params.min_bathrooms:
-        query = query.where(Unit.bathrooms >= search_params.min_bathrooms)
+        query = query.where(UnitSearch.bathrooms >= search_params.min_bathrooms)
     if search_params.max_bathrooms:
-        query = query.where(Unit.bathrooms <= search_params.max_bathrooms)
+        query = query.where(UnitSearch.bathrooms <= search_params.max_bathrooms)
     if search_params.min_square_feet:
-        query = query.where(Unit.square_feet >= search_params.min_square_feet)
+        query = query.where(UnitSearch.square_feet >= search_params.min_square_feet)
     if search_params.max_square_feet:
-        query = query.where(Unit.square_feet <= search_params.max_square_feet)
-    
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+        query = query.where(UnitSearch.square_feet <= search_params.max_square_feet)
+    if search_params.available_before:
+        query = query.where(
+            or_(
+                UnitSearch.available_date <= search_params.available_before,
+                UnitSearch.available_date.is_(None)
+            )
+        )
+    if search_params.has_concessions is not None:
+        query = query.where(UnitSearch.has_concessions == search_params.has_concessions)
+    
+    # Market filters on the unit's own velocity
+    if search_params.market_status and search_params.market_status != MarketStatus.ALL:
+        query = query.where(UnitSearch.market_status == search_params.market_status)
+    if search_params.max_days_on_market:
+        query = query.where(UnitSearch.days_on_market <= search_params.max_days_on_market)
+    if search_params.recent_price_drop:
+        query = query.where(UnitSearch.price_drop_percentage > 0)
+    
+    # Total from the count cache or planner estimate, else counted with the page
+    count = await search_counter.begin(
+        db, query, count_key("search:units", search_params), search_params.exact_total, search_params.cursor
+    )
     
     # Apply sorting
-    if search_params.sort_by == "price_low":
-        query = query.order_by(Unit.current_price)
-    elif search_params.sort_by == "price_high":
-        query = query.order_by(desc(Unit.current_price))
-    elif search_params.sort_by == "newest":
-        query = query.order_by(desc(Unit.created_at))
-    elif search_params.sort_by == "bedrooms":
-        query = query.order_by(desc(Unit.bedrooms))
-    elif search_params.sort_by == "square_feet":
-        query = query.order_by(desc(Unit.square_feet))
-    
-    # Pagination
+    keyset = unit_search_keyset(search_params.sort_by.value, geo_center)
+    
+    # Keyset pagination; page numbers still work as an offset without a cursor
     offset = (search_params.page - 1) * search_params.per_page
-    query = query.options(selectinload(Unit.property)).offset(offset).limit(search_params.per_page)
+    try:
+        query = keyset.apply(count.fold(query), search_params.cursor, search_params.per_page, offset)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     # Execute
     result = await db.execute(query)
-    units = result.scalars().all()
-    
-    return SearchResponse(
-        results=units,
-        total=total,
-        page=search_params.page,
-        per_page=search_params.per_page,
-        pages=(total + search_params.per_page - 1) // search_params.per_page,
-        applied_filters=search_params.model_dump(exclude_unset=True, exclude={"page", "per_page", "sort_by"})
-    )
+    rows, next_cursor = keyset.page(result.all(), search_params.per_page)
+    rows = count.take(rows)
+    await search_counter.finish(db, count)
+    
+    # Load the page's units in result order
+    unit_ids = [row[0] for row in rows]
+    by_id = {
+        unit.id: unit
+        for unit in (await db.execute(
+            select(Unit).options(selectinload(Unit.property)).where(Unit.id.in_(unit_ids))
+        )).scalars().all()
+    }
+    units = [by_id[unit_id] for unit_id in unit_ids if unit_id in by_id]
+    
+    with trace.serializing():
+        response = SearchResponse(
+            results=[UnitWithProperty.model_validate(unit) for unit in units],
+            total=count.total,
+            total_exact=count.exact,
+            page=search_params.page,
+            per_page=search_params.per_page,
+            pages=(count.total + search_params.per_page - 1) // search_params.per_page,
+            next_cursor=next_cursor,
+            applied_filters=search_params.model_dump(exclude_unset=True, exclude={"page", "per_page", "sort_by", "cursor"})
+        )
+    await search_cache.set(cache_key, stamp, response)
+    return search_profiler.finish(trace, response)
 
 
 @router.post("/geo", response_model=SearchResponse)
@@ -276,73 +367,254 @@ async def geographic_search(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Search properties by geographic location
+    Search properties by geographic location, nearest first
     """
-    # Calculate bounding box
-    lat_range = search_params.radius_miles / 69
-    lon_range = search_params.radius_miles / 69
+    trace = search_profiler.start("geo", search_params)
     
-    query = select(Property).where(
-        and_(
-            Property.is_active == True,
-            Property.latitude.between(
-                search_params.latitude - lat_range,
-                search_params.latitude + lat_range
-            ),
-            Property.longitude.between(
-                search_params.longitude - lon_range,
-                search_params.longitude + lon_range
-            )
-        )
-    )
+    # Identical searches are served from the result cache until inventory changes
+    cache_key = search_cache_key("geo", search_params)
+    cached, stamp = await search_cache.get(cache_key)
+    if cached is not None:
+        return search_profiler.finish(trace, cached)
     
-    # Apply additional filters if provided
+    center = (search_params.latitude, search_params.longitude)
+    offset = (search_params.page - 1) * search_params.per_page
+    
+    # Unit filters, if provided, select the matching property ids
+    unit_query = None
     if search_params.min_price or search_params.max_price or search_params.min_bedrooms or search_params.max_bedrooms:
-        query = query.join(Unit)
+        unit_query = select(UnitSearch.property_id)
         
         if search_params.available_only:
-            query = query.where(Unit.is_available == True)
+            unit_query = unit_query.where(UnitSearch.is_available == True)
         if search_params.min_price:
-            query = query.where(Unit.current_price >= search_params.min_price)
+            unit_query = unit_query.where(UnitSearch.current_price >= search_params.min_price)
         if search_params.max_price:
-            query = query.where(Unit.current_price <= search_params.max_price)
+            unit_query = unit_query.where(UnitSearch.current_price <= search_params.max_price)
         if search_params.min_bedrooms:
-            query = query.where(Unit.bedrooms >= search_params.min_bedrooms)
+            unit_query = unit_query.where(UnitSearch.bedrooms >= search_params.min_bedrooms)
         if search_params.max_bedrooms:
-            query = query.where(Unit.bedrooms <= search_params.max_bedrooms)
+            unit_query = unit_query.where(UnitSearch.bedrooms <= search_params.max_bedrooms)
+    
+    if geo_index.ready:
+        # Radius from the in-process index, already nearest first
+        await geo_index.sync(db)
+        ids, distances = geo_index.within_radius(*center, search_params.radius_miles)
+        matches = sorted(zip(ids, distances), key=lambda match: (float(match[1]), str(match[0])))
         
-        query = query.distinct()
-    
-    # Count total
-    count_query = select(func.count(distinct(Property.id))).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # Order by distance (approximate)
-    # In production, use PostGIS for accurate distance calculations
-    query = query.order_by(
-        func.abs(Property.latitude - search_params.latitude) + 
-        func.abs(Property.longitude - search_params.longitude)
-    )
+        if unit_query is not None and matches:
+            # A large radius can hold more ids than one statement may bind
+            matching_ids = set()
+            for batch_start in range(0, len(ids), ID_LOOKUP_BATCH):
+                batch = ids[batch_start:batch_start + ID_LOOKUP_BATCH]
+                matching_ids.update((await db.execute(
+                    unit_query.where(UnitSearch.property_id.in_(batch)).distinct()
+                )).scalars().all())
+            matches = [match for match in matches if match[0] in matching_ids]
+        
+        total = len(matches)
+        total_exact = True
+        
+        # Resume after the cursor's (distance, id); ties are broken by id
+        keys = [(float(distance), str(property_id)) for property_id, distance in matches]
+        start = offset
+        if search_params.cursor:
+            try:
+                last_distance, last_id = decode_cursor("geo:index", search_params.cursor, 2, (float, UUID))
+            except CursorError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            start = bisect.bisect_right(keys, (last_distance, str(last_id)))
+        
+        page = matches[start:start + search_params.per_page]
+        next_cursor = None
+        if start + search_params.per_page < total:
+            last_id, last_distance = page[-1]
+            next_cursor = encode_cursor("geo:index", [float(last_distance), last_id])
+        
+        # Load only the properties on this page
+        result = await db.execute(
+            select(Property)
+            .options(selectinload(Property.units))
+            .where(Property.id.in_([property_id for property_id, _ in page]))
+        )
+        by_id = {property.id: property for property in result.scalars().all()}
+        properties = with_distances(
+            (by_id[property_id], distance) for property_id, distance in page if property_id in by_id
+        )
+    else:
+        query = select(Property).where(
+            and_(
+                Property.is_active == True,
+                geo_search.within_radius(*center, search_params.radius_miles)
+            )
+        )
+        if unit_query is not None:
+            query = query.where(Property.id.in_(unit_query))
+        
+        # Total from the count cache or planner estimate, else counted with the page
+        count = await search_counter.begin(
+            db, query, count_key("search:geo", search_params), search_params.exact_total, search_params.cursor
+        )
+        
+        # Nearest first: a KNN index scan with PostGIS, haversine otherwise
+        keyset = property_keyset(PropertySortBy.DISTANCE, center)
+        query = count.fold(
+            query.add_columns(geo_search.distance_miles(*center).label("distance_miles"))
+            .options(selectinload(Property.units))
+        )
+        try:
+            query = keyset.apply(query, search_params.cursor, search_params.per_page, offset)
+        except CursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        result = await db.execute(query)
+        rows, next_cursor = keyset.page(result.all(), search_params.per_page)
+        rows = count.take(rows)
+        total = (await search_counter.finish(db, count)).total
+        total_exact = count.exact
+        properties = with_distances(rows)
+    
+    with trace.serializing():
+        response = SearchResponse(
+            results=[PropertyWithUnits.model_validate(property) for property in properties],
+            total=total,
+            total_exact=total_exact,
+            page=search_params.page,
+            per_page=search_params.per_page,
+            pages=(total + search_params.per_page - 1) // search_params.per_page,
+            next_cursor=next_cursor,
+            applied_filters={
+                "center": {"lat": search_params.latitude, "lng": search_params.longitude},
+                "radius_miles": search_params.radius_miles
+            }
+        )
+    await search_cache.set(cache_key, stamp, response)
+    return search_profiler.finish(trace, response)
+
+
+@router.post("/commute", response_model=SearchResponse)
+async def commute_search(
+    search_params: CommuteSearchRequest,
+    current_user: Optional[User] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Search properties within a commute time of a destination, shortest commute first
+    """
+    trace = search_profiler.start("commute", search_params)
     
-    # Pagination
-    offset = (search_params.page - 1) * search_params.per_page
-    query = query.options(selectinload(Property.units)).offset(offset).limit(search_params.per_page)
+    if not commute_grid.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Commute search is not available"
+        )
     
-    result = await db.execute(query)
-    properties = result.scalars().unique().all()
-    
-    return SearchResponse(
-        results=properties,
-        total=total,
-        page=search_params.page,
-        per_page=search_params.per_page,
-        pages=(total + search_params.per_page - 1) // search_params.per_page,
-        applied_filters={
-            "center": {"lat": search_params.latitude, "lng": search_params.longitude},
-            "radius_miles": search_params.radius_miles
-        }
+    # Without an explicit limit the user's saved commute preference applies
+    max_minutes = search_params.max_commute_minutes
+    if max_minutes is None and current_user is not None:
+        max_minutes = (await db.execute(
+            select(UserPreference.max_commute_time).where(UserPreference.user_id == current_user.id)
+        )).scalar()
+    max_minutes = min(max_minutes or settings.COMMUTE_DEFAULT_MINUTES, commute_grid.max_minutes)
+    
+    # Identical searches against the same grid are served from the result cache
+    cache_key = search_cache_key(
+        f"commute:{commute_grid.version}", search_params.model_copy(update={"max_commute_minutes": max_minutes})
+    )
+    cached, stamp = await search_cache.get(cache_key)
+    if cached is not None:
+        return search_profiler.finish(trace, cached)
+    
+    # Reachable property cells are one row of the precomputed travel-time matrix
+    try:
+        destination = commute_grid.locate(
+            search_params.destination_address,
+            search_params.destination_latitude,
+            search_params.destination_longitude
+        )
+        minutes_by_cell = commute_grid.reachable(search_params.commute_mode, *destination, max_minutes)
+    except CommuteSearchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    matches = []
+    if minutes_by_cell:
+        query = select(Property.id, Property.geohash).where(
+            and_(Property.is_active == True, commute_grid.within(minutes_by_cell))
+        )
+        
+        # Unit filters, if provided, select the matching property ids
+        if search_params.min_price or search_params.max_price or search_params.min_bedrooms or search_params.max_bedrooms:
+            unit_query = select(UnitSearch.property_id)
+            
+            if search_params.available_only:
+                unit_query = unit_query.where(UnitSearch.is_available == True)
+            if search_params.min_price:
+                unit_query = unit_query.where(UnitSearch.current_price >= search_params.min_price)
+            if search_params.max_price:
+                unit_query = unit_query.where(UnitSearch.current_price <= search_params.max_price)
+            if search_params.min_bedrooms:
+                unit_query = unit_query.where(UnitSearch.bedrooms >= search_params.min_bedrooms)
+            if search_params.max_bedrooms:
+                unit_query = unit_query.where(UnitSearch.bedrooms <= search_params.max_bedrooms)
+            
+            query = query.where(Property.id.in_(unit_query))
+        
+        # Bridged ranges can take in cells outside the commute limit
+        rows = (await db.execute(query)).all()
+        matches = sorted(
+            (
+                (minutes_by_cell[commute_grid.cell_of(geohash)], property_id)
+                for property_id, geohash in rows if commute_grid.cell_of(geohash) in minutes_by_cell
+            ),
+            key=lambda match: (match[0], str(match[1]))
+        )
+    
+    # Resume after the cursor's (minutes, id); ties are broken by id
+    total = len(matches)
+    keys = [(minutes, str(property_id)) for minutes, property_id in matches]
+    start = (search_params.page - 1) * search_params.per_page
+    if search_params.cursor:
+        try:
+            last_minutes, last_id = decode_cursor("commute", search_params.cursor, 2, (int, UUID))
+        except CursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        start = bisect.bisect_right(keys, (last_minutes, str(last_id)))
+    
+    page = matches[start:start + search_params.per_page]
+    next_cursor = None
+    if start + search_params.per_page < total:
+        last_minutes, last_id = page[-1]
+        next_cursor = encode_cursor("commute", [last_minutes, last_id])
+    
+    # Load only the properties on this page
+    result = await db.execute(
+        select(Property)
+        .options(selectinload(Property.units))
+        .where(Property.id.in_([property_id for _, property_id in page]))
     )
+    by_id = {property.id: property for property in result.scalars().all()}
+    properties = []
+    for minutes, property_id in page:
+        if property_id in by_id:
+            by_id[property_id].commute_minutes = minutes
+            properties.append(by_id[property_id])
+    
+    with trace.serializing():
+        response = SearchResponse(
+            results=[PropertyWithUnits.model_validate(property) for property in properties],
+            total=total,
+            page=search_params.page,
+            per_page=search_params.per_page,
+            pages=(total + search_params.per_page - 1) // search_params.per_page,
+            next_cursor=next_cursor,
+            applied_filters={
+                "destination": {"lat": destination[0], "lng": destination[1]},
+                "max_commute_minutes": max_minutes,
+                "commute_mode": search_params.commute_mode
+            }
+        )
+    await search_cache.set(cache_key, stamp, response)
+    return search_profiler.finish(trace, response)
 
 
 @router.post("/quick", response_model=List[Dict[str, Any]])
@@ -355,15 +627,13 @@ async def quick_search(
     """
     results = []
     
-    # Search properties by name and address
+    # Full-text match over name, address, city and description
+    await text_search.refresh(db)
+    text_match, text_rank = text_search.match(search_params.query)
     property_query = select(Property).where(
         and_(
             Property.is_active == True,
-            or_(
-                Property.name.ilike(f"%{search_params.query}%"),
-                Property.address.ilike(f"%{search_params.query}%"),
-                Property.city.ilike(f"%{search_params.query}%")
-            )
+            text_match
         )
     )
     
@@ -376,7 +646,7 @@ async def quick_search(
             )
         )
     
-    property_query = property_query.limit(search_params.max_results)
+    property_query = property_query.order_by(desc(text_rank), Property.id).limit(search_params.max_results)
     
     property_result = await db.execute(property_query)
     properties = property_result.scalars().all()
@@ -407,6 +677,30 @@ async def get_search_suggestions(
     """
     suggestions = []
     
+    if suggestion_service.ready:
+        # Served from the in-memory autocomplete index
+        await suggestion_service.sync(db)
+        
+        if not type or type == "city":
+            for city, count in suggestion_service.suggest_cities(q, limit if type == "city" else 5):
+                suggestions.append(SearchSuggestion(
+                    type="city",
+                    value=city,
+                    display_name=city,
+                    count=count
+                ))
+        
+        if not type or type == "property":
+            for id, name, city in suggestion_service.suggest_properties(q, limit if type == "property" else 5):
+                suggestions.append(SearchSuggestion(
+                    type="property",
+                    value=str(id),
+                    display_name=f"{name} - {city}",
+                    metadata={"property_id": str(id), "city": city}
+                ))
+        
+        return suggestions[:limit]
+    
     if not type or type == "city":
         # Get city suggestions
         city_query = (
@@ -484,6 +778,7 @@ async def save_search(
     db.add(saved_search)
     await db.commit()
     await db.refresh(saved_search)
+    search_percolator.apply_search(saved_search)
     
     return {
         "id": str(saved_search.id),
@@ -549,7 +844,30 @@ async def delete_saved_search(
             detail="Saved search not found"
         )
     
+    # Alerts already raised outlive the search that raised them
+    await db.execute(
+        update(MarketAlert).where(MarketAlert.saved_search_id == search_id).values(saved_search_id=None)
+    )
     await db.delete(saved_search)
     await db.commit()
+    search_percolator.remove_search(search_id)
+    
+    return {"message": "Saved search deleted successfully"}
+
+
+@router.get("/slow", response_model=List[Dict[str, Any]])
+async def get_slow_searches(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    limit: int = Query(50, ge=1, le=500),
+    endpoint: Optional[str] = Query(None, description="Only searches on this endpoint, e.g. properties")
+):
+    """
+    Recent slow searches on this worker with their SQL and sampled plans (admin only)
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
     
-    return {"message": "Saved search deleted successfully"}
\ No newline at end of file
+    return search_profiler.recent(limit, endpoint)
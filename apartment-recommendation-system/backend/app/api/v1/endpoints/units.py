@@ -3,7 +3,7 @@ Unit management endpoints
 """
 from typing import List, Optional, Annotated
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc
 from sqlalchemy.orm import selectinload
@@ -22,6 +22,10 @@ from app.schemas.property import (
 )
 from app.api.v1.endpoints.auth import get_current_active_user
 from app.core.config import settings
+from app.core.pagination import CursorError
+from app.services.inventory_hooks import on_unit_written
+from app.services.orderings import unit_keyset
+from app.services.search_counts import count_key, search_counter
 
 router = APIRouter()
 
@@ -38,10 +42,14 @@ async def get_units(
     available_only: bool = True,
     city: Optional[str] = None,
     state: Optional[str] = None,
+    cursor: Optional[str] = None,
+    response: Response = None,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get list of units with optional filters
+    Get list of units with optional filters, cheapest first
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
     query = select(Unit).join(Property)
     
@@ -69,13 +77,19 @@ async def get_units(
     # Ensure property is active
     query = query.where(Property.is_active == True)
     
-    # Apply pagination
-    query = query.offset(skip).limit(limit).order_by(Unit.current_price)
+    # Keyset pagination; skip still works as an offset without a cursor
+    keyset = unit_keyset("price_low")
+    try:
+        query = keyset.apply(query, cursor, limit, skip)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     result = await db.execute(query)
-    units = result.scalars().all()
+    rows, next_cursor = keyset.page(result.all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return units
+    return [row[0] for row in rows]
 
 
 @router.get("/available", response_model=dict)
@@ -88,11 +102,24 @@ async def get_available_units(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     sort_by: str = Query("price", regex="^(price|date|bedrooms|sqft)$"),
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get available units with advanced filtering
+    
+    Broad searches may report the planner's estimate as total unless
+    exact_total is set; total_exact says which one was returned.
     """
+    filters = {
+        "move_in_date": move_in_date,
+        "min_price": min_price,
+        "max_price": max_price,
+        "bedrooms": bedrooms,
+        "city": city
+    }
+    
     query = select(Unit).join(Property).where(
         and_(
             Unit.is_available == True,
@@ -118,39 +145,37 @@ async def get_available_units(
     if city:
         query = query.where(Property.city.ilike(f"%{city}%"))
     
-    # Count total before pagination
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    # Total from the count cache or planner estimate, else counted with the page
+    count = await search_counter.begin(db, query, count_key("units:available", filters), exact_total, cursor)
     
-    # Apply sorting
-    if sort_by == "price":
-        query = query.order_by(Unit.current_price)
-    elif sort_by == "date":
-        query = query.order_by(Unit.available_date.nullslast())
-    elif sort_by == "bedrooms":
-        query = query.order_by(Unit.bedrooms.desc())
-    elif sort_by == "sqft":
-        query = query.order_by(Unit.square_feet.desc().nullslast())
+    # Apply sorting; unknown dates and sizes sort last
+    keyset = unit_keyset({
+        "price": "price_low",
+        "date": "available_date",
+        "bedrooms": "bedrooms",
+        "sqft": "square_feet"
+    }[sort_by])
     
-    # Apply pagination
-    query = query.options(selectinload(Unit.property)).offset(skip).limit(limit)
+    # Keyset pagination; skip still works as an offset without a cursor
+    try:
+        query = keyset.apply(count.fold(query.options(selectinload(Unit.property))), cursor, limit, skip)
+    except CursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     result = await db.execute(query)
-    units = result.scalars().all()
+    rows, next_cursor = keyset.page(result.all(), limit)
+    rows = count.take(rows)
+    await search_counter.finish(db, count)
+    units = [row[0] for row in rows]
     
     return {
         "units": units,
-        "total": total,
+        "total": count.total,
+        "total_exact": count.exact,
         "skip": skip,
         "limit": limit,
-        "filters_applied": {
-            "move_in_date": move_in_date,
-            "min_price": min_price,
-            "max_price": max_price,
-            "bedrooms": bedrooms,
-            "city": city
-        }
+        "next_cursor": next_cursor,
+        "filters_applied": filters
     }
 
 
@@ -239,6 +264,7 @@ async def create_unit(
     db.add(market_velocity)
     
     await db.commit()
+    await on_unit_written(db, unit, created=True)
     
     return unit
 
@@ -275,6 +301,7 @@ async def update_unit(
     
     # Update unit
     update_data = unit_update.model_dump(exclude_unset=True)
+    changed_fields = {field for field, value in update_data.items() if getattr(unit, field) != value}
     for field, value in update_data.items():
         setattr(unit, field, value)
     
@@ -311,6 +338,7 @@ async def update_unit(
     
     await db.commit()
     await db.refresh(unit)
+    await on_unit_written(db, unit, changed_fields, previous={'current_price': old_price})
     
     return unit
 
@@ -344,6 +372,7 @@ async def delete_unit(
     # Soft delete (mark as unavailable)
     unit.is_available = False
     await db.commit()
+    await on_unit_written(db, unit, {'is_available'})
     
     return {"message": "Unit deleted successfully"}
 
@@ -0,0 +1,267 @@
+"""
+In-memory autocomplete: a compressed prefix trie with precomputed top-N
+per node, plus a trigram map for infix and misspelled queries
+"""
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from collections import Counter
+from dataclasses import dataclass, field
+
+from app.core.text import tokenize
+
+# Share of the query's trigrams an entry must contain to match by trigram
+TRIGRAM_MIN_SIMILARITY = 0.4
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """Lowercased words separated by single spaces"""
+    return ' '.join(tokenize(text))
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a normalised key, padded at the start"""
+    padded = f"  {key}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class AutocompleteEntry:
+    """One suggestion and the keys it is reachable under"""
+    entry_id: Hashable
+    display: str
+    weight: float
+    payload: Any = None
+    keys: Tuple[str, ...] = ()
+    grams: Set[str] = field(default_factory=set)
+    
+    @property
+    def rank(self) -> Tuple[float, str, str]:
+        """Sort key: heaviest first, then alphabetical, then by id"""
+        return -self.weight, self.display.lower(), str(self.entry_id)
+
+
+class _Node:
+    __slots__ = ('label', 'children', 'entries', 'top')
+    
+    def __init__(self, label: str = ''):
+        self.label = label
+        self.children: Dict[str, "_Node"] = {}
+        self.entries: Set[Hashable] = set()
+        self.top: List[Hashable] = []
+
+
+class AutocompleteIndex:
+    """
+    Weighted suggestions reachable by prefix of any word in their text
+    
+    Each entry is stored under every word-start suffix of its normalised
+    text, so "oaks" finds "The Oaks". Every trie node keeps the ids of
+    the top_n heaviest entries below it, recomputed along the affected
+    paths on each write, so a prefix lookup is a walk plus a slice.
+    """
+    
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self._root = _Node()
+        self._entries: Dict[Hashable, AutocompleteEntry] = {}
+        self._grams: Dict[str, Set[Hashable]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, entry_id: Hashable) -> bool:
+        return entry_id in self._entries
+    
+    def get(self, entry_id: Hashable) -> Optional[AutocompleteEntry]:
+        return self._entries.get(entry_id)
+    
+    def load(self, entries: Iterable[Tuple[Hashable, str, float, Any]]) -> None:
+        """
+        Replace the contents in bulk, ranking every node once at the end
+        
+        Args:
+            entries: (entry_id, display, weight, payload) tuples
+        """
+        self._root = _Node()
+        self._entries = {}
+        self._grams = {}
+        
+        for entry_id, display, weight, payload in entries:
+            self._add(entry_id, display, weight, payload, rerank=False)
+        
+        # Post-order so every child is ranked before its parent
+        stack = [(self._root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                self._rerank([node])
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+    
+    def upsert(self, entry_id: Hashable, display: str, weight: float = 0.0, payload: Any = None) -> None:
+        """
+        Add an entry or replace its text, weight and payload
+        
+        Args:
+            entry_id: Entry key
+            display: Text the entry is found by and shown as
+            weight: Ranking weight; heavier entries come first
+            payload: Caller data returned with the entry
+        """
+        existing = self._entries.get(entry_id)
+        if existing is not None and existing.display == display:
+            # Same keys; only the ranking along existing paths moves
+            existing.payload = payload
+            if existing.weight != weight:
+                existing.weight = weight
+                for key in existing.keys:
+                    self._rerank(self._path(key))
+            return
+        
+        self.remove(entry_id)
+        self._add(entry_id, display, weight, payload)
+    
+    def _add(self, entry_id: Hashable, display: str, weight: float, payload: Any, rerank: bool = True) -> None:
+        words = normalize_key(display).split(' ')
+        keys = tuple(dict.fromkeys(' '.join(words[i:]) for i in range(len(words)) if words[i]))
+        entry = AutocompleteEntry(entry_id, display, weight, payload, keys, trigrams(' '.join(words)))
+        self._entries[entry_id] = entry
+        
+        for key in keys:
+            path = self._insert(key)
+            path[-1].entries.add(entry_id)
+            if rerank:
+                self._rerank(path)
+        for gram in entry.grams:
+            self._grams.setdefault(gram, set()).add(entry_id)
+    
+    def remove(self, entry_id: Hashable) -> None:
+        """Drop an entry if present"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        
+        for key in entry.keys:
+            path = self._path(key)
+            path[-1].entries.discard(entry_id)
+            self._rerank(path)
+        for gram in entry.grams:
+            holders = self._grams[gram]
+            holders.discard(entry_id)
+            if not holders:
+                del self._grams[gram]
+    
+    def suggest(self, query: str, limit: int = 10) -> List[AutocompleteEntry]:
+        """
+        Best entries for a partially typed query
+        
+        Prefix matches come first in weight order; trigram matches fill
+        any remaining slots, most similar first.
+        
+        Args:
+            query: Typed text
+            limit: Maximum entries
+        
+        Returns:
+            Matching entries
+        """
+        key = normalize_key(query)
+        if not key:
+            return []
+        
+        results = [self._entries[entry_id] for entry_id in self._prefix_top(key)[:limit]]
+        if len(results) < limit:
+            seen = {entry.entry_id for entry in results}
+            for entry_id in self._similar(key):
+                if entry_id not in seen:
+                    results.append(self._entries[entry_id])
+                    if len(results) == limit:
+                        break
+        return results
+    
+    def _prefix_top(self, prefix: str) -> List[Hashable]:
+        node = self._root
+        remaining = prefix
+        while remaining:
+            child = node.children.get(remaining[0])
+            if child is None:
+                return []
+            common = _common_length(child.label, remaining)
+            if common == len(remaining):
+                return child.top  # Prefix ends on or inside this edge
+            if common < len(child.label):
+                return []
+            node = child
+            remaining = remaining[common:]
+        return node.top
+    
+    def _similar(self, key: str) -> List[Hashable]:
+        query_grams = trigrams(key)
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self._grams.get(gram, ()))
+        
+        needed = TRIGRAM_MIN_SIMILARITY * len(query_grams)
+        matches = [(count, entry_id) for entry_id, count in counts.items() if count >= needed]
+        matches.sort(key=lambda match: (-match[0], self._rank_key(match[1])))
+        return [entry_id for _, entry_id in matches]
+    
+    def _insert(self, key: str) -> List[_Node]:
+        """Path of nodes from the root to the node for key, creating it"""
+        node = self._root
+        path = [node]
+        remaining = key
+        while remaining:
+            child = node.children.get(remaining[0])
+            if child is None:
+                child = node.children[remaining[0]] = _Node(remaining)
+                path.append(child)
+                return path
+            
+            common = _common_length(child.label, remaining)
+            if common < len(child.label):
+                # Split the edge at the divergence point
+                middle = _Node(child.label[:common])
+                child.label = child.label[common:]
+                middle.children[child.label[0]] = child
+                middle.top = list(child.top)
+                node.children[remaining[0]] = middle
+                child = middle
+            
+            node = child
+            path.append(node)
+            remaining = remaining[common:]
+        return path
+    
+    def _path(self, key: str) -> List[_Node]:
+        node = self._root
+        path = [node]
+        remaining = key
+        while remaining:
+            node = node.children[remaining[0]]
+            path.append(node)
+            remaining = remaining[len(node.label):]
+        return path
+    
+    def _rerank(self, path: Iterable[_Node]) -> None:
+        """Recompute top lists bottom-up along a root-to-node path"""
+        for node in reversed(list(path)):
+            candidates = set(node.entries)
+            for child in node.children.values():
+                candidates.update(child.top)
+            # Child lists off this path may still name an entry being removed
+            node.top = sorted(
+                (entry_id for entry_id in candidates if entry_id in self._entries),
+                key=self._rank_key
+            )[:self.top_n]
+    
+    def _rank_key(self, entry_id: Hashable) -> Tuple[float, str, str]:
+        return self._entries[entry_id].rank
+
+
+def _common_length(a: str, b: str) -> int:
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
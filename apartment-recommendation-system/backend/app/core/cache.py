@@ -0,0 +1,119 @@
+"""
+In-process LRU cache with per-entry expiry
+"""
+from typing import Any, Dict, Hashable, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+
+
+@dataclass
+class CacheEntry:
+    """Cached value and its absolute expiry (time.time() seconds)"""
+    value: Any
+    expires_at: float
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire
+    
+    Expired entries are dropped lazily when read; the least recently used
+    entry is evicted once max_size is reached.
+    """
+    
+    def __init__(self, max_size: int, default_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Look up a live entry and mark it recently used
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Entry, or None on a miss or if it has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value, or default on a miss"""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+    
+    def set(self,
+            key: Hashable,
+            value: Any,
+            ttl: Optional[float] = None,
+            expires_at: Optional[float] = None) -> CacheEntry:
+        """
+        Store a value
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Seconds to keep it, defaults to default_ttl
+            expires_at: Absolute expiry, overrides ttl
+        
+        Returns:
+            The stored entry
+        """
+        if expires_at is None:
+            ttl = self.default_ttl if ttl is None else ttl
+            expires_at = time.time() + ttl if ttl is not None else float('inf')
+        
+        entry = CacheEntry(value=value, expires_at=expires_at)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+    
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one key; returns whether it was cached"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
@@ -0,0 +1,162 @@
+"""
+Travel-time grid layout shared by the commute builder and commute search
+
+The grid is the block of geohash cells at one precision covering a
+network's extent. Geohash cells at a fixed precision tile a regular
+latitude/longitude lattice, so a point's row in the travel-time matrix is
+plain arithmetic and its column cells match Property.geohash prefixes.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import re
+
+import numpy as np
+
+from app.core.geo import GEOHASH_ALPHABET, geohash_cell_degrees, geohash_encode, geohash_prefix_range
+from app.core.text import tokenize
+
+# Matrix value for a cell pair with no route within the build limit
+UNREACHABLE = 65535
+
+# Longest stored travel time; longer routes are stored as UNREACHABLE
+MAX_MINUTES = UNREACHABLE - 1
+
+COMMUTE_MODES = ('driving', 'transit', 'walking', 'bicycling')
+
+# Address words reduced to their usual abbreviation before lookup
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'boulevard': 'blvd', 'road': 'rd', 'drive': 'dr',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'parkway': 'pkwy', 'highway': 'hwy',
+    'terrace': 'ter', 'circle': 'cir', 'square': 'sq', 'north': 'n', 'south': 's',
+    'east': 'e', 'west': 'w', 'suite': 'ste'
+}
+
+_POSTCODE = re.compile(r"^\d{5}(-\d{4})?$")
+
+
+@dataclass(frozen=True)
+class GridSpec:
+    """
+    Block of geohash cells addressed row-major from the south-west corner
+    
+    lat_index and lon_index are the corner cell's position in the global
+    lattice of cells at this precision.
+    """
+    precision: int
+    lat_index: int
+    lon_index: int
+    rows: int
+    cols: int
+    
+    @classmethod
+    def covering(cls, precision: int, south: float, west: float, north: float, east: float) -> "GridSpec":
+        """Smallest block of cells covering a bounding box"""
+        height, width = geohash_cell_degrees(precision)
+        lat_index = math.floor((south + 90.0) / height)
+        lon_index = math.floor((west + 180.0) / width)
+        rows = math.floor((north + 90.0) / height) - lat_index + 1
+        cols = math.floor((east + 180.0) / width) - lon_index + 1
+        return cls(precision, lat_index, lon_index, rows, cols)
+    
+    def __len__(self) -> int:
+        return self.rows * self.cols
+    
+    def cell_index(self, latitude: float, longitude: float) -> Optional[int]:
+        """Row of the matrix for a point, or None outside the grid"""
+        height, width = geohash_cell_degrees(self.precision)
+        row = math.floor((latitude + 90.0) / height) - self.lat_index
+        col = math.floor((longitude + 180.0) / width) - self.lon_index
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        return row * self.cols + col
+    
+    def centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Latitudes and longitudes of every cell's centre, in row order"""
+        height, width = geohash_cell_degrees(self.precision)
+        rows, cols = np.divmod(np.arange(len(self)), self.cols)
+        return (self.lat_index + rows + 0.5) * height - 90.0, (self.lon_index + cols + 0.5) * width - 180.0
+    
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            'precision': self.precision, 'lat_index': self.lat_index, 'lon_index': self.lon_index,
+            'rows': self.rows, 'cols': self.cols
+        }
+
+
+def containing_cell(latitude: float, longitude: float, precision: int) -> Tuple[str, float, float]:
+    """(geohash, centre latitude, centre longitude) of the cell holding a point"""
+    height, width = geohash_cell_degrees(precision)
+    center_latitude = (math.floor((latitude + 90.0) / height) + 0.5) * height - 90.0
+    center_longitude = (math.floor((longitude + 180.0) / width) + 0.5) * width - 180.0
+    return geohash_encode(center_latitude, center_longitude, precision), center_latitude, center_longitude
+
+
+def geohash_ranges(cells: Iterable[str], max_ranges: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Half-open geohash ranges covering a set of cells, adjacent ranges merged
+    
+    Cells close together on the ground are mostly close in geohash order,
+    so a compact reachable area collapses to a handful of ranges. A
+    scattered one can still need many; past max_ranges the ranges with the
+    smallest gaps between them are bridged, so the ranges may then also
+    cover cells outside the set.
+    
+    Args:
+        cells: Geohash cells, all of one precision
+        max_ranges: Most ranges to return, unlimited when None
+    
+    Returns:
+        Sorted [low, high) ranges
+    """
+    # Runs of consecutive cells as (first cell, last cell, first code, last code)
+    runs: List[Tuple[str, str, int, int]] = []
+    for code, cell in sorted((_cell_code(cell), cell) for cell in set(cells)):
+        if runs and code == runs[-1][3] + 1:
+            runs[-1] = (runs[-1][0], cell, runs[-1][2], code)
+        else:
+            runs.append((cell, cell, code, code))
+    
+    if max_ranges is not None and len(runs) > max(max_ranges, 1):
+        # Keep the widest gaps as breaks and bridge the rest
+        gaps = sorted(range(1, len(runs)), key=lambda i: runs[i][2] - runs[i - 1][3], reverse=True)
+        breaks = set(gaps[:max(max_ranges, 1) - 1])
+        bridged: List[Tuple[str, str, int, int]] = []
+        for i, run in enumerate(runs):
+            if bridged and i not in breaks:
+                bridged[-1] = (bridged[-1][0], run[1], bridged[-1][2], run[3])
+            else:
+                bridged.append(run)
+        runs = bridged
+    
+    return [(geohash_prefix_range(first)[0], geohash_prefix_range(last)[1]) for first, last, _, _ in runs]
+
+
+def _cell_code(cell: str) -> int:
+    """Position of a geohash cell among the cells of its precision"""
+    code = 0
+    for char in cell:
+        code = code * len(GEOHASH_ALPHABET) + GEOHASH_ALPHABET.index(char)
+    return code
+
+
+def place_keys(text: Optional[str]) -> List[str]:
+    """
+    Lookup keys for a place name or address, most specific first
+    
+    "123 Main Street, Austin, TX 78701" yields keys for the whole string,
+    then with trailing comma-separated parts dropped one at a time, with
+    street words abbreviated and postcodes ignored.
+    
+    Args:
+        text: Place name or address
+    
+    Returns:
+        Keys, possibly empty
+    """
+    parts = [
+        ' '.join(ADDRESS_ABBREVIATIONS.get(word, word) for word in tokenize(part) if not _POSTCODE.match(word))
+        for part in (text or '').split(',')
+    ]
+    parts = [part for part in parts if part]
+    return [' '.join(parts[:end]) for end in range(len(parts), 0, -1)]
@@ -98,6 +98,58 @@ class Settings(BaseSettings):
     MIN_RECOMMENDATIONS: int = 5
     MAX_RECOMMENDATIONS: int = 50
     
+    # Compute executors (CPU-bound AI work off the event loop)
+    COMPUTE_PROCESS_WORKERS: int = 2  # 0 runs process-pool work in threads
+    COMPUTE_THREAD_WORKERS: int = 4
+    COMPUTE_MAX_QUEUE_SIZE: int = 32
+    COMPUTE_TASK_TIMEOUT: float = 10.0  # Seconds
+    PREDICTION_CACHE_SIZE: int = 10000  # Cached unit predictions per worker
+    TEMPLATE_CACHE_SIZE: int = 256  # Compiled offer templates per worker
+    
+    # Geo search
+    GEO_USE_POSTGIS: bool = True  # Falls back to geohash search when the extension is unavailable
+    GEO_INDEX_ENABLED: bool = True  # In-process ball tree for radius and nearest queries
+    GEO_INDEX_SYNC_SECONDS: int = 30  # How often each worker pulls other workers' property changes
+    GEO_INDEX_REBUILD_THRESHOLD: int = 1000  # Pending changes before the tree is rebuilt
+    
+    # Autocomplete
+    AUTOCOMPLETE_TOP_N: int = 50  # Suggestions precomputed per prefix; the endpoint's maximum limit
+    AUTOCOMPLETE_SYNC_SECONDS: int = 30  # How often each worker pulls other workers' property changes
+    
+    # Text search
+    TEXT_SEARCH_SYNC_SECONDS: int = 30  # How often each worker's BM25 fallback pulls other workers' property changes
+    
+    # Search counts
+    COUNT_CACHE_SIZE: int = 5000  # Exact search totals cached per worker
+    COUNT_CACHE_TTL_SECONDS: int = 60
+    COUNT_ESTIMATE_THRESHOLD: int = 10000  # Planner estimates at or above this stand in for exact totals
+    
+    # Search facets
+    FACET_CACHE_SIZE: int = 2000  # Facet sets cached per worker, least recently used evicted first
+    FACET_CACHE_TTL_SECONDS: int = 300
+    FACET_TOP_VALUES: int = 30  # Values returned per city, property type and amenity facet
+    
+    # Search result cache
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_SIZE: int = 5000  # Responses cached per worker
+    SEARCH_CACHE_TTL_SECONDS: int = 120
+    SEARCH_CACHE_REDIS_ENABLED: bool = True  # Shared tier and inventory versions in Redis
+    SEARCH_CACHE_PREFIX: str = "search-cache"
+    SEARCH_CACHE_VERSION_SYNC_SECONDS: float = 1.0  # How often each worker re-reads other workers' inventory versions
+    SEARCH_CACHE_REDIS_RETRY_SECONDS: int = 30  # Local tier only for this long after a Redis error
+    
+    # Saved-search alerts
+    SEARCH_ALERTS_ENABLED: bool = True
+    SEARCH_ALERTS_SYNC_SECONDS: float = 30.0  # How often each worker re-reads other workers' saved-search changes
+    SEARCH_ALERTS_REPEAT_HOURS: float = 24.0  # Same unit and change alert a search at most once in this window
+    
+    # Slow search log
+    SLOW_SEARCH_THRESHOLD_MS: int = 500  # Searches slower than this are logged with their SQL
+    SLOW_SEARCH_LOG_SIZE: int = 200  # Slow searches kept per worker, oldest dropped first
+    SLOW_SEARCH_EXPLAIN_SAMPLE_RATE: float = 0.1  # Share of slow searches re-run under EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_SEARCH_EXPLAIN_TIMEOUT_MS: int = 10000
+    SLOW_SEARCH_EXPLAIN_CONCURRENCY: int = 1  # Plans captured at once per worker; further samples are skipped
+    
     # Monitoring
     SENTRY_DSN: Optional[str] = None
     PROMETHEUS_ENABLED: bool = True
@@ -123,6 +175,13 @@ class Settings(BaseSettings):
     TEMPLATES_DIR: Path = BASE_DIR / "templates"
     UPLOAD_DIR: Path = BASE_DIR / "uploads"
     
+    # Commute search
+    COMMUTE_GRID_PATH: Path = BASE_DIR / "data" / "commute"  # Output of scripts/build_commute_grid.py
+    COMMUTE_GRID_PRECISION: int = 6  # Geohash precision of grid cells, about 1.2km x 0.6km
+    COMMUTE_MAX_MINUTES: int = 120  # Longest commute the grid records
+    COMMUTE_DEFAULT_MINUTES: int = 30  # Limit when neither the request nor the user's preferences set one
+    COMMUTE_MAX_RANGES: int = 200  # Geohash ranges per commute query; the closest ranges are bridged beyond this
+    
     @property
     def emails_enabled(self) -> bool:
         """Check if email configuration is complete"""
@@ -0,0 +1,272 @@
+"""
+Managed executors for CPU-bound work that must not block the event loop
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when an executor queue stays full for longer than the task timeout"""
+
+
+class ExecutorTimeoutError(Exception):
+    """Raised when a task does not finish within its timeout"""
+
+
+@dataclass
+class ExecutorMetrics:
+    """Counters and timings for one managed executor"""
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    running: int = 0
+    queued: int = 0
+    total_wait_ms: float = 0.0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Metrics with derived averages"""
+        data = asdict(self)
+        finished = self.completed + self.failed
+        data['avg_wait_ms'] = round(self.total_wait_ms / self.submitted, 2) if self.submitted else 0.0
+        data['avg_latency_ms'] = round(self.total_latency_ms / finished, 2) if finished else 0.0
+        return data
+
+
+def _warm_up() -> None:
+    """Import the heavy numeric stack in a fresh worker process"""
+    import pandas  # noqa
+    import sklearn.ensemble  # noqa
+
+
+class ManagedExecutor:
+    """
+    Bounded wrapper around a thread or process pool
+    
+    At most max_workers tasks run and max_queue_size wait; further callers
+    wait for a slot up to the task timeout and then get ExecutorBusyError.
+    A timed-out task is abandoned rather than killed, so its slot is only
+    released once the worker actually finishes.
+    """
+    
+    def __init__(self,
+                 name: str,
+                 kind: str,
+                 max_workers: int,
+                 max_queue_size: int,
+                 default_timeout: float):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(max_workers, 1)
+        self.max_queue_size = max(max_queue_size, 0)
+        self.default_timeout = default_timeout
+        self.metrics = ExecutorMetrics()
+        self._executor: Optional[Executor] = None
+        # Awaited on the event loop, so a cancelled caller never holds a slot
+        self._slots = asyncio.BoundedSemaphore(self.max_workers + self.max_queue_size)
+        self._lock = threading.Lock()
+    
+    def _create_executor(self) -> Executor:
+        if self.kind == 'process':
+            # Spawned workers do not inherit the event loop, DB pool or locks
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+    
+    @property
+    def executor(self) -> Executor:
+        """Underlying pool, created on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._create_executor()
+                    logger.info(f"Started {self.kind} executor '{self.name}' with {self.max_workers} workers")
+        return self._executor
+    
+    async def _acquire_slot(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.metrics.rejected += 1
+            raise ExecutorBusyError(f"Executor '{self.name}' queue is full")
+    
+    def _release_slot(self, future: Optional[asyncio.Future]) -> None:
+        with self._lock:
+            self.metrics.in_flight -= 1
+        self._slots.release()
+    
+    def _invoke(self, func: Callable, args: tuple, kwargs: dict, enqueued_at: float) -> Any:
+        """Runs in the worker thread and records how long the task queued"""
+        started_at = time.perf_counter()
+        with self._lock:
+            self.metrics.queued -= 1
+            self.metrics.running += 1
+            self.metrics.total_wait_ms += (started_at - enqueued_at) * 1000
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.metrics.running -= 1
+    
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) in the pool and await the result
+        
+        Args:
+            func: Callable to run; must be picklable (module level) for
+                process executors
+            timeout: Seconds to wait, defaults to the executor timeout
+        
+        Returns:
+            Return value of func
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        await self._acquire_slot(timeout)
+        
+        loop = asyncio.get_running_loop()
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self.metrics.submitted += 1
+            self.metrics.in_flight += 1
+            if self.kind == 'thread':
+                self.metrics.queued += 1
+        
+        try:
+            if self.kind == 'thread':
+                call = functools.partial(self._invoke, func, args, kwargs, enqueued_at)
+            else:
+                call = functools.partial(func, *args, **kwargs)
+            future = loop.run_in_executor(self.executor, call)
+        except Exception as e:
+            self._release_slot(None)
+            if isinstance(e, BrokenProcessPool):
+                self._reset()
+            raise
+        
+        # The slot is held until the worker is done, even after a timeout
+        future.add_done_callback(self._release_slot)
+        
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.metrics.timed_out += 1
+            logger.warning(f"Task {getattr(func, '__name__', func)} timed out after {timeout}s on '{self.name}'")
+            raise ExecutorTimeoutError(f"Task exceeded {timeout}s on executor '{self.name}'")
+        except BrokenProcessPool:
+            with self._lock:
+                self.metrics.failed += 1
+            self._reset()
+            raise
+        except Exception:
+            with self._lock:
+                self.metrics.failed += 1
+            raise
+        
+        elapsed_ms = (time.perf_counter() - enqueued_at) * 1000
+        with self._lock:
+            self.metrics.completed += 1
+            self.metrics.total_latency_ms += elapsed_ms
+            self.metrics.max_latency_ms = max(self.metrics.max_latency_ms, elapsed_ms)
+        return result
+    
+    def _reset(self) -> None:
+        """Replace a pool whose worker process died"""
+        logger.error(f"Executor '{self.name}' is broken, restarting it")
+        with self._lock:
+            broken, self._executor = self._executor, None
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool; it is recreated if used again"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info(f"Stopped executor '{self.name}'")
+
+
+class ComputeExecutors:
+    """
+    Shared executors for the AI modules
+    
+    cpu: process pool for pandas and model fitting that hold the GIL
+    numpy: thread pool for NumPy/sklearn inference that releases the GIL
+    """
+    
+    def __init__(self):
+        process_workers = settings.COMPUTE_PROCESS_WORKERS
+        self.numpy = ManagedExecutor(
+            name='numpy',
+            kind='thread',
+            max_workers=settings.COMPUTE_THREAD_WORKERS,
+            max_queue_size=settings.COMPUTE_MAX_QUEUE_SIZE,
+            default_timeout=settings.COMPUTE_TASK_TIMEOUT
+        )
+        # COMPUTE_PROCESS_WORKERS=0 keeps everything in-process (tests, tiny hosts)
+        self.cpu = ManagedExecutor(
+            name='cpu',
+            kind='process' if process_workers > 0 else 'thread',
+            max_workers=process_workers or settings.COMPUTE_THREAD_WORKERS,
+            max_queue_size=settings.COMPUTE_MAX_QUEUE_SIZE,
+            default_timeout=settings.COMPUTE_TASK_TIMEOUT
+        )
+    
+    async def run_cpu(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run GIL-bound work in the process pool"""
+        return await self.cpu.run(func, *args, timeout=timeout, **kwargs)
+    
+    async def run_numpy(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run GIL-releasing NumPy work in the thread pool"""
+        return await self.numpy.run(func, *args, timeout=timeout, **kwargs)
+    
+    def start(self) -> None:
+        """Create the pools up front so the first request does not pay for it"""
+        if self.cpu.kind == 'process':
+            for _ in range(self.cpu.max_workers):
+                self.cpu.executor.submit(_warm_up)
+        self.numpy.executor
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop all pools"""
+        self.cpu.shutdown(wait=wait)
+        self.numpy.shutdown(wait=wait)
+    
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Metrics for every executor"""
+        return {
+            executor.name: {
+                'kind': executor.kind,
+                'max_workers': executor.max_workers,
+                'max_queue_size': executor.max_queue_size,
+                **executor.metrics.to_dict()
+            }
+            for executor in (self.cpu, self.numpy)
+        }
+
+
+# Shared executors for the process
+compute_executors = ComputeExecutors()
@@ -0,0 +1,248 @@
+"""
+Searchable feature tags extracted from free-form listing JSON
+
+Scraped amenities, pet policies, parking and utilities arrive in whatever
+shape the source site uses. They are reduced on write to a flat list of
+canonical tags such as "amenity:pool" or "pets:dogs", which property
+search matches with one indexed array containment test.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import re
+
+AMENITY_SYNONYMS: Dict[str, List[str]] = {
+    'pool': ['pool', 'swimming'],
+    'gym': ['gym', 'fitness'],
+    'laundry_in_unit': ['in unit laundry', 'in unit washer', 'washer dryer', 'w d in unit'],
+    'laundry_on_site': [
+        'laundry',
+        'laundry facility',
+        'laundry facilities',
+        'laundry room',
+        'laundry center',
+        'on site laundry',
+        'laundry on site',
+        'shared laundry',
+        'coin laundry'
+    ],
+    'dishwasher': ['dishwasher'],
+    'air_conditioning': ['air conditioning', 'ac', 'a c', 'central air'],
+    'balcony': ['balcony', 'patio', 'terrace'],
+    'elevator': ['elevator', 'elevators'],
+    'doorman': ['doorman'],
+    'concierge': ['concierge'],
+    'rooftop': ['rooftop', 'roof deck'],
+    'clubhouse': ['clubhouse', 'club house', 'resident lounge'],
+    'business_center': ['business center', 'coworking', 'co working'],
+    'storage': ['storage'],
+    'bike_storage': ['bike storage', 'bicycle storage', 'bike room'],
+    'ev_charging': ['ev charging', 'electric vehicle', 'car charging'],
+    'package_lockers': ['package locker', 'package lockers', 'package room'],
+    'dog_park': ['dog park', 'dog run', 'pet park'],
+    'playground': ['playground'],
+    'hardwood_floors': ['hardwood'],
+    'fireplace': ['fireplace'],
+    'wheelchair_accessible': ['wheelchair', 'accessible', 'ada'],
+    'furnished': ['furnished'],
+    'spa': ['spa', 'hot tub', 'jacuzzi'],
+    'sauna': ['sauna'],
+    'tennis_court': ['tennis'],
+    'grill': ['grill', 'bbq', 'barbecue'],
+    'controlled_access': ['controlled access', 'gated', 'secure entry']
+}
+
+UTILITY_SYNONYMS: Dict[str, List[str]] = {
+    'water': ['water'],
+    'sewer': ['sewer'],
+    'trash': ['trash', 'garbage', 'refuse'],
+    'gas': ['gas'],
+    'electricity': ['electric', 'electricity', 'power'],
+    'heat': ['heat', 'heating'],
+    'hot_water': ['hot water'],
+    'internet': ['internet', 'wifi', 'wi fi', 'broadband'],
+    'cable': ['cable', 'tv']
+}
+
+# Amenities matched only when a phrase is one of their synonyms, so that
+# "in unit laundry" is not also on-site laundry
+WHOLE_PHRASE_AMENITIES = {'laundry_on_site'}
+
+# Parking column phrases that mean a garage, and amenity phrases that do;
+# amenities match whole phrases so "covered patio" is not parking
+GARAGE_PARKING = ['garage', 'covered', 'underground', 'carport']
+GARAGE_AMENITIES = ['garage', 'garage parking', 'parking garage', 'attached garage', 'covered parking', 'underground parking']
+
+# Words that negate the phrase after them, as in "no dogs"
+NEGATIONS = {'no', 'not', 'without'}
+
+# Values that deny their key, as in {"dogs": "Not allowed"}
+NEGATIVE_VALUES = {'no', 'none', 'n a', 'false', '0', 'not allowed', 'not included', 'not available', 'unavailable'}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+class UnknownFeatureError(ValueError):
+    """Raised for a requested amenity or utility outside the vocabulary"""
+
+
+def _normalize(text: Any) -> str:
+    return ' '.join(_NON_WORD.sub(' ', str(text).lower()).split())
+
+
+def _affirms(value: Any) -> bool:
+    """
+    Whether a dict value asserts its key
+    
+    Negative strings ("No", "Not allowed") deny it like False does; a
+    nested dict with an "allowed" key is decided by that key.
+    """
+    if isinstance(value, dict) and 'allowed' in value:
+        return _affirms(value['allowed'])
+    if isinstance(value, str):
+        normalized = _normalize(value)
+        return bool(normalized) and normalized not in NEGATIVE_VALUES and normalized.split()[0] not in NEGATIONS
+    return bool(value)
+
+
+def _phrases(value: Any) -> Iterator[str]:
+    """
+    Normalised phrases a JSON value asserts
+    
+    Dict keys count only when their value affirms them (see _affirms).
+    """
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not _affirms(item):
+                continue
+            yield _normalize(key)
+            if not isinstance(item, bool):
+                yield from _phrases(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _phrases(item)
+    elif isinstance(value, str) and value.strip():
+        yield _normalize(value)
+
+
+def _mentions(phrase: str, synonyms: Iterable[str]) -> bool:
+    words = phrase.split()
+    for synonym in synonyms:
+        target = synonym.split()
+        for i in range(len(words) - len(target) + 1):
+            if words[i:i + len(target)] == target and (i == 0 or words[i - 1] not in NEGATIONS):
+                return True
+    return False
+
+
+def _matching(phrases: List[str], vocabulary: Dict[str, List[str]]) -> Set[str]:
+    return {
+        name for name, synonyms in vocabulary.items()
+        if any(
+            phrase in synonyms if name in WHOLE_PHRASE_AMENITIES else _mentions(phrase, synonyms)
+            for phrase in phrases
+        )
+    }
+
+
+def extract_feature_tags(amenities: Any,
+                         pet_policy: Any,
+                         parking: Any,
+                         utilities_included: Any) -> List[str]:
+    """
+    Canonical feature tags for a property's JSON columns
+    
+    Args:
+        amenities: Property.amenities
+        pet_policy: Property.pet_policy
+        parking: Property.parking
+        utilities_included: Property.utilities_included
+    
+    Returns:
+        Sorted tags
+    """
+    amenity_phrases = list(_phrases(amenities or {}))
+    tags = {f"amenity:{name}" for name in _matching(amenity_phrases, AMENITY_SYNONYMS)}
+    
+    pet_phrases = list(_phrases(pet_policy or {}))
+    if any(_mentions(phrase, ['cat', 'cats']) for phrase in pet_phrases):
+        tags.add('pets:cats')
+    if any(_mentions(phrase, ['dog', 'dogs']) for phrase in pet_phrases):
+        tags.add('pets:dogs')
+    if tags & {'pets:cats', 'pets:dogs'} or any(
+        _mentions(phrase, ['pets allowed', 'pet friendly', 'pets']) for phrase in pet_phrases
+    ):
+        tags.add('pets:allowed')
+    
+    parking_phrases = list(_phrases(parking or {}))
+    if parking_phrases:
+        tags.add('parking:available')
+    if any(_mentions(phrase, GARAGE_PARKING) for phrase in parking_phrases) or any(
+        phrase in GARAGE_AMENITIES for phrase in amenity_phrases
+    ):
+        tags.update({'parking:available', 'parking:garage'})
+    
+    utility_phrases = list(_phrases(utilities_included or {}))
+    tags.update(f"utility:{name}" for name in _matching(utility_phrases, UTILITY_SYNONYMS))
+    
+    return sorted(tags)
+
+
+def has_concessions(concessions: Any) -> bool:
+    """Whether a unit's concessions JSON offers anything"""
+    return any(True for _ in _phrases(concessions or {}))
+
+
+def _canonical(name: str, vocabulary: Dict[str, List[str]], kind: str) -> Set[str]:
+    """Vocabulary names a requested feature means, matched as listing text is on write"""
+    normalized = _normalize(name)
+    if normalized.replace(' ', '_') in vocabulary:
+        return {normalized.replace(' ', '_')}
+    names = _matching([normalized], vocabulary)
+    if not names:
+        raise UnknownFeatureError(f"Unknown {kind} '{name}'; supported: {', '.join(vocabulary)}")
+    return names
+
+
+def search_feature_tags(required_amenities: Optional[List[str]] = None,
+                        utilities_included: Optional[List[str]] = None,
+                        pet_friendly: Optional[bool] = None,
+                        cats_allowed: Optional[bool] = None,
+                        dogs_allowed: Optional[bool] = None,
+                        parking_required: Optional[bool] = None,
+                        garage_required: Optional[bool] = None,
+                        elevator_required: Optional[bool] = None) -> Tuple[List[str], List[str]]:
+    """
+    Tags a search requires and tags it excludes
+    
+    Args:
+        required_amenities: Amenity names or synonyms
+        utilities_included: Utility names or synonyms
+        pet_friendly, cats_allowed, dogs_allowed, parking_required,
+        garage_required, elevator_required: True requires the feature,
+            False excludes it, None ignores it
+    
+    Returns:
+        (required tags, excluded tags)
+    
+    Raises:
+        UnknownFeatureError: For an amenity or utility outside the vocabulary
+    """
+    required = set()
+    for name in required_amenities or []:
+        required.update(f"amenity:{canonical}" for canonical in _canonical(name, AMENITY_SYNONYMS, 'amenity'))
+    for name in utilities_included or []:
+        required.update(f"utility:{canonical}" for canonical in _canonical(name, UTILITY_SYNONYMS, 'utility'))
+    
+    excluded = set()
+    for flag, tag in (
+        (pet_friendly, 'pets:allowed'),
+        (cats_allowed, 'pets:cats'),
+        (dogs_allowed, 'pets:dogs'),
+        (parking_required, 'parking:available'),
+        (garage_required, 'parking:garage'),
+        (elevator_required, 'amenity:elevator')
+    ):
+        if flag is True:
+            required.add(tag)
+        elif flag is False:
+            excluded.add(tag)
+    return sorted(required), sorted(excluded)
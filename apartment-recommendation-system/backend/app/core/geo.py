@@ -0,0 +1,137 @@
+"""
+Great-circle distance and geohash helpers
+"""
+from typing import List, Tuple
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.7613
+METERS_PER_MILE = 1609.344
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+# Precision of the stored property geohash (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in miles; accepts scalars or numpy arrays
+    
+    Args:
+        lat1, lon1: First point(s) in degrees
+        lat2, lon2: Second point(s) in degrees
+    
+    Returns:
+        Distance(s) in miles
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Geohash of a point
+    
+    Args:
+        latitude: Latitude in degrees
+        longitude: Longitude in degrees
+        precision: Number of base32 characters
+    
+    Returns:
+        Geohash string
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Bits alternate starting with longitude
+    
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    
+    return ''.join(chars)
+
+
+def geohash_cell_degrees(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell at the given precision"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_geohashes(latitude: float, longitude: float, radius_miles: float) -> List[str]:
+    """
+    Geohash prefixes whose cells together cover a circle
+    
+    Uses the finest precision whose cells are at least as large as the
+    radius, so the circle fits in the 3x3 block around its centre cell.
+    
+    Args:
+        latitude: Centre latitude in degrees
+        longitude: Centre longitude in degrees
+        radius_miles: Circle radius
+    
+    Returns:
+        Up to nine distinct prefixes
+    """
+    # Cells are narrowest at the circle's edge furthest from the equator
+    edge_latitude = min(abs(latitude) + radius_miles / MILES_PER_DEGREE_LATITUDE, 89.9)
+    miles_per_degree_longitude = MILES_PER_DEGREE_LATITUDE * math.cos(math.radians(edge_latitude))
+    
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_degrees(candidate)
+        if (height * MILES_PER_DEGREE_LATITUDE >= radius_miles
+                and width * miles_per_degree_longitude >= radius_miles):
+            precision = candidate
+            break
+    
+    height, width = geohash_cell_degrees(precision)
+    prefixes = []
+    for d_lat in (-height, 0.0, height):
+        for d_lon in (-width, 0.0, width):
+            lat = max(min(latitude + d_lat, 90.0 - 1e-9), -90.0)
+            lon = (longitude + d_lon + 180.0) % 360.0 - 180.0
+            prefix = geohash_encode(lat, lon, precision)
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+    
+    return prefixes
+
+
+def geohash_prefix_range(prefix: str) -> Tuple[str, str]:
+    """
+    Half-open [low, high) string range holding every geohash with a prefix
+    
+    Expressed with geohash characters only, so a B-tree range scan works
+    under any collation.
+    """
+    chars = list(prefix)
+    while chars:
+        index = GEOHASH_ALPHABET.index(chars[-1])
+        if index + 1 < len(GEOHASH_ALPHABET):
+            chars[-1] = GEOHASH_ALPHABET[index + 1]
+            return prefix, ''.join(chars)
+        chars.pop()
+    # All 'z': everything from prefix onwards
+    return prefix, GEOHASH_ALPHABET[-1] * (GEOHASH_PRECISION + 1)
@@ -0,0 +1,231 @@
+"""
+Keyset (cursor) pagination
+
+A page is fetched with WHERE (sort keys, id) > (last row's keys) instead
+of OFFSET, so every page costs one index range scan however deep it is,
+and rows inserted or removed earlier in the ordering do not shift later
+pages. Cursors are opaque to clients: base64 of the ordering name and
+the last row's key values.
+"""
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+import base64
+import binascii
+import json
+import math
+
+from sqlalchemy import and_, or_, tuple_
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that is malformed or belongs to another ordering"""
+
+
+def _encode_value(value: Any) -> List[Any]:
+    if value is None:
+        return ['n', None]
+    if isinstance(value, bool):
+        return ['b', value]
+    if isinstance(value, Decimal):
+        return ['d', str(value)]
+    if isinstance(value, datetime):
+        return ['t', value.isoformat()]
+    if isinstance(value, date):
+        return ['D', value.isoformat()]
+    if isinstance(value, UUID):
+        return ['u', str(value)]
+    if isinstance(value, int):
+        return ['i', value]
+    if isinstance(value, float):
+        return ['f', value]
+    return ['s', str(value)]
+
+
+_DECODERS = {
+    'n': lambda value: None,
+    'b': bool,
+    'd': Decimal,
+    't': datetime.fromisoformat,
+    'D': date.fromisoformat,
+    'u': UUID,
+    'i': int,
+    'f': float,
+    's': str
+}
+
+
+_NUMBER_TYPES = (int, float, Decimal)
+
+
+def _python_type(expression: Any) -> Optional[type]:
+    """Python type of a key expression's values, None when unknown"""
+    try:
+        return expression.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+def _coerce_value(value: Any, expected: Optional[type]) -> Any:
+    """
+    A decoded value as the type its key expects
+    
+    Raises:
+        CursorError: If the value cannot be a value of that key
+    """
+    if value is None or expected is None:
+        return value
+    if expected in _NUMBER_TYPES:
+        # Numbers may round-trip through another numeric tag; booleans may not
+        if isinstance(value, bool) or not isinstance(value, _NUMBER_TYPES) or not math.isfinite(value):
+            raise CursorError("Cursor does not match this ordering")
+        if expected is int:
+            if value != int(value):
+                raise CursorError("Cursor does not match this ordering")
+            return int(value)
+        return Decimal(str(value)) if expected is Decimal else float(value)
+    if not isinstance(value, expected) or (expected is date and isinstance(value, datetime)):
+        raise CursorError("Cursor does not match this ordering")
+    return value
+
+
+def encode_cursor(name: str, values: Sequence[Any]) -> str:
+    """
+    Opaque cursor for a position in an ordering
+    
+    Args:
+        name: Ordering the cursor belongs to
+        values: Key values of the last row returned
+    
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([name, [_encode_value(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(name: str,
+                  cursor: str,
+                  size: int,
+                  types: Optional[Sequence[Optional[type]]] = None) -> List[Any]:
+    """
+    Key values from a cursor made by encode_cursor
+    
+    The type tags inside a cursor come from the client, so when types is
+    given each value must fit its key's type rather than the tag alone.
+    
+    Args:
+        name: Ordering the cursor must belong to
+        cursor: Cursor string
+        size: Expected number of key values
+        types: Python type of each key's values; None entries accept any
+    
+    Returns:
+        Key values, coerced to types when given
+    
+    Raises:
+        CursorError: If the cursor is malformed, for another ordering or
+            holds a value of the wrong type
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_name, encoded = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_DECODERS[tag](value) for tag, value in encoded]
+    except (binascii.Error, TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise CursorError("Malformed cursor")
+    
+    if cursor_name != name or len(values) != size:
+        raise CursorError("Cursor does not match this ordering")
+    if types is not None:
+        values = [_coerce_value(value, expected) for value, expected in zip(values, types)]
+    return values
+
+
+class Keyset:
+    """
+    An ordering over key expressions plus a unique tiebreaker column
+    
+    The tiebreaker sorts in the direction of the last key, so an ordering
+    whose keys share one direction is served by a single composite index
+    on (keys..., tiebreaker), scanned backwards when descending.
+    """
+    
+    def __init__(self, name: str, keys: Sequence[Tuple[Any, bool]], tiebreaker: Any):
+        """
+        Args:
+            name: Identifies the ordering inside its cursors
+            keys: (expression, descending) pairs, most significant first;
+                expressions must not be NULL
+            tiebreaker: Unique column, usually the primary key
+        """
+        self.name = name
+        descending = keys[-1][1] if keys else False
+        self.keys = list(keys) + [(tiebreaker, descending)]
+        self.types = [_python_type(expression) for expression, _ in self.keys]
+    
+    def apply(self, query: Any, cursor: Optional[str], limit: int, offset: int = 0) -> Any:
+        """
+        Order a query and restrict it to the page after a cursor
+        
+        One extra row is fetched to tell whether another page follows;
+        the key values are appended to each row as extra columns. Without
+        a cursor, offset is honoured so page-numbered clients still work.
+        
+        Args:
+            query: Select to page
+            cursor: Cursor from the previous page, if any
+            limit: Page size
+            offset: Rows to skip when no cursor is given
+        
+        Returns:
+            Paged select; pass its rows to page()
+        
+        Raises:
+            CursorError: If the cursor is invalid
+        """
+        if cursor:
+            query = query.where(self.after(decode_cursor(self.name, cursor, len(self.keys), self.types)))
+        elif offset:
+            query = query.offset(offset)
+        
+        return (
+            query.add_columns(*[expression.label(f"cursor_key_{i}") for i, (expression, _) in enumerate(self.keys)])
+            .order_by(*[expression.desc() if descending else expression for expression, descending in self.keys])
+            .limit(limit + 1)
+        )
+    
+    def page(self, rows: Sequence[Any], limit: int) -> Tuple[List[Tuple[Any, ...]], Optional[str]]:
+        """
+        Split fetched rows into the page and the cursor for the next one
+        
+        Args:
+            rows: Rows from a select built by apply()
+            limit: Page size
+        
+        Returns:
+            Rows without their key columns, and the next cursor (None on
+            the last page)
+        """
+        rows = list(rows)
+        key_count = len(self.keys)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(self.name, list(rows[-1][-key_count:]))
+        return [tuple(row[:-key_count]) for row in rows], next_cursor
+    
+    def after(self, values: Sequence[Any]) -> Any:
+        """WHERE clause selecting rows strictly after the given key values"""
+        directions = {descending for _, descending in self.keys}
+        if len(directions) == 1:
+            # Row-value comparison; a single index range condition
+            row = tuple_(*[expression for expression, _ in self.keys])
+            return row < tuple(values) if directions.pop() else row > tuple(values)
+        
+        clauses = []
+        for i, (expression, descending) in enumerate(self.keys):
+            ties = [self.keys[j][0] == values[j] for j in range(i)]
+            beyond = expression < values[i] if descending else expression > values[i]
+            clauses.append(and_(*ties, beyond))
+        return or_(*clauses)
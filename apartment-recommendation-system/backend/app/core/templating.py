@@ -0,0 +1,169 @@
+"""
+Compiled {{placeholder}} templates for offer letters and scripts
+
+A template is split once into literal text and placeholder slots; rendering
+is then a single join with no parsing. Placeholders may carry a format spec,
+e.g. {{offer_amount:,.0f}}.
+"""
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+import re
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*(?::([^{}]*?))?\s*\}\}")
+
+
+# Values a format spec is tried against at compile time; specs containing
+# '%' are taken to be strftime formats for dates
+FORMAT_SAMPLES = (0, 0.0, '')
+
+
+def _valid_spec(spec: str) -> bool:
+    if '%' in spec:
+        return True
+    for sample in FORMAT_SAMPLES:
+        try:
+            format(sample, spec)
+            return True
+        except ValueError:
+            pass
+    return False
+
+
+class TemplateError(ValueError):
+    """Template cannot be compiled or rendered"""
+
+
+class MissingVariablesError(TemplateError):
+    """Required template variables are absent"""
+    
+    def __init__(self, missing: Sequence[str], message: str):
+        super().__init__(message)
+        self.missing = list(missing)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Template split into literal text and placeholder slots"""
+    literals: Tuple[str, ...]  # len(slots) + 1 pieces of text around the slots
+    slots: Tuple[Tuple[str, str], ...]  # (variable name, format spec)
+    required: frozenset
+    
+    @property
+    def variables(self) -> frozenset:
+        """Every variable the template refers to"""
+        return frozenset(name for name, _ in self.slots)
+    
+    def render(self, context: Dict[str, Any]) -> str:
+        """
+        Render the template
+        
+        Args:
+            context: Variable values; absent optional variables render empty
+        
+        Returns:
+            Rendered text
+        
+        Raises:
+            MissingVariablesError: If a required variable is absent or None
+            TemplateError: If a value does not fit its format spec
+        """
+        missing = [name for name in self.required if context.get(name) is None]
+        if missing:
+            raise MissingVariablesError(sorted(missing), f"Missing template variables: {', '.join(sorted(missing))}")
+        
+        parts = [self.literals[0]]
+        for (name, spec), literal in zip(self.slots, self.literals[1:]):
+            value = context.get(name)
+            if value is None:
+                parts.append('')
+            elif spec:
+                try:
+                    parts.append(format(value, spec))
+                except (ValueError, TypeError) as e:
+                    raise TemplateError(f"Cannot format {name} with {spec}: {e}")
+            else:
+                parts.append(str(value))
+            parts.append(literal)
+        return ''.join(parts)
+    
+    def render_many(self, contexts: Iterable[Dict[str, Any]]) -> List[str]:
+        """Render once per context, e.g. for bulk offer generation"""
+        return [self.render(context) for context in contexts]
+
+
+def compile_template(source: str,
+                     required_variables: Iterable[str] = (),
+                     optional_variables: Optional[Iterable[str]] = None) -> CompiledTemplate:
+    """
+    Parse a {{placeholder}} template
+    
+    Args:
+        source: Template text
+        required_variables: Variables that must appear in the template and
+            be supplied at render time
+        optional_variables: Other variables the template may use; when
+            given, any placeholder outside both lists is rejected
+    
+    Returns:
+        Compiled template
+    
+    Raises:
+        TemplateError: If the template does not match its declared variables
+    """
+    pieces = PLACEHOLDER_PATTERN.split(source or '')
+    literals = tuple(pieces[0::3])
+    slots = tuple(zip(pieces[1::3], (spec or '' for spec in pieces[2::3])))
+    
+    used = {name for name, _ in slots}
+    required = frozenset(required_variables or ())
+    
+    unused = required - used
+    if unused:
+        raise TemplateError(f"Required variables not used by template: {', '.join(sorted(unused))}")
+    
+    if optional_variables is not None:
+        undeclared = used - required - set(optional_variables)
+        if undeclared:
+            raise TemplateError(f"Template uses undeclared variables: {', '.join(sorted(undeclared))}")
+    
+    # Surface bad format specs now rather than on the first render
+    for name, spec in slots:
+        if spec and not _valid_spec(spec):
+            raise TemplateError(f"Invalid format for {name}: {spec}")
+    
+    return CompiledTemplate(literals=literals, slots=slots, required=required)
+
+
+class TemplateCache:
+    """Compiled templates keyed by an identity that changes with their source"""
+    
+    def __init__(self, max_size: int = 256):
+        self._cache = LRUCache(max_size=max_size)
+    
+    def get(self, key: Hashable, compile_fn: Callable[[], Any]) -> Any:
+        """
+        Compiled template for key, calling compile_fn on a miss
+        
+        Args:
+            key: Identity of this version of the template, e.g.
+                (template id, updated_at)
+            compile_fn: Builds the compiled form from the template source
+            
+        Returns:
+            Compiled template
+        """
+        compiled = self._cache.get(key)
+        if compiled is None:
+            compiled = compile_fn()
+            self._cache.set(key, compiled)
+        return compiled
+    
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+# Shared cache for the process
+template_cache = TemplateCache(max_size=settings.TEMPLATE_CACHE_SIZE)
@@ -0,0 +1,143 @@
+"""
+Text normalisation and ranking helpers for search
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import bisect
+import math
+import re
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of a string"""
+    if not text:
+        return []
+    return WORD_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index ranking documents with BM25 over weighted fields
+    
+    Each field's term frequencies are scaled by its weight before the
+    usual BM25 saturation, so a title hit counts for more than a body hit.
+    Query terms are ANDed; the last term also matches as a prefix so
+    partially typed words still find results.
+    """
+    
+    def __init__(self, field_weights: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        
+        self._postings: Dict[str, Dict[object, float]] = {}
+        self._documents: Dict[object, Dict[str, float]] = {}
+        self._lengths: Dict[object, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+    
+    def add(self, doc_id: object, fields: Dict[str, Optional[str]]) -> None:
+        """
+        Index a document, replacing any previous version
+        
+        Args:
+            doc_id: Document key
+            fields: Field name to text; fields without a weight are ignored
+        """
+        self.remove(doc_id)
+        
+        frequencies: Dict[str, float] = {}
+        for field, weight in self.field_weights.items():
+            for term in tokenize(fields.get(field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        if not frequencies:
+            return
+        
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary = None
+            postings[doc_id] = frequency
+        
+        length = sum(frequencies.values())
+        self._documents[doc_id] = frequencies
+        self._lengths[doc_id] = length
+        self._total_length += length
+    
+    def remove(self, doc_id: object) -> None:
+        """Drop a document if it is indexed"""
+        frequencies = self._documents.pop(doc_id, None)
+        if frequencies is None:
+            return
+        
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._vocabulary = None
+        self._total_length -= self._lengths.pop(doc_id)
+    
+    def search(self, query: str, prefix_last: bool = True) -> List[Tuple[object, float]]:
+        """
+        Documents containing every query term, best first
+        
+        Args:
+            query: Free text
+            prefix_last: Match the final term as a prefix
+        
+        Returns:
+            (doc_id, score) pairs
+        """
+        terms = tokenize(query)
+        if not terms or not self._documents:
+            return []
+        
+        scores: Optional[Dict[object, float]] = None
+        for position, term in enumerate(terms):
+            if prefix_last and position == len(terms) - 1:
+                expansions = self._expand(term)
+            else:
+                expansions = [term] if term in self._postings else []
+            
+            # Best-scoring expansion per document
+            term_scores: Dict[object, float] = {}
+            for expansion in expansions:
+                for doc_id, score in self._term_scores(expansion):
+                    if score > term_scores.get(doc_id, 0.0):
+                        term_scores[doc_id] = score
+            
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return []
+        
+        return sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+    
+    def _term_scores(self, term: str) -> Iterable[Tuple[object, float]]:
+        postings = self._postings[term]
+        count = len(self._documents)
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        average_length = self._total_length / count
+        
+        for doc_id, frequency in postings.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+            yield doc_id, idf * frequency * (self.k1 + 1) / (frequency + norm)
+    
+    def _expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(prefix):
+            end += 1
+        return self._vocabulary[start:end]
@@ -9,9 +9,19 @@ from contextlib import asynccontextmanager
 import logging
 
 from app.core.config import settings
-from app.db.base import init_db, close_db
+from app.db.base import AsyncSessionLocal, engine, init_db, close_db
 from app.api.v1.api import api_router
 from app.core.logging import setup_logging
+from app.core.executors import compute_executors
+from app.services.commute_search import commute_grid
+from app.services.feature_search import feature_search
+from app.services.geo_index import geo_index
+from app.services.geo_search import geo_search
+from app.services.search_alerts import search_percolator
+from app.services.search_profiler import search_profiler
+from app.services.suggestions import suggestion_service
+from app.services.text_search import text_search
+from app.services.unit_search import unit_search_index
 
 # Setup logging
 setup_logging()
@@ -30,12 +40,34 @@ async def lifespan(app: FastAPI):
     # Initialize database
     if settings.APP_ENV != "test":
         await init_db()
+        await geo_search.setup(engine)
+        await text_search.setup(engine)
+        await feature_search.setup(engine)
+        await search_percolator.setup(engine)
+        await unit_search_index.setup(engine)
         logger.info("Database initialized")
+        
+        async with AsyncSessionLocal() as db:
+            await text_search.build(db)
+            await suggestion_service.build(db)
+            if settings.GEO_INDEX_ENABLED:
+                await geo_index.build(db)
+            if settings.SEARCH_ALERTS_ENABLED:
+                await search_percolator.build(db)
+        
+        commute_grid.refresh()
+    
+    # Time searches from the engine's statement events
+    search_profiler.install(engine)
+    
+    # Start worker pools for CPU-bound AI work
+    compute_executors.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down application")
+    compute_executors.shutdown()
     await close_db()
     logger.info("Database connections closed")
 
@@ -2,8 +2,8 @@
 Database models package
 """
 from app.models.user import User, UserPreference, SavedSearch, Favorite, UserSession
-from app.models.property import Property, Unit, PriceHistory, PropertyReview
-from app.models.market import MarketVelocity, MarketTrend, AIPrediction, MarketAlert, MarketStatus
+from app.models.property import Property, Unit, PriceHistory, PropertyReview, UnitSearch
+from app.models.market import MarketVelocity, MarketTrend, AIPrediction, MarketAlert, MarketStatus, NegotiationLeaderboard
 from app.models.offer import Offer, OfferTemplate, OfferTemplateUsage, NegotiationHistory, OfferStatus
 
 __all__ = [
@@ -19,6 +19,7 @@ __all__ = [
     "Unit",
     "PriceHistory",
     "PropertyReview",
+    "UnitSearch",
     
     # Market models
     "MarketVelocity",
@@ -26,6 +27,7 @@ __all__ = [
     "AIPrediction",
     "MarketAlert",
     "MarketStatus",
+    "NegotiationLeaderboard",
     
     # Offer models
     "Offer",
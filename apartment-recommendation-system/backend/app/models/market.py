@@ -1,7 +1,7 @@
 """
 Market intelligence and analytics models
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Float, Integer, DECIMAL, Date, Enum, Boolean, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Float, Integer, DECIMAL, Date, Enum, Boolean, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -84,6 +84,11 @@ class MarketTrend(Base, BaseModel):
     # Price Movement
     price_change_percentage = Column(Float, nullable=True)
     price_change_amount = Column(DECIMAL(10, 2), nullable=True)
+    min_price = Column(DECIMAL(10, 2), nullable=True)
+    max_price = Column(DECIMAL(10, 2), nullable=True)
+    trend_direction = Column(String(20), nullable=True)  # increasing, stable, decreasing
+    price_volatility = Column(Float, nullable=True)  # Coefficient of variation
+    volatility_class = Column(String(20), nullable=True)  # low, medium, high
     
     # Inventory Metrics
     total_units_available = Column(Integer, nullable=True)
@@ -154,10 +159,46 @@ class AIPrediction(Base, BaseModel):
     user = relationship("User", back_populates="ai_predictions")
 
 
+class NegotiationLeaderboard(Base, BaseModel):
+    """Available units ranked by negotiation score within (city, bedrooms)"""
+    
+    __tablename__ = "negotiation_leaderboard"
+    __table_args__ = (
+        # Serves "top units in a segment" as a (backward) index range scan
+        Index("ix_negotiation_leaderboard_rank", "city", "bedrooms", "total_score", "unit_id"),
+    )
+    
+    unit_id = Column(UUID(as_uuid=True), ForeignKey("units.id"), unique=True, nullable=False)
+    property_id = Column(UUID(as_uuid=True), ForeignKey("properties.id"), nullable=False)
+    
+    # Segment
+    city = Column(String(100), nullable=False)
+    bedrooms = Column(Integer, nullable=False)
+    
+    # Scores
+    total_score = Column(Float, nullable=False)  # Weighted total before rounding
+    negotiation_score = Column(Integer, nullable=False)  # 1-10
+    negotiation_potential = Column(String(20), nullable=False)
+    component_scores = Column(JSON, default={}, nullable=False)
+    
+    # Unit snapshot for display
+    property_name = Column(String(255), nullable=False)
+    unit_number = Column(String(50), nullable=True)
+    current_price = Column(DECIMAL(10, 2), nullable=False)
+    days_on_market = Column(Integer, default=0, nullable=False)
+    has_concessions = Column(Boolean, default=False, nullable=False)
+    
+    scored_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class MarketAlert(Base, BaseModel):
     """Market alerts and notifications"""
     
     __tablename__ = "market_alerts"
+    __table_args__ = (
+        # Recent alerts for a unit, checked before alerting a search again
+        Index("ix_market_alerts_unit_type_created", "unit_id", "alert_type", "created_at"),
+    )
     
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     
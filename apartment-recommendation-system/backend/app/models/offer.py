@@ -1,7 +1,7 @@
 """
 Offer generation and tracking models
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Float, Integer, DECIMAL, Text, Boolean, Enum, Date, func
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Float, Integer, DECIMAL, Text, Boolean, Enum, Date, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
@@ -27,6 +27,10 @@ class Offer(Base, BaseModel):
     """Offer management model"""
     
     __tablename__ = "offers"
+    __table_args__ = (
+        # A user's offers, newest first, by keyset
+        Index("ix_offers_user_created", "user_id", "created_at", "id"),
+    )
     
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     unit_id = Column(UUID(as_uuid=True), ForeignKey("units.id"), nullable=False)
@@ -1,19 +1,28 @@
 """
 Property and Unit related database models
 """
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Float, Integer, Text, DECIMAL, Date
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Float, Integer, Text, DECIMAL, Date, Enum, Index, event, func, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
 from sqlalchemy.orm import relationship
 # from geoalchemy2 import Geometry  # Uncomment when geoalchemy2 is installed
 
+from app.core.features import extract_feature_tags, has_concessions
+from app.core.geo import geohash_encode
 from app.db.base import Base
 from app.models.base import BaseModel
+from app.models.market import MarketStatus
 
 
 class Property(Base, BaseModel):
     """Property/Building model"""
     
     __tablename__ = "properties"
+    __table_args__ = (
+        # Keyset pagination by listing date
+        Index("ix_properties_active_created", "is_active", "created_at", "id"),
+        # Feature filters: one containment test over the derived tags
+        Index("ix_properties_feature_tags", "feature_tags", postgresql_using="gin"),
+    )
     
     # Basic Information
     external_id = Column(String(255), unique=True, nullable=True, index=True)  # ID from source website
@@ -35,7 +44,11 @@ class Property(Base, BaseModel):
     # Geographic Coordinates
     latitude = Column(DECIMAL(10, 8), nullable=True)
     longitude = Column(DECIMAL(11, 8), nullable=True)
-    # location = Column(Geometry('POINT', srid=4326), nullable=True)  # PostGIS geometry - uncomment when geoalchemy2 is installed
+    geohash = Column(String(12), nullable=True, index=True)  # Maintained from latitude/longitude
+    # With PostGIS, a generated geography column "location" is added at startup (see services/geo_search)
+    
+    # Set on results of distance queries; not stored
+    distance_miles = None
     
     # Building Information
     year_built = Column(Integer, nullable=True)
@@ -56,6 +69,7 @@ class Property(Base, BaseModel):
     pet_policy = Column(JSON, default={}, nullable=False)
     parking = Column(JSON, default={}, nullable=False)
     utilities_included = Column(JSON, default={}, nullable=False)
+    feature_tags = Column(ARRAY(String(64)), nullable=True)  # Derived from the four columns above on write
     
     # Media
     images = Column(JSON, default=[], nullable=False)  # Array of image URLs
@@ -73,6 +87,13 @@ class Property(Base, BaseModel):
     rating = Column(DECIMAL(2, 1), nullable=True)  # Average rating 0.0-5.0
     review_count = Column(Integer, default=0, nullable=False)
     
+    # Aggregates over the available units, maintained with unit_search (see services/unit_search)
+    min_price = Column(DECIMAL(10, 2), nullable=True)
+    max_price = Column(DECIMAL(10, 2), nullable=True)
+    max_bedrooms = Column(Integer, nullable=True)
+    max_square_feet = Column(Integer, nullable=True)
+    max_days_on_market = Column(Integer, nullable=True)
+    
     # Status
     is_active = Column(Boolean, default=True, nullable=False)
     last_scraped_at = Column(DateTime(timezone=True), nullable=True)
@@ -88,6 +109,13 @@ class Unit(Base, BaseModel):
     """Individual unit/apartment model"""
     
     __tablename__ = "units"
+    __table_args__ = (
+        # Keyset pagination over available units
+        Index("ix_units_available_price", "is_available", "current_price", "id"),
+        Index("ix_units_available_created", "is_available", "created_at", "id"),
+        Index("ix_units_available_bedrooms", "is_available", "bedrooms", "id"),
+        Index("ix_units_concessions_property", "has_concessions", "property_id"),
+    )
     
     property_id = Column(UUID(as_uuid=True), ForeignKey("properties.id"), nullable=False)
     
@@ -125,6 +153,7 @@ class Unit(Base, BaseModel):
     
     # Special Offers
     concessions = Column(JSON, default={}, nullable=False)
+    has_concessions = Column(Boolean, nullable=True)  # Derived from concessions on write
     special_offers = Column(Text, nullable=True)
     effective_rent = Column(DECIMAL(10, 2), nullable=True)
     
@@ -205,4 +234,118 @@ class PropertyReview(Base, BaseModel):
     helpful_count = Column(Integer, default=0, nullable=False)
     
     # Relationships
-    property = relationship("Property", back_populates="reviews")
\ No newline at end of file
+    property = relationship("Property", back_populates="reviews")
+
+
+class UnitSearch(Base):
+    """
+    One row per unit of an active property, with the columns searches
+    filter and sort on from the unit, its property and its market velocity
+    
+    Maintained by services/unit_search on inventory writes; searches read
+    it alone instead of joining units, properties and market_velocity.
+    """
+    
+    __tablename__ = "unit_search"
+    __table_args__ = (
+        # Unit search orderings; covering, so filters are checked in the index
+        Index(
+            "ix_unit_search_price", "is_available", "current_price", "unit_id",
+            postgresql_include=["property_id", "city", "bedrooms", "bathrooms", "square_feet"]
+        ),
+        Index("ix_unit_search_bedrooms", "is_available", "bedrooms", "unit_id"),
+        Index("ix_unit_search_listed", "is_available", "listed_at", "unit_id"),
+        # Radius filters: geohash cells narrow candidates before the exact distance
+        Index("ix_unit_search_geohash", "geohash"),
+        # Unit filters of property search, probed per property
+        Index(
+            "ix_unit_search_property", "property_id", "is_available", "current_price",
+            postgresql_include=["bedrooms", "bathrooms", "square_feet"]
+        ),
+        # Exact location filters
+        Index("ix_unit_search_state_price", "state", "is_available", "current_price"),
+        Index("ix_unit_search_zip_price", "zip_code", "is_available", "current_price"),
+    )
+    
+    unit_id = Column(UUID(as_uuid=True), ForeignKey("units.id", ondelete="CASCADE"), primary_key=True)
+    property_id = Column(UUID(as_uuid=True), ForeignKey("properties.id", ondelete="CASCADE"), nullable=False)
+    
+    # Unit
+    is_available = Column(Boolean, nullable=False)
+    bedrooms = Column(Integer, nullable=False)
+    bathrooms = Column(DECIMAL(3, 1), nullable=False)
+    square_feet = Column(Integer, nullable=True)
+    current_price = Column(DECIMAL(10, 2), nullable=False)
+    available_date = Column(Date, nullable=True)
+    has_concessions = Column(Boolean, nullable=True)
+    listed_at = Column(DateTime(timezone=True), nullable=False)  # The unit's created_at
+    
+    # Property
+    city = Column(String(100), nullable=False)
+    state = Column(String(50), nullable=False)
+    zip_code = Column(String(20), nullable=False)
+    property_type = Column(String(50), nullable=True)
+    latitude = Column(DECIMAL(10, 8), nullable=True)
+    longitude = Column(DECIMAL(11, 8), nullable=True)
+    geohash = Column(String(12), nullable=True)
+    rating = Column(DECIMAL(2, 1), nullable=True)
+    
+    # Market velocity of the unit, when tracked
+    market_status = Column(Enum(MarketStatus), nullable=True)
+    days_on_market = Column(Integer, nullable=True)
+    price_drop_percentage = Column(Float, nullable=True)
+
+
+# Sort keys over nullable columns, coalesced to a sentinel that sorts last
+# so keyset comparisons never meet NULL; indexed on the same expressions
+PROPERTY_RATING_SORT = func.coalesce(Property.rating, literal_column("-1"))
+PROPERTY_MIN_PRICE_SORT = func.coalesce(Property.min_price, literal_column("99999999.99"))
+PROPERTY_MAX_PRICE_SORT = func.coalesce(Property.max_price, literal_column("-1"))
+PROPERTY_BEDROOMS_SORT = func.coalesce(Property.max_bedrooms, literal_column("-1"))
+PROPERTY_SQUARE_FEET_SORT = func.coalesce(Property.max_square_feet, literal_column("-1"))
+PROPERTY_DAYS_ON_MARKET_SORT = func.coalesce(Property.max_days_on_market, literal_column("-1"))
+UNIT_SQUARE_FEET_SORT = func.coalesce(Unit.square_feet, literal_column("-1"))
+UNIT_AVAILABLE_DATE_SORT = func.coalesce(Unit.available_date, literal_column("'9999-12-31'"))
+UNIT_SEARCH_SQUARE_FEET_SORT = func.coalesce(UnitSearch.square_feet, literal_column("-1"))
+UNIT_SEARCH_AVAILABLE_DATE_SORT = func.coalesce(UnitSearch.available_date, literal_column("'9999-12-31'"))
+UNIT_SEARCH_RATING_SORT = func.coalesce(UnitSearch.rating, literal_column("-1"))
+UNIT_SEARCH_DAYS_ON_MARKET_SORT = func.coalesce(UnitSearch.days_on_market, literal_column("-1"))
+
+Index("ix_properties_active_rating", Property.is_active, PROPERTY_RATING_SORT, Property.id)
+Index("ix_properties_active_min_price", Property.is_active, PROPERTY_MIN_PRICE_SORT, Property.id)
+Index("ix_properties_active_max_price", Property.is_active, PROPERTY_MAX_PRICE_SORT, Property.id)
+Index("ix_properties_active_bedrooms", Property.is_active, PROPERTY_BEDROOMS_SORT, Property.id)
+Index("ix_properties_active_square_feet", Property.is_active, PROPERTY_SQUARE_FEET_SORT, Property.id)
+Index("ix_properties_active_days_on_market", Property.is_active, PROPERTY_DAYS_ON_MARKET_SORT, Property.id)
+Index("ix_units_available_square_feet", Unit.is_available, UNIT_SQUARE_FEET_SORT, Unit.id)
+Index("ix_units_available_date", Unit.is_available, UNIT_AVAILABLE_DATE_SORT, Unit.id)
+Index("ix_unit_search_square_feet", UnitSearch.is_available, UNIT_SEARCH_SQUARE_FEET_SORT, UnitSearch.unit_id)
+Index("ix_unit_search_available_date", UnitSearch.is_available, UNIT_SEARCH_AVAILABLE_DATE_SORT, UnitSearch.unit_id)
+Index("ix_unit_search_rating", UnitSearch.is_available, UNIT_SEARCH_RATING_SORT, UnitSearch.unit_id)
+Index("ix_unit_search_days_on_market", UnitSearch.is_available, UNIT_SEARCH_DAYS_ON_MARKET_SORT, UnitSearch.unit_id)
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_geohash(mapper, connection, target: Property) -> None:
+    """Keep the indexed geohash in step with the coordinates"""
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = geohash_encode(float(target.latitude), float(target.longitude))
+    else:
+        target.geohash = None
+
+
+@event.listens_for(Property, "before_insert")
+@event.listens_for(Property, "before_update")
+def _update_feature_tags(mapper, connection, target: Property) -> None:
+    """Keep the indexed feature tags in step with the free-form JSON"""
+    target.feature_tags = extract_feature_tags(
+        target.amenities, target.pet_policy, target.parking, target.utilities_included
+    )
+
+
+@event.listens_for(Unit, "before_insert")
+@event.listens_for(Unit, "before_update")
+def _update_has_concessions(mapper, connection, target: Unit) -> None:
+    """Keep the indexed concession flag in step with the concessions JSON"""
+    target.has_concessions = has_concessions(target.concessions)
@@ -1,7 +1,7 @@
 """
 User related database models
 """
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Float, Integer, Text, ARRAY
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Float, Integer, Text, ARRAY, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -97,6 +97,10 @@ class SavedSearch(Base, BaseModel):
     """Saved search criteria for users"""
     
     __tablename__ = "saved_searches"
+    __table_args__ = (
+        # Saved-search changes polled by each worker's alert index
+        Index("ix_saved_searches_updated", "updated_at"),
+    )
     
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     
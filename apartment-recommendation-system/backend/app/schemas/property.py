@@ -112,6 +112,12 @@ class Property(PropertyBase):
     last_scraped_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
+    
+    # Present on results of geographic searches
+    distance_miles: Optional[float] = None
+    
+    # Present on results of commute searches
+    commute_minutes: Optional[int] = None
 
 
 class PropertyWithUnits(Property):
@@ -104,14 +104,17 @@ class PropertySearch(PropertySearchBase):
     sort_by: PropertySortBy = PropertySortBy.NEWEST
     sort_order: SortOrder = SortOrder.ASC
     
-    # Pagination
+    # Pagination; a cursor from a previous response takes precedence over page
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None
+    exact_total: bool = False  # Count every match instead of accepting an estimate for broad searches
     
     # Additional options
     include_units: bool = False
     include_reviews: bool = False
     include_market_data: bool = False
+    include_facets: bool = False  # Fill SearchResponse.facets for a filter sidebar
 
 
 class SearchSuggestion(BaseModel):
@@ -149,15 +152,19 @@ class GeoSearchRequest(BaseModel):
     max_bedrooms: Optional[int] = Field(None, ge=0)
     available_only: bool = True
     
-    # Pagination
+    # Pagination; a cursor from a previous response takes precedence over page
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None
+    exact_total: bool = False  # Count every match instead of accepting an estimate for broad searches
 
 
 class CommuteSearchRequest(BaseModel):
     """Search based on commute time"""
-    destination_address: str
-    max_commute_minutes: int = Field(30, ge=5, le=120)
+    destination_address: Optional[str] = None
+    destination_latitude: Optional[float] = Field(None, ge=-90, le=90)  # Used instead of the address when set
+    destination_longitude: Optional[float] = Field(None, ge=-180, le=180)
+    max_commute_minutes: Optional[int] = Field(None, ge=5, le=120)  # Defaults to the user's max_commute_time
     commute_mode: str = "driving"  # driving, transit, walking, bicycling
     
     # Optional filters
@@ -167,18 +174,21 @@ class CommuteSearchRequest(BaseModel):
     max_bedrooms: Optional[int] = Field(None, ge=0)
     available_only: bool = True
     
-    # Pagination
+    # Pagination; a cursor from a previous response takes precedence over page
     page: int = Field(1, ge=1)
     per_page: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None
 
 
 class SearchResponse(BaseModel):
     """Search response with results and metadata"""
     results: List[Any]  # Will be List[Property] or List[Unit]
     total: int
+    total_exact: bool = True  # False when total is the planner's estimate
     page: int
     per_page: int
     pages: int
+    next_cursor: Optional[str] = None  # Pass back as cursor for the next page; None on the last page
     
     # Facets for filtering
     facets: Optional[SearchFacets] = None
@@ -186,6 +196,8 @@ class SearchResponse(BaseModel):
     # Search metadata
     search_id: Optional[str] = None
     execution_time_ms: Optional[int] = None
+    db_time_ms: Optional[int] = None  # Spent in database statements
+    serialization_time_ms: Optional[int] = None  # Spent building the response models
     
     # Applied filters summary
     applied_filters: Dict[str, Any] = {}
@@ -0,0 +1,612 @@
+"""
+Offline builder for the commute travel-time grid
+
+Reads a street network from an OpenStreetMap XML extract and, for
+transit, a GTFS feed. Dijkstra runs from every grid cell that holds a
+property over the network, and the travel time to every cell of the grid
+is written as uint16 minutes to one memory-mapped matrix per mode: a row
+per destination cell, a column per property cell. Every build writes
+files named by its version, and the manifest naming them is switched
+last, so readers never see a half-built grid and workers still mapping
+the previous build keep valid files.
+
+Runs from scripts/build_commute_grid.py; the API only reads its output.
+"""
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+import bz2
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import zipfile
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.commute import MAX_MINUTES, UNREACHABLE, GridSpec, containing_cell, place_keys
+from app.core.geo import METERS_PER_MILE, haversine_miles
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+# Free-flow driving speeds by OSM highway class, used without a maxspeed tag
+DRIVE_SPEEDS_KMH = {
+    'motorway': 100.0, 'motorway_link': 60.0, 'trunk': 80.0, 'trunk_link': 50.0,
+    'primary': 60.0, 'primary_link': 45.0, 'secondary': 50.0, 'secondary_link': 40.0,
+    'tertiary': 40.0, 'tertiary_link': 35.0, 'unclassified': 30.0, 'residential': 30.0,
+    'living_street': 10.0, 'service': 15.0
+}
+WALK_SPEED_KMH = 5.0
+BIKE_SPEED_KMH = 15.0
+
+# Speed over the straight line between a cell centre and its nearest network node
+ACCESS_SPEEDS_KMH = {'driving': 25.0, 'transit': WALK_SPEED_KMH, 'walking': WALK_SPEED_KMH, 'bicycling': BIKE_SPEED_KMH}
+
+# Highway classes closed to pedestrians and to cyclists
+NO_FOOT = {'motorway', 'motorway_link', 'trunk', 'trunk_link', 'construction', 'proposed', 'abandoned'}
+NO_BIKE = NO_FOOT | {'steps'}
+
+NO_ACCESS = {'no', 'private'}
+TRUTHY = {'yes', '1', 'true'}
+
+# Way tags kept from the extract; the rest are dropped while reading
+WAY_TAGS = (
+    'highway', 'oneway', 'oneway:bicycle', 'junction', 'maxspeed',
+    'access', 'motor_vehicle', 'foot', 'bicycle'
+)
+
+# Cells further than this from every network node are unreachable
+MAX_SNAP_METERS = 1500.0
+
+# Street distance per metre of straight line, for walks off the network
+WALK_DETOUR = 1.3
+
+# Without a street network, stops this close are joined by walking transfers
+TRANSFER_METERS = 400.0
+
+# Cap on the expected wait for a departure, half the headway
+MAX_WAIT_SECONDS = 1200.0
+
+# GTFS service day whose trips are used
+SERVICE_DAY = 'wednesday'
+
+# csgraph drops explicit zero weights, so every edge costs at least this
+MIN_EDGE_SECONDS = 0.1
+
+METERS_PER_DEGREE = METERS_PER_MILE * 69.0
+
+
+@dataclass
+class OsmExtract:
+    """Nodes, highway ways and geocodable places read from an OSM file"""
+    node_ids: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    ways: List[Tuple[np.ndarray, Dict[str, str]]]
+    places: Dict[str, Tuple[float, float]]
+
+
+@dataclass
+class GtfsFeed:
+    """Stops, scheduled rides between consecutive stops and departures per stop"""
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    ride_from: np.ndarray
+    ride_to: np.ndarray
+    ride_seconds: np.ndarray
+    departures: np.ndarray
+    window_seconds: float
+
+
+@dataclass
+class Network:
+    """
+    Directed travel-time graph in seconds
+    
+    snappable marks the nodes grid cells may attach to; transit stop
+    nodes are reached only through the street layer.
+    """
+    graph: csr_matrix
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    snappable: np.ndarray
+    sources: List[str] = field(default_factory=list)
+
+
+def _open(path: str) -> Any:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _tags(element: Any) -> Dict[str, str]:
+    return {tag.get('k'): tag.get('v') for tag in element.findall('tag')}
+
+
+def _place_names(tags: Dict[str, str]) -> Iterable[str]:
+    """Lookup keys a tagged element answers to: its name and its address"""
+    if tags.get('name'):
+        yield from place_keys(tags['name'])[:1]
+    if tags.get('addr:housenumber') and tags.get('addr:street'):
+        address = f"{tags['addr:housenumber']} {tags['addr:street']}"
+        yield from place_keys(address)[:1]
+        if tags.get('addr:city'):
+            yield from place_keys(f"{address}, {tags['addr:city']}")[:1]
+
+
+def read_osm(path: str) -> OsmExtract:
+    """
+    Read an OpenStreetMap XML extract (.osm, optionally .gz or .bz2)
+    
+    Args:
+        path: Extract file
+    
+    Returns:
+        Parsed extract
+    """
+    ids, latitudes, longitudes = array('q'), array('d'), array('d')
+    ways = []
+    places: Dict[str, Tuple[float, float]] = {}
+    way_places: List[Tuple[str, int]] = []
+    
+    with _open(path) as source:
+        context = ElementTree.iterparse(source, events=('start', 'end'))
+        _, root = next(context)
+        for event, element in context:
+            if event != 'end' or element.tag not in ('node', 'way', 'relation'):
+                continue
+            if element.tag == 'node':
+                latitude, longitude = float(element.get('lat')), float(element.get('lon'))
+                ids.append(int(element.get('id')))
+                latitudes.append(latitude)
+                longitudes.append(longitude)
+                for key in _place_names(_tags(element)):
+                    places.setdefault(key, (latitude, longitude))
+            elif element.tag == 'way':
+                tags = _tags(element)
+                refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                if 'highway' in tags and len(refs) > 1:
+                    ways.append((np.array(refs, dtype=np.int64), {k: tags[k] for k in WAY_TAGS if k in tags}))
+                if refs:
+                    way_places.extend((key, refs[0]) for key in _place_names(tags))
+            # Drop parsed elements so memory holds only the arrays above
+            root.clear()
+    
+    node_ids = np.frombuffer(ids, dtype=np.int64)
+    order = np.argsort(node_ids, kind='stable')
+    extract = OsmExtract(
+        node_ids=node_ids[order],
+        latitudes=np.frombuffer(latitudes, dtype=np.float64)[order],
+        longitudes=np.frombuffer(longitudes, dtype=np.float64)[order],
+        ways=ways,
+        places=places
+    )
+    
+    # Buildings and other areas are placed at their first node
+    for key, ref in way_places:
+        position = np.searchsorted(extract.node_ids, ref)
+        if position < len(extract.node_ids) and extract.node_ids[position] == ref:
+            places.setdefault(key, (float(extract.latitudes[position]), float(extract.longitudes[position])))
+    
+    logger.info(f"Read {len(node_ids)} nodes, {len(ways)} highway ways and {len(places)} places from {path}")
+    return extract
+
+
+def _seconds(time_text: str) -> Optional[int]:
+    """GTFS HH:MM:SS, which may run past 24:00, as seconds after midnight"""
+    if not time_text or not time_text.strip():
+        return None
+    hours, minutes, seconds = time_text.strip().split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def _rows(feed: zipfile.ZipFile, name: str) -> Iterable[Dict[str, str]]:
+    with feed.open(name) as raw:
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig'))
+
+
+def read_gtfs(path: str, window: Tuple[int, int]) -> GtfsFeed:
+    """
+    Read the scheduled rides of a GTFS feed departing within a time window
+    
+    Only trips running on SERVICE_DAY are used when the feed has a
+    calendar. Each pair of consecutive timed stops on a trip becomes a
+    ride; departures per stop give its headway over the window.
+    
+    Args:
+        path: GTFS zip file
+        window: (start, end) seconds after midnight, e.g. the morning peak
+    
+    Returns:
+        Parsed feed
+    """
+    start, end = window
+    with zipfile.ZipFile(path) as feed:
+        names = set(feed.namelist())
+        
+        stop_index: Dict[str, int] = {}
+        latitudes, longitudes = [], []
+        for row in _rows(feed, 'stops.txt'):
+            if row.get('location_type', '') not in ('', '0'):
+                continue
+            stop_index[row['stop_id']] = len(latitudes)
+            latitudes.append(float(row['stop_lat']))
+            longitudes.append(float(row['stop_lon']))
+        
+        services = None
+        if 'calendar.txt' in names:
+            services = {row['service_id'] for row in _rows(feed, 'calendar.txt') if row.get(SERVICE_DAY) == '1'}
+        trips = {
+            row['trip_id'] for row in _rows(feed, 'trips.txt')
+            if services is None or row['service_id'] in services
+        }
+        
+        calls: Dict[str, List[Tuple[int, int, int, int]]] = {}
+        for row in _rows(feed, 'stop_times.txt'):
+            if row['trip_id'] not in trips or row['stop_id'] not in stop_index:
+                continue
+            arrival = _seconds(row.get('arrival_time', ''))
+            departure = _seconds(row.get('departure_time', '')) or arrival
+            if arrival is None:
+                continue
+            calls.setdefault(row['trip_id'], []).append(
+                (int(row['stop_sequence']), stop_index[row['stop_id']], arrival, departure)
+            )
+    
+    ride_from, ride_to, ride_seconds = [], [], []
+    departures = np.zeros(len(latitudes), dtype=np.int64)
+    for trip_calls in calls.values():
+        trip_calls.sort()
+        for (_, stop, _, departure), (_, next_stop, arrival, _) in zip(trip_calls, trip_calls[1:]):
+            if not start <= departure <= end or stop == next_stop:
+                continue
+            ride_from.append(stop)
+            ride_to.append(next_stop)
+            ride_seconds.append(max(arrival - departure, 0))
+            departures[stop] += 1
+    
+    logger.info(f"Read {len(latitudes)} stops and {len(ride_from)} rides from {path}")
+    return GtfsFeed(
+        latitudes=np.array(latitudes, dtype=np.float64),
+        longitudes=np.array(longitudes, dtype=np.float64),
+        ride_from=np.array(ride_from, dtype=np.int64),
+        ride_to=np.array(ride_to, dtype=np.int64),
+        ride_seconds=np.array(ride_seconds, dtype=np.float64),
+        departures=departures,
+        window_seconds=float(end - start)
+    )
+
+
+def _maxspeed(value: Optional[str]) -> Optional[float]:
+    """km/h from a maxspeed tag such as "50" or "30 mph"; None when unparseable"""
+    if not value:
+        return None
+    parts = value.split()
+    try:
+        speed = float(parts[0])
+    except ValueError:
+        return None
+    return speed * 1.609344 if len(parts) > 1 and parts[1] == 'mph' else speed
+
+
+def _way_rule(tags: Dict[str, str], mode: str) -> Optional[Tuple[float, bool, bool]]:
+    """(speed in km/h, forward allowed, backward allowed) for a way, None if closed to the mode"""
+    highway = tags.get('highway')
+    access = tags.get('access')
+    oneway = tags.get('oneway')
+    
+    if mode == 'driving':
+        if highway not in DRIVE_SPEEDS_KMH or access in NO_ACCESS or tags.get('motor_vehicle') in NO_ACCESS:
+            return None
+        forward, backward = True, True
+        implied = highway in ('motorway', 'motorway_link') or tags.get('junction') == 'roundabout'
+        if oneway in TRUTHY or (oneway is None and implied):
+            backward = False
+        elif oneway == '-1':
+            forward = False
+        return _maxspeed(tags.get('maxspeed')) or DRIVE_SPEEDS_KMH[highway], forward, backward
+    
+    if mode == 'bicycling':
+        if highway in NO_BIKE or tags.get('bicycle') in NO_ACCESS:
+            return None
+        if access in NO_ACCESS and tags.get('bicycle') not in ('yes', 'designated'):
+            return None
+        forward, backward = True, True
+        if tags.get('oneway:bicycle') != 'no':
+            if oneway in TRUTHY:
+                backward = False
+            elif oneway == '-1':
+                forward = False
+        return BIKE_SPEED_KMH, forward, backward
+    
+    # Walking, and the street layer of transit
+    if highway in NO_FOOT or tags.get('foot') in NO_ACCESS:
+        return None
+    if access in NO_ACCESS and tags.get('foot') not in ('yes', 'designated'):
+        return None
+    return WALK_SPEED_KMH, True, True
+
+
+def _meters(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    return haversine_miles(lat1, lon1, lat2, lon2) * METERS_PER_MILE
+
+
+def _graph(sources: np.ndarray, targets: np.ndarray, seconds: np.ndarray, size: int) -> csr_matrix:
+    """Sparse graph keeping the fastest of any parallel edges"""
+    seconds = np.maximum(seconds, MIN_EDGE_SECONDS)
+    order = np.lexsort((seconds, targets, sources))
+    sources, targets, seconds = sources[order], targets[order], seconds[order]
+    first = np.ones(len(sources), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    return csr_matrix((seconds[first], (sources[first], targets[first])), shape=(size, size))
+
+
+def _planar(latitudes: np.ndarray, longitudes: np.ndarray, reference: float) -> np.ndarray:
+    """Equirectangular metres around a reference latitude, for nearest-node lookups"""
+    return np.column_stack((
+        latitudes * METERS_PER_DEGREE,
+        longitudes * METERS_PER_DEGREE * np.cos(np.radians(reference))
+    ))
+
+
+def road_network(extract: OsmExtract, mode: str) -> Network:
+    """
+    Street graph of an extract for driving, walking or bicycling
+    
+    Args:
+        extract: From read_osm()
+        mode: Travel mode
+    
+    Returns:
+        Network over the nodes the mode can use
+    """
+    sources, targets, speeds = [], [], []
+    for refs, tags in extract.ways:
+        rule = _way_rule(tags, mode)
+        if rule is None:
+            continue
+        speed, forward, backward = rule
+        
+        # Ways clipped at the extract's edge reference nodes it does not hold
+        positions = np.minimum(np.searchsorted(extract.node_ids, refs), len(extract.node_ids) - 1)
+        present = extract.node_ids[positions] == refs
+        keep = present[:-1] & present[1:]
+        start, end = positions[:-1][keep], positions[1:][keep]
+        if forward:
+            sources.append(start)
+            targets.append(end)
+            speeds.append(np.full(len(start), speed))
+        if backward:
+            sources.append(end)
+            targets.append(start)
+            speeds.append(np.full(len(start), speed))
+    
+    if not sources:
+        raise ValueError(f"The extract has no ways usable for {mode}")
+    
+    sources, targets, speeds = np.concatenate(sources), np.concatenate(targets), np.concatenate(speeds)
+    used, compact = np.unique(np.concatenate((sources, targets)), return_inverse=True)
+    sources, targets = compact[:len(sources)], compact[len(sources):]
+    latitudes, longitudes = extract.latitudes[used], extract.longitudes[used]
+    
+    seconds = _meters(latitudes[sources], longitudes[sources], latitudes[targets], longitudes[targets]) / (speeds / 3.6)
+    return Network(
+        graph=_graph(sources, targets, seconds, len(used)),
+        latitudes=latitudes,
+        longitudes=longitudes,
+        snappable=np.ones(len(used), dtype=bool)
+    )
+
+
+def transit_network(feed: GtfsFeed, extract: Optional[OsmExtract] = None) -> Network:
+    """
+    Frequency-based transit graph over a walking layer
+    
+    Each stop is linked to its nearest walking node. Boarding costs the
+    walk to the stop plus half the stop's headway over the window;
+    riding follows the scheduled in-vehicle times. Without a street
+    extract the walking layer is one node per stop, with straight-line
+    transfers between stops within TRANSFER_METERS.
+    
+    Args:
+        feed: From read_gtfs()
+        extract: Street extract for walking to and between stops
+    
+    Returns:
+        Network whose snappable nodes are the walking layer
+    """
+    walk_speed = WALK_SPEED_KMH / 3.6
+    stops = len(feed.latitudes)
+    reference = float(np.mean(feed.latitudes)) if stops else 0.0
+    
+    if extract is not None:
+        walk = road_network(extract, 'walking')
+        coo = walk.graph.tocoo()
+        walk_from, walk_to, walk_seconds = coo.row.astype(np.int64), coo.col.astype(np.int64), coo.data
+        walk_latitudes, walk_longitudes = walk.latitudes, walk.longitudes
+        tree = cKDTree(_planar(walk_latitudes, walk_longitudes, reference))
+        distances, nearest = tree.query(_planar(feed.latitudes, feed.longitudes, reference))
+    else:
+        walk_latitudes, walk_longitudes = feed.latitudes, feed.longitudes
+        tree = cKDTree(_planar(walk_latitudes, walk_longitudes, reference))
+        pairs = tree.query_pairs(TRANSFER_METERS, output_type='ndarray')
+        pair_seconds = _meters(
+            feed.latitudes[pairs[:, 0]], feed.longitudes[pairs[:, 0]],
+            feed.latitudes[pairs[:, 1]], feed.longitudes[pairs[:, 1]]
+        ) * WALK_DETOUR / walk_speed
+        walk_from = np.concatenate((pairs[:, 0], pairs[:, 1])).astype(np.int64)
+        walk_to = np.concatenate((pairs[:, 1], pairs[:, 0])).astype(np.int64)
+        walk_seconds = np.concatenate((pair_seconds, pair_seconds))
+        distances, nearest = np.zeros(stops), np.arange(stops)
+    
+    walk_nodes = len(walk_latitudes)
+    stop_nodes = walk_nodes + np.arange(stops)
+    access = distances * WALK_DETOUR / walk_speed
+    served = feed.departures > 0
+    wait = np.minimum(feed.window_seconds / np.maximum(feed.departures, 1) / 2, MAX_WAIT_SECONDS)
+    
+    sources = np.concatenate((walk_from, nearest[served], stop_nodes, stop_nodes[feed.ride_from]))
+    targets = np.concatenate((walk_to, stop_nodes[served], nearest, stop_nodes[feed.ride_to]))
+    seconds = np.concatenate((walk_seconds, access[served] + wait[served], access, feed.ride_seconds))
+    
+    return Network(
+        graph=_graph(sources, targets, seconds, walk_nodes + stops),
+        latitudes=np.concatenate((walk_latitudes, feed.latitudes)),
+        longitudes=np.concatenate((walk_longitudes, feed.longitudes)),
+        snappable=np.concatenate((np.ones(walk_nodes, dtype=bool), np.zeros(stops, dtype=bool)))
+    )
+
+
+async def property_points(db: AsyncSession) -> List[Tuple[float, float]]:
+    """Coordinates of every active property"""
+    result = await db.execute(
+        select(Property.latitude, Property.longitude)
+        .where(Property.is_active == True, Property.latitude.isnot(None), Property.longitude.isnot(None))
+    )
+    return [(float(latitude), float(longitude)) for latitude, longitude in result.all()]
+
+
+class _Snapper:
+    """Nearest snappable node of a network, and the straight-line time to it"""
+    
+    def __init__(self, network: Network, mode: str, reference: float):
+        self.nodes = np.flatnonzero(network.snappable)
+        self.reference = reference
+        self.speed = ACCESS_SPEEDS_KMH[mode] / 3.6
+        self.tree = cKDTree(_planar(network.latitudes[self.nodes], network.longitudes[self.nodes], reference))
+    
+    def snap(self, latitudes: np.ndarray, longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(node, access seconds) per point; node is -1 beyond MAX_SNAP_METERS"""
+        distances, nearest = self.tree.query(
+            _planar(latitudes, longitudes, self.reference), distance_upper_bound=MAX_SNAP_METERS
+        )
+        found = np.isfinite(distances)
+        nodes = np.full(len(latitudes), -1, dtype=np.int64)
+        nodes[found] = self.nodes[nearest[found]]
+        return nodes, np.where(found, distances, np.inf) / self.speed
+
+
+def build_commute_grid(output_dir: Path,
+                       networks: Dict[str, Network],
+                       points: Sequence[Tuple[float, float]],
+                       precision: int,
+                       max_minutes: int,
+                       batch_size: int = 16,
+                       places: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, Any]:
+    """
+    Compute and write the travel-time matrix of every mode
+    
+    Args:
+        output_dir: Directory for the matrices and manifest
+        networks: Mode to network
+        points: Property coordinates; their cells become the matrix columns
+        precision: Geohash precision of the grid cells
+        max_minutes: Longer commutes are stored as unreachable
+        batch_size: Dijkstra sources per pass; memory grows with it
+        places: Lookup key to coordinates, for resolving destination addresses
+    
+    Returns:
+        The manifest written
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+    previous = _manifest_files(output_dir / 'manifest.json')
+    
+    # One grid for every mode, covering the union of their networks
+    south = min(float(network.latitudes[network.snappable].min()) for network in networks.values())
+    north = max(float(network.latitudes[network.snappable].max()) for network in networks.values())
+    west = min(float(network.longitudes[network.snappable].min()) for network in networks.values())
+    east = max(float(network.longitudes[network.snappable].max()) for network in networks.values())
+    spec = GridSpec.covering(precision, south, west, north, east)
+    reference = (south + north) / 2
+    
+    cells: Dict[str, Tuple[float, float]] = {}
+    for latitude, longitude in points:
+        cell, center_latitude, center_longitude = containing_cell(latitude, longitude, precision)
+        cells[cell] = (center_latitude, center_longitude)
+    property_cells = sorted(cells)
+    column_latitudes = np.array([cells[cell][0] for cell in property_cells])
+    column_longitudes = np.array([cells[cell][1] for cell in property_cells])
+    row_latitudes, row_longitudes = spec.centers()
+    logger.info(f"Grid of {spec.rows}x{spec.cols} cells at precision {precision}; {len(property_cells)} property cells")
+    
+    modes = {}
+    for mode, network in networks.items():
+        snapper = _Snapper(network, mode, reference)
+        row_nodes, row_access = snapper.snap(row_latitudes, row_longitudes)
+        column_nodes, column_access = snapper.snap(column_latitudes, column_longitudes)
+        reachable_rows = np.flatnonzero(row_nodes >= 0)
+        
+        file_name = f"{mode}-{version}.u16"
+        partial = output_dir / f"{file_name}.partial"
+        matrix = np.memmap(partial, dtype=np.uint16, mode='w+', shape=(len(spec), max(len(property_cells), 1)))
+        matrix[:] = UNREACHABLE
+        
+        origins = np.unique(column_nodes[column_nodes >= 0])
+        for start in range(0, len(origins), batch_size):
+            batch = origins[start:start + batch_size]
+            seconds = dijkstra(network.graph, directed=True, indices=batch, limit=max_minutes * 60.0)
+            at_rows = seconds[:, row_nodes[reachable_rows]] + row_access[reachable_rows]
+            for position, node in enumerate(batch):
+                for column in np.flatnonzero(column_nodes == node):
+                    minutes = np.ceil((at_rows[position] + column_access[column]) / 60.0)
+                    matrix[reachable_rows, column] = np.where(
+                        minutes <= min(max_minutes, MAX_MINUTES), minutes, UNREACHABLE
+                    ).astype(np.uint16)
+            logger.info(f"{mode}: {min(start + batch_size, len(origins))}/{len(origins)} origins routed")
+        
+        matrix.flush()
+        del matrix
+        os.replace(partial, output_dir / file_name)
+        modes[mode] = {'file': file_name, 'sources': network.sources}
+    
+    places_file = f"places-{version}.json" if places else None
+    if places:
+        with open(output_dir / f"{places_file}.partial", 'w') as handle:
+            json.dump(places, handle)
+        os.replace(output_dir / f"{places_file}.partial", output_dir / places_file)
+    
+    manifest = {
+        'version': version,
+        'grid': spec.to_dict(),
+        'property_cells': property_cells,
+        'max_minutes': max_minutes,
+        'modes': modes,
+        'places_file': places_file
+    }
+    with open(output_dir / 'manifest.json.partial', 'w') as handle:
+        json.dump(manifest, handle)
+    os.replace(output_dir / 'manifest.json.partial', output_dir / 'manifest.json')
+    
+    # Keep the previous build for workers that have not reloaded yet
+    keep = previous | {entry['file'] for entry in modes.values()} | {places_file}
+    for path in list(output_dir.glob('*.u16')) + list(output_dir.glob('places*.json')):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+    return manifest
+
+
+def _manifest_files(path: Path) -> set:
+    """Data files named by an existing manifest, empty when there is none"""
+    try:
+        with open(path) as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return set()
+    files = {entry['file'] for entry in manifest.get('modes', {}).values()}
+    if manifest.get('places_file'):
+        files.add(manifest['places_file'])
+    return files
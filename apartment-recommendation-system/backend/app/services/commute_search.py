@@ -0,0 +1,177 @@
+"""
+Commute-time search over the precomputed travel-time grid
+
+The matrices written by commute_builder are memory-mapped, so a search
+reads one row (the destination's cell) and compares it with the time
+limit; the reachable property cells become geohash range conditions.
+No routing happens per request. The grid is reloaded when a rebuild
+replaces its manifest.
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+
+import numpy as np
+from sqlalchemy import and_, or_
+
+from app.core.commute import UNREACHABLE, GridSpec, geohash_ranges, place_keys
+from app.core.config import settings
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+
+class CommuteSearchError(ValueError):
+    """Raised for a destination or mode the grid cannot answer"""
+
+
+class CommuteGrid:
+    """Loaded travel-time matrices, one per mode"""
+    
+    def __init__(self, path: Path = settings.COMMUTE_GRID_PATH):
+        self.path = Path(path)
+        self.version: Optional[str] = None
+        self.spec: Optional[GridSpec] = None
+        self.max_minutes = 0
+        self.property_cells: List[str] = []
+        self.matrices: Dict[str, np.memmap] = {}
+        self.places: Dict[str, Tuple[float, float]] = {}
+        
+        self._manifest_mtime: Optional[float] = None
+    
+    @property
+    def ready(self) -> bool:
+        """Whether a grid is loaded, picking up a rebuilt one first"""
+        self.refresh()
+        return bool(self.matrices)
+    
+    def refresh(self) -> None:
+        """Load the grid if its manifest changed since the last load"""
+        try:
+            mtime = os.stat(self.path / 'manifest.json').st_mtime
+        except OSError:
+            return
+        if mtime != self._manifest_mtime:
+            self._manifest_mtime = mtime
+            self.load()
+    
+    def load(self) -> bool:
+        """
+        Map the matrices named by the manifest
+        
+        Returns:
+            Whether any mode loaded
+        """
+        try:
+            with open(self.path / 'manifest.json') as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Commute grid unavailable: {e}")
+            return False
+        
+        spec = GridSpec(**manifest['grid'])
+        columns = max(len(manifest['property_cells']), 1)
+        matrices = {}
+        for mode, entry in manifest['modes'].items():
+            try:
+                matrices[mode] = np.memmap(
+                    self.path / entry['file'], dtype=np.uint16, mode='r', shape=(len(spec), columns)
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"Commute grid for {mode} unavailable: {e}")
+        
+        places = {}
+        if manifest.get('places_file'):
+            try:
+                with open(self.path / manifest['places_file']) as handle:
+                    places = {key: tuple(point) for key, point in json.load(handle).items()}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Commute places unavailable: {e}")
+        
+        self.version = manifest['version']
+        self.spec = spec
+        self.max_minutes = manifest['max_minutes']
+        self.property_cells = manifest['property_cells']
+        self.matrices = matrices
+        self.places = places
+        logger.info(
+            f"Commute grid {self.version} loaded: {spec.rows}x{spec.cols} cells, "
+            f"{len(self.property_cells)} property cells, modes {', '.join(matrices) or 'none'}"
+        )
+        return bool(matrices)
+    
+    def locate(self,
+               address: Optional[str],
+               latitude: Optional[float] = None,
+               longitude: Optional[float] = None) -> Tuple[float, float]:
+        """
+        Coordinates of a destination
+        
+        Args:
+            address: Place name or street address
+            latitude, longitude: Used as given when both are set
+        
+        Returns:
+            (latitude, longitude)
+        
+        Raises:
+            CommuteSearchError: When the address is not in the grid's places
+        """
+        if latitude is not None and longitude is not None:
+            return latitude, longitude
+        for key in place_keys(address):
+            if key in self.places:
+                return self.places[key]
+        raise CommuteSearchError(
+            f"Destination '{address}' was not found; pass destination_latitude and destination_longitude"
+        )
+    
+    def reachable(self, mode: str, latitude: float, longitude: float, max_minutes: int) -> Dict[str, int]:
+        """
+        Property cells within a commute time of a destination
+        
+        Args:
+            mode: Commute mode
+            latitude, longitude: Destination
+            max_minutes: Longest commute
+        
+        Returns:
+            Property cell geohash to commute minutes
+        
+        Raises:
+            CommuteSearchError: For a mode without a grid or a destination outside it
+        """
+        if mode not in self.matrices:
+            raise CommuteSearchError(
+                f"Commute mode '{mode}' is not available; supported: {', '.join(sorted(self.matrices))}"
+            )
+        row = self.spec.cell_index(latitude, longitude)
+        if row is None:
+            raise CommuteSearchError("Destination is outside the commute search area")
+        
+        minutes = np.asarray(self.matrices[mode][row])
+        hits = np.flatnonzero((minutes <= max_minutes) & (minutes != UNREACHABLE))
+        return {self.property_cells[column]: int(minutes[column]) for column in hits if column < len(self.property_cells)}
+    
+    def cell_of(self, geohash: Optional[str]) -> Optional[str]:
+        """Grid cell of a property geohash"""
+        return geohash[:self.spec.precision] if geohash else None
+    
+    def within(self, cells: Dict[str, int]) -> Any:
+        """
+        Condition matching properties in any of the given cells
+        
+        At most COMMUTE_MAX_RANGES ranges are used to bound the bind
+        parameters, so the condition may also match properties in nearby
+        cells outside the set; callers drop those by cell.
+        """
+        return or_(*[
+            and_(Property.geohash >= low, Property.geohash < high)
+            for low, high in geohash_ranges(cells, settings.COMMUTE_MAX_RANGES)
+        ])
+
+
+# Shared instance; loaded at startup and reloaded when rebuilt
+commute_grid = CommuteGrid()
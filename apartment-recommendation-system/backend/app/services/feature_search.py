@@ -0,0 +1,140 @@
+"""
+Amenity, pet, parking, utility and concession filters for property search
+
+Filters run against columns derived on write from the free-form JSON:
+properties.feature_tags, a GIN-indexed array of canonical tags, and
+units.has_concessions. Search never parses listing JSON per row.
+"""
+from typing import Any, List, Tuple
+import logging
+
+from sqlalchemy import bindparam, select, text
+
+from app.core.features import extract_feature_tags, has_concessions, search_feature_tags
+from app.models.property import Property, Unit
+from app.schemas.search import PropertySearchBase
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per statement when backfilling derived columns
+FEATURE_BACKFILL_BATCH = 1000
+
+# Columns added after tables were first created; create_all covers new databases
+FEATURE_SCHEMA = [
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS feature_tags varchar(64)[]",
+    "CREATE INDEX IF NOT EXISTS ix_properties_feature_tags ON properties USING gin (feature_tags)",
+    "ALTER TABLE units ADD COLUMN IF NOT EXISTS has_concessions boolean",
+    "CREATE INDEX IF NOT EXISTS ix_units_concessions_property ON units (has_concessions, property_id)"
+]
+
+
+class FeatureSearch:
+    """Derived feature columns and the search conditions over them"""
+    
+    async def setup(self, engine: Any) -> None:
+        """
+        Add the derived columns where missing and backfill rows written
+        before they existed
+        
+        Args:
+            engine: Async engine
+        """
+        async with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                for statement in FEATURE_SCHEMA:
+                    await conn.execute(text(statement))
+            
+            properties, units = await self._derive(conn, only_missing=True)
+        
+        if properties or units:
+            logger.info(f"Feature columns backfilled for {properties} properties and {units} units")
+    
+    async def rebuild(self, engine: Any) -> None:
+        """
+        Re-derive the feature columns of every row, e.g. after the
+        extraction rules change
+        
+        Args:
+            engine: Async engine
+        """
+        async with engine.begin() as conn:
+            properties, units = await self._derive(conn, only_missing=False)
+        logger.info(f"Feature columns re-derived for {properties} properties and {units} units")
+    
+    async def _derive(self, conn: Any, only_missing: bool) -> Tuple[int, int]:
+        properties = await self._backfill(
+            conn,
+            Property.__table__,
+            ['amenities', 'pet_policy', 'parking', 'utilities_included'],
+            'feature_tags',
+            lambda row: extract_feature_tags(row.amenities, row.pet_policy, row.parking, row.utilities_included),
+            only_missing
+        )
+        units = await self._backfill(
+            conn,
+            Unit.__table__,
+            ['concessions'],
+            'has_concessions',
+            lambda row: has_concessions(row.concessions),
+            only_missing
+        )
+        return properties, units
+    
+    async def _backfill(self,
+                        conn: Any,
+                        table: Any,
+                        sources: List[str],
+                        target: str,
+                        derive: Any,
+                        only_missing: bool = True) -> int:
+        query = select(table.c.id, *[table.c[name] for name in sources])
+        if only_missing:
+            query = query.where(table.c[target].is_(None))
+        rows = (await conn.execute(query)).all()
+        
+        for start in range(0, len(rows), FEATURE_BACKFILL_BATCH):
+            batch = rows[start:start + FEATURE_BACKFILL_BATCH]
+            await conn.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values({target: bindparam('derived')}),
+                [{'row_id': row.id, 'derived': derive(row)} for row in batch]
+            )
+        
+        return len(rows)
+    
+    def property_conditions(self, search_params: PropertySearchBase) -> List[Any]:
+        """
+        Property conditions for a search's feature filters
+        
+        Required tags become a single containment test, which the GIN
+        index answers; excluded tags are checked on the rows it returns.
+        
+        Args:
+            search_params: Search request
+        
+        Returns:
+            WHERE conditions on Property
+        
+        Raises:
+            UnknownFeatureError: For an amenity or utility outside the vocabulary
+        """
+        required, excluded = search_feature_tags(
+            required_amenities=search_params.required_amenities,
+            utilities_included=search_params.utilities_included,
+            pet_friendly=search_params.pet_friendly,
+            cats_allowed=search_params.cats_allowed,
+            dogs_allowed=search_params.dogs_allowed,
+            parking_required=search_params.parking_required,
+            garage_required=search_params.garage_required,
+            elevator_required=search_params.elevator_required
+        )
+        
+        conditions = []
+        if required:
+            conditions.append(Property.feature_tags.contains(required))
+        for tag in excluded:
+            conditions.append(~Property.feature_tags.contains([tag]))
+        return conditions
+
+
+# Shared instance; setup() runs at startup
+feature_search = FeatureSearch()
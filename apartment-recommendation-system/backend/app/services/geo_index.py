@@ -0,0 +1,254 @@
+"""
+In-process spatial index over active property coordinates
+
+A haversine ball tree answers radius and k-nearest queries without a
+database round trip; endpoints then load only the matching properties.
+Writes in this process are applied immediately through the inventory
+hooks, and every worker picks up other workers' writes by syncing rows
+whose updated_at moved since its last sync.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+from sklearn.neighbors import BallTree
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.geo import EARTH_RADIUS_MILES
+from app.models.property import Property
+from app.services.property_feed import PropertyChangeFeed
+
+logger = logging.getLogger(__name__)
+
+
+class GeoIndex:
+    """
+    Ball tree of active properties plus a small overlay of recent writes
+    
+    The tree is immutable, so moved or deactivated properties are
+    tombstoned and new positions go into an overlay that is scanned
+    directly. The tree is rebuilt in memory once the overlay grows past
+    rebuild_threshold.
+    """
+    
+    def __init__(self,
+                 rebuild_threshold: int = settings.GEO_INDEX_REBUILD_THRESHOLD,
+                 sync_seconds: float = settings.GEO_INDEX_SYNC_SECONDS):
+        self.rebuild_threshold = rebuild_threshold
+        self.ready = False
+        self.feed = PropertyChangeFeed(sync_seconds)
+        
+        self._tree: Optional[BallTree] = None
+        self._tree_ids = np.empty(0, dtype=object)
+        self._tree_points = np.empty((0, 2))
+        self._tree_rows: Dict[Any, int] = {}
+        self._removed: set = set()
+        self._overlay: Dict[Any, Tuple[float, float]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._tree_rows) - len(self._removed) + len(self._overlay)
+    
+    async def build(self, db: AsyncSession) -> int:
+        """
+        Load every active property with coordinates and build the tree
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of indexed properties
+        """
+        rows = (await db.execute(
+            select(Property.id, Property.latitude, Property.longitude).where(
+                and_(Property.is_active == True, Property.latitude.isnot(None), Property.longitude.isnot(None))
+            )
+        )).all()
+        await self.feed.start(db)
+        
+        self._rebuild(
+            [row.id for row in rows],
+            np.radians(np.array([[float(row.latitude), float(row.longitude)] for row in rows]).reshape(-1, 2))
+        )
+        self.ready = True
+        
+        logger.info(f"Geo index built with {len(self)} properties")
+        return len(self)
+    
+    async def sync(self, db: AsyncSession, force: bool = False) -> int:
+        """
+        Apply property changes committed since the last sync
+        
+        A no-op until sync_seconds have passed, unless forced.
+        
+        Args:
+            db: Database session
+            force: Sync regardless of when the last sync ran
+        
+        Returns:
+            Number of changed properties applied
+        """
+        if not self.ready:
+            return 0
+        
+        rows = await self.feed.poll(
+            db, [Property.id, Property.latitude, Property.longitude, Property.is_active], force
+        )
+        for row in rows:
+            self.apply(row.id, row.latitude, row.longitude, row.is_active)
+        
+        return len(rows)
+    
+    def apply(self, property_id: Any, latitude: Any, longitude: Any, is_active: bool = True) -> None:
+        """
+        Insert, move or drop one property
+        
+        Args:
+            property_id: Property ID
+            latitude: Latitude in degrees, or None
+            longitude: Longitude in degrees, or None
+            is_active: Whether the property should be searchable
+        """
+        if not self.ready:
+            return
+        
+        if is_active and latitude is not None and longitude is not None:
+            point = (np.radians(float(latitude)), np.radians(float(longitude)))
+            row = self._tree_rows.get(property_id)
+            if row is not None and tuple(self._tree_points[row]) == point:
+                # Unchanged position already in the tree
+                self._removed.discard(property_id)
+                self._overlay.pop(property_id, None)
+                return
+            if row is not None:
+                self._removed.add(property_id)
+            self._overlay[property_id] = point
+        else:
+            if property_id in self._tree_rows:
+                self._removed.add(property_id)
+            self._overlay.pop(property_id, None)
+        
+        if len(self._overlay) + len(self._removed) > self.rebuild_threshold:
+            self._compact()
+    
+    def apply_property(self, property: Property) -> None:
+        """Apply a property object's current position and status"""
+        self.apply(property.id, property.latitude, property.longitude, property.is_active)
+    
+    def within_radius(self, latitude: float, longitude: float, radius_miles: float) -> Tuple[List[Any], np.ndarray]:
+        """
+        Properties within radius_miles of a point, nearest first
+        
+        Args:
+            latitude: Centre latitude
+            longitude: Centre longitude
+            radius_miles: Radius
+        
+        Returns:
+            Property IDs and their distances in miles
+        """
+        center = np.radians([[float(latitude), float(longitude)]])
+        radius = radius_miles / EARTH_RADIUS_MILES
+        
+        ids: List[Any] = []
+        distances: List[float] = []
+        if self._tree is not None:
+            rows, row_distances = self._tree.query_radius(center, radius, return_distance=True)
+            for row, distance in zip(rows[0], row_distances[0]):
+                property_id = self._tree_ids[row]
+                if property_id not in self._removed:
+                    ids.append(property_id)
+                    distances.append(distance)
+        
+        overlay_ids, overlay_distances = self._overlay_distances(center)
+        keep = overlay_distances <= radius
+        ids.extend(overlay_ids[keep])
+        distances.extend(overlay_distances[keep])
+        
+        return self._ranked(ids, distances)
+    
+    def nearest(self,
+                latitude: float,
+                longitude: float,
+                k: int,
+                radius_miles: Optional[float] = None,
+                exclude: Iterable[Any] = ()) -> Tuple[List[Any], np.ndarray]:
+        """
+        The k properties nearest a point
+        
+        Args:
+            latitude: Centre latitude
+            longitude: Centre longitude
+            k: Number of properties
+            radius_miles: Optional maximum distance
+            exclude: Property IDs to leave out
+        
+        Returns:
+            Property IDs and their distances in miles, nearest first
+        """
+        center = np.radians([[float(latitude), float(longitude)]])
+        skip = self._removed.union(exclude)
+        
+        ids: List[Any] = []
+        distances: List[float] = []
+        if self._tree is not None:
+            # Over-fetch by the number of ids that may be filtered out
+            wanted = min(k + len(skip), len(self._tree_ids))
+            row_distances, rows = self._tree.query(center, k=wanted)
+            for row, distance in zip(rows[0], row_distances[0]):
+                property_id = self._tree_ids[row]
+                if property_id not in skip:
+                    ids.append(property_id)
+                    distances.append(distance)
+        
+        overlay_ids, overlay_distances = self._overlay_distances(center)
+        for property_id, distance in zip(overlay_ids, overlay_distances):
+            if property_id not in skip:
+                ids.append(property_id)
+                distances.append(distance)
+        
+        ids, miles = self._ranked(ids, distances)
+        if radius_miles is not None:
+            within = int(np.searchsorted(miles, radius_miles, side='right'))
+            ids, miles = ids[:within], miles[:within]
+        return ids[:k], miles[:k]
+    
+    def _overlay_distances(self, center: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Haversine distances in radians from center to every overlay point"""
+        if not self._overlay:
+            return np.empty(0, dtype=object), np.empty(0)
+        
+        ids = np.array(list(self._overlay.keys()), dtype=object)
+        points = np.array(list(self._overlay.values()))
+        lat0, lon0 = center[0]
+        a = (
+            np.sin((points[:, 0] - lat0) / 2) ** 2
+            + np.cos(lat0) * np.cos(points[:, 0]) * np.sin((points[:, 1] - lon0) / 2) ** 2
+        )
+        return ids, 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    
+    def _ranked(self, ids: List[Any], distances: List[float]) -> Tuple[List[Any], np.ndarray]:
+        """Sort ids by distance and convert radians to miles"""
+        distances = np.asarray(distances, dtype=np.float64)
+        order = np.argsort(distances, kind='stable')
+        return [ids[i] for i in order], distances[order] * EARTH_RADIUS_MILES
+    
+    def _compact(self) -> None:
+        """Fold the overlay and tombstones into a fresh tree"""
+        keep = np.array([property_id not in self._removed for property_id in self._tree_ids], dtype=bool)
+        ids = list(self._tree_ids[keep]) + list(self._overlay.keys())
+        points = np.vstack([self._tree_points[keep], np.array(list(self._overlay.values())).reshape(-1, 2)])
+        self._rebuild(ids, points)
+    
+    def _rebuild(self, ids: List[Any], points: np.ndarray) -> None:
+        self._tree_ids = np.array(ids, dtype=object)
+        self._tree_points = points
+        self._tree_rows = {property_id: row for row, property_id in enumerate(ids)}
+        self._tree = BallTree(points, metric='haversine') if len(ids) else None
+        self._removed = set()
+        self._overlay = {}
+
+
+# Shared index for the process; built at startup
+geo_index = GeoIndex()
@@ -0,0 +1,170 @@
+"""
+Radius filtering and distance ordering for properties and unit_search
+
+With PostGIS, properties carry a generated geography column with a GiST
+index: radius filters use ST_DWithin and ordering uses KNN (<->). Without
+it, and always for unit_search, the indexed geohash column narrows
+candidates to a few B-tree range scans and an exact haversine expression
+does the rest.
+"""
+from typing import Any, List
+import logging
+
+from sqlalchemy import Float, and_, bindparam, cast, func, literal_column, or_, select, text
+
+from app.core.config import settings
+from app.core.geo import (
+    EARTH_RADIUS_MILES,
+    METERS_PER_MILE,
+    covering_geohashes,
+    geohash_encode,
+    geohash_prefix_range
+)
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per statement when backfilling geohashes
+GEOHASH_BACKFILL_BATCH = 1000
+
+SPATIAL_SCHEMA = [
+    """
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS location geography(Point, 4326)
+    GENERATED ALWAYS AS (
+        CASE WHEN latitude IS NOT NULL AND longitude IS NOT NULL
+        THEN ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography
+        END
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_properties_location ON properties USING gist (location)"
+]
+
+
+class GeoSearch:
+    """Builds spatial SQL for whichever backend the database supports"""
+    
+    def __init__(self):
+        self.postgis_enabled = False
+        self._location = literal_column("properties.location")
+    
+    async def setup(self, engine: Any) -> None:
+        """
+        Enable PostGIS and the indexed location column when possible, and
+        backfill geohashes for properties written before the column existed
+        
+        Args:
+            engine: Async engine
+        """
+        async with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql' and settings.GEO_USE_POSTGIS:
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+                        for statement in SPATIAL_SCHEMA:
+                            await conn.execute(text(statement))
+                    self.postgis_enabled = True
+                except Exception as e:
+                    logger.info(f"PostGIS unavailable, using geohash search: {e}")
+            
+            backfilled = await self._backfill_geohashes(conn)
+        
+        logger.info(
+            f"Geo search backend: {'postgis' if self.postgis_enabled else 'geohash'}"
+            + (f" ({backfilled} geohashes backfilled)" if backfilled else "")
+        )
+    
+    async def _backfill_geohashes(self, conn: Any) -> int:
+        table = Property.__table__
+        rows = (await conn.execute(
+            select(table.c.id, table.c.latitude, table.c.longitude).where(
+                and_(table.c.geohash.is_(None), table.c.latitude.isnot(None), table.c.longitude.isnot(None))
+            )
+        )).all()
+        
+        for start in range(0, len(rows), GEOHASH_BACKFILL_BATCH):
+            batch = rows[start:start + GEOHASH_BACKFILL_BATCH]
+            await conn.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values(geohash=bindparam('hash')),
+                [
+                    {'row_id': row.id, 'hash': geohash_encode(float(row.latitude), float(row.longitude))}
+                    for row in batch
+                ]
+            )
+        
+        return len(rows)
+    
+    def _point(self, latitude: float, longitude: float) -> Any:
+        return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+    
+    def _spatial(self, model: Any) -> bool:
+        """Whether the model has the PostGIS location column"""
+        return self.postgis_enabled and model is Property
+    
+    def _haversine(self, latitude: float, longitude: float, model: Any = Property) -> Any:
+        lat = func.radians(cast(model.latitude, Float))
+        lon = func.radians(cast(model.longitude, Float))
+        lat0 = func.radians(latitude)
+        lon0 = func.radians(longitude)
+        a = (
+            func.power(func.sin((lat - lat0) / 2), 2)
+            + func.cos(lat0) * func.cos(lat) * func.power(func.sin((lon - lon0) / 2), 2)
+        )
+        return 2 * EARTH_RADIUS_MILES * func.asin(func.sqrt(func.least(a, 1.0)))
+    
+    def within_radius(self, latitude: float, longitude: float, radius_miles: float, model: Any = Property) -> Any:
+        """
+        WHERE clause selecting rows within radius_miles of a point
+        
+        Args:
+            latitude: Centre latitude
+            longitude: Centre longitude
+            radius_miles: Radius
+            model: Property or UnitSearch
+        
+        Returns:
+            SQL boolean expression
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        if self._spatial(model):
+            return func.ST_DWithin(self._location, self._point(latitude, longitude), radius_miles * METERS_PER_MILE)
+        
+        cells = [geohash_prefix_range(prefix) for prefix in covering_geohashes(latitude, longitude, radius_miles)]
+        return and_(
+            or_(*[and_(model.geohash >= low, model.geohash < high) for low, high in cells]),
+            self._haversine(latitude, longitude, model) <= radius_miles
+        )
+    
+    def distance_miles(self, latitude: float, longitude: float, model: Any = Property) -> Any:
+        """SQL expression for each row's distance in miles from a point"""
+        latitude, longitude = float(latitude), float(longitude)
+        if self._spatial(model):
+            return func.ST_Distance(self._location, self._point(latitude, longitude)) / METERS_PER_MILE
+        return self._haversine(latitude, longitude, model)
+    
+    def distance_order(self, latitude: float, longitude: float, model: Any = Property) -> Any:
+        """ORDER BY expression for nearest-first; an index KNN scan under PostGIS"""
+        latitude, longitude = float(latitude), float(longitude)
+        if self._spatial(model):
+            return self._location.op('<->')(self._point(latitude, longitude))
+        return self._haversine(latitude, longitude, model)
+
+
+def with_distances(rows: Any) -> List[Property]:
+    """
+    Properties from (Property, distance) rows, with distance_miles set
+    
+    Args:
+        rows: Result rows of (Property, distance in miles)
+    
+    Returns:
+        Property objects
+    """
+    properties = []
+    for property, distance in rows:
+        property.distance_miles = round(float(distance), 2) if distance is not None else None
+        properties.append(property)
+    return properties
+
+
+# Shared instance; setup() runs at startup
+geo_search = GeoSearch()
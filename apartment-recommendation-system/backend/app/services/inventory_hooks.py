@@ -0,0 +1,145 @@
+"""
+Derived-data maintenance run after inventory writes
+"""
+from typing import Any, Dict, Iterable, Optional
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.property import Property, Unit
+from app.services.geo_index import geo_index
+from app.services.negotiation_leaderboard import negotiation_leaderboard, LEADERBOARD_FIELDS
+from app.services.search_alerts import UnitChange, alert_type_for, search_percolator
+from app.services.search_cache import search_cache
+from app.services.suggestions import suggestion_service
+from app.services.text_search import text_search, TEXT_SEARCH_WEIGHTS
+from app.services.unit_search import UNIT_SEARCH_PROPERTY_FIELDS, UNIT_SEARCH_UNIT_FIELDS, unit_search_index
+
+logger = logging.getLogger(__name__)
+
+# Property fields that move a property in or out of the geo index
+GEO_INDEX_FIELDS = {'latitude', 'longitude', 'is_active'}
+
+# Property fields feeding the full-text document
+TEXT_SEARCH_FIELDS = set(TEXT_SEARCH_WEIGHTS) | {'is_active'}
+
+# Property fields shown in autocomplete suggestions
+SUGGESTION_FIELDS = {'name', 'city', 'is_active'}
+
+
+async def on_unit_written(db: AsyncSession,
+                          unit: Unit,
+                          changed_fields: Iterable[str] = (),
+                          created: bool = False,
+                          previous: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Bring derived tables up to date after a unit is created or changed
+    
+    Called once the write has been committed. Failures are logged rather
+    than raised: the write itself succeeded. Nothing in the app retries
+    them; scripts/refresh_negotiation_leaderboard.py and
+    scripts/rebuild_unit_search.py repair what was missed and must be run
+    by an external scheduler (cron), the leaderboard one daily. Database
+    steps run in a session of their own, so rolling one back never
+    expires the caller's instances.
+    
+    Args:
+        db: Database session the write was committed on
+        unit: Unit that was written
+        changed_fields: Names of the fields that changed
+        created: Whether the unit is new
+        previous: Values of changed fields before the write
+    """
+    changed_fields = set(changed_fields)
+    unit_id = unit.id
+    property_id = unit.property_id
+    alert_type = alert_type_for(unit, changed_fields, created, previous)
+    
+    async with AsyncSession(db.bind, expire_on_commit=False) as hook_db:
+        # Before the cache is invalidated, so searches cached from now on see the change
+        if created or changed_fields & UNIT_SEARCH_UNIT_FIELDS:
+            try:
+                await unit_search_index.refresh_units(hook_db, [unit_id])
+            except Exception as e:
+                await hook_db.rollback()
+                logger.error(f"Failed to refresh unit search row for unit {unit_id}: {e}")
+        
+        if created or changed_fields & LEADERBOARD_FIELDS:
+            try:
+                await negotiation_leaderboard.refresh_units(hook_db, [unit_id])
+            except Exception as e:
+                await hook_db.rollback()
+                logger.error(f"Failed to refresh negotiation leaderboard for unit {unit_id}: {e}")
+        
+        try:
+            city = (await hook_db.execute(select(Property.city).where(Property.id == property_id))).scalar()
+            await search_cache.invalidate(city)
+        except Exception as e:
+            await hook_db.rollback()
+            logger.error(f"Failed to invalidate cached searches for unit {unit_id}: {e}")
+        
+        if alert_type:
+            try:
+                await search_percolator.percolate(hook_db, [
+                    UnitChange(unit, alert_type, (previous or {}).get('current_price'))
+                ])
+            except Exception as e:
+                await hook_db.rollback()
+                logger.error(f"Failed to alert saved searches for unit {unit_id}: {e}")
+
+
+async def on_property_written(db: AsyncSession,
+                              property: Property,
+                              changed_fields: Iterable[str] = (),
+                              created: bool = False) -> None:
+    """
+    Bring derived data up to date after a property is created, changed
+    or deactivated
+    
+    Called once the write has been committed. Other workers pick up the
+    geo index and suggestion changes on their next sync. Database steps
+    run in a session of their own, so rolling one back never expires the
+    caller's instances.
+    
+    Args:
+        db: Database session the write was committed on
+        property: Property that was written
+        changed_fields: Names of the fields that changed
+        created: Whether the property is new
+    """
+    changed_fields = set(changed_fields)
+    property_id = property.id
+    city = property.city
+    
+    if created or changed_fields & GEO_INDEX_FIELDS:
+        try:
+            geo_index.apply_property(property)
+        except Exception as e:
+            logger.error(f"Failed to update geo index for property {property_id}: {e}")
+    
+    if created or changed_fields & TEXT_SEARCH_FIELDS:
+        try:
+            text_search.apply_property(property)
+        except Exception as e:
+            logger.error(f"Failed to update text index for property {property_id}: {e}")
+    
+    if created or changed_fields & SUGGESTION_FIELDS:
+        try:
+            suggestion_service.apply_property(property)
+        except Exception as e:
+            logger.error(f"Failed to update suggestions for property {property_id}: {e}")
+    
+    if not created and changed_fields & UNIT_SEARCH_PROPERTY_FIELDS:
+        async with AsyncSession(db.bind, expire_on_commit=False) as hook_db:
+            try:
+                await unit_search_index.refresh_properties(hook_db, [property_id])
+            except Exception as e:
+                await hook_db.rollback()
+                logger.error(f"Failed to refresh unit search rows for property {property_id}: {e}")
+    
+    # A property moving city also leaves its old city's results stale
+    try:
+        await search_cache.invalidate(None if 'city' in changed_fields else city)
+    except Exception as e:
+        logger.error(f"Failed to invalidate cached searches for property {property_id}: {e}")
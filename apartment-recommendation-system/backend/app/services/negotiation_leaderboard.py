@@ -0,0 +1,238 @@
+"""
+Maintained leaderboard of negotiation opportunities per (city, bedrooms)
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime, timezone
+import logging
+
+import numpy as np
+from sqlalchemy import select, func, and_, case, delete, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.negotiation_scorer import NegotiationScorer, SCORE_COMPONENTS
+from app.models.market import NegotiationLeaderboard
+from app.models.property import Property, Unit, PriceHistory
+from app.services.prediction_service import days_on_market_for
+
+logger = logging.getLogger(__name__)
+
+# Unit fields whose change moves a unit's own negotiation score
+LEADERBOARD_FIELDS = {
+    'current_price',
+    'concessions',
+    'days_on_market',
+    'first_seen_date',
+    'is_available',
+    'bedrooms',
+    'property_id'
+}
+
+
+class NegotiationLeaderboardService:
+    """
+    Keeps NegotiationLeaderboard rows in step with available units
+    
+    Changed units are rescored immediately; sweep() rescores every unit,
+    picking up days-on-market ticks, shifts in segment averages caused by
+    other units' price changes, and rescores missed by a failed hook. The
+    app does not schedule the sweep: scripts/refresh_negotiation_leaderboard.py
+    must be run daily by an external cron job.
+    """
+    
+    def __init__(self, scorer: Optional[NegotiationScorer] = None):
+        self.scorer = scorer or NegotiationScorer()
+    
+    async def refresh_units(self, db: AsyncSession, unit_ids: Iterable[Any]) -> int:
+        """
+        Rescore specific units, dropping any that are no longer listed
+        
+        Args:
+            db: Database session
+            unit_ids: Units whose price, concessions or listing changed
+        
+        Returns:
+            Number of leaderboard rows written
+        """
+        unit_ids = list(unit_ids)
+        if not unit_ids:
+            return 0
+        return await self._refresh(db, Unit.id.in_(unit_ids), NegotiationLeaderboard.unit_id.in_(unit_ids))
+    
+    async def sweep(self, db: AsyncSession) -> Dict[str, int]:
+        """
+        Rescore every available unit, one city at a time
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of cities swept and rows written
+        """
+        cities = set((await db.execute(
+            select(Property.city).where(Property.is_active == True).distinct()
+        )).scalars().all())
+        cities.update((await db.execute(
+            select(NegotiationLeaderboard.city).distinct()
+        )).scalars().all())
+        
+        written = 0
+        for city in sorted(cities):
+            written += await self._refresh(db, Property.city == city, NegotiationLeaderboard.city == city)
+        
+        logger.info(f"Negotiation leaderboard sweep: {written} units across {len(cities)} cities")
+        return {'cities': len(cities), 'units': written}
+    
+    async def _refresh(self, db: AsyncSession, unit_filter: Any, row_filter: Any) -> int:
+        """Rescore the units matching unit_filter and replace the rows matching row_filter"""
+        units = (await db.execute(
+            select(
+                Unit.id,
+                Unit.property_id,
+                Unit.unit_number,
+                Unit.bedrooms,
+                Unit.current_price,
+                Unit.concessions,
+                Unit.first_seen_date,
+                Unit.days_on_market,
+                Property.name.label('property_name'),
+                Property.city
+            )
+            .join(Property, Unit.property_id == Property.id)
+            .where(and_(unit_filter, Unit.is_available == True, Property.is_active == True))
+        )).all()
+        
+        existing = {
+            row.unit_id: row
+            for row in (await db.execute(
+                select(NegotiationLeaderboard).where(row_filter)
+            )).scalars().all()
+        }
+        
+        if units:
+            scores = self.scorer.score_batch(await self._load_columns(db, units, unit_filter))
+            potential = scores.potential
+            scored_at = datetime.now(timezone.utc)
+            
+            for i, unit in enumerate(units):
+                row = existing.pop(unit.id, None)
+                if row is None:
+                    row = NegotiationLeaderboard(unit_id=unit.id)
+                    db.add(row)
+                
+                row.property_id = unit.property_id
+                row.city = unit.city
+                row.bedrooms = unit.bedrooms
+                row.total_score = float(scores.total[i])
+                row.negotiation_score = int(scores.score[i])
+                row.negotiation_potential = str(potential[i])
+                row.component_scores = {name: float(scores.components[name][i]) for name in SCORE_COMPONENTS}
+                row.property_name = unit.property_name
+                row.unit_number = unit.unit_number
+                row.current_price = unit.current_price
+                row.days_on_market = days_on_market_for(unit)
+                row.has_concessions = bool(unit.concessions)
+                row.scored_at = scored_at
+        
+        # Leased, withdrawn or moved out of this city
+        if existing:
+            await db.execute(
+                delete(NegotiationLeaderboard).where(NegotiationLeaderboard.id.in_([row.id for row in existing.values()]))
+            )
+        
+        await db.commit()
+        return len(units)
+    
+    async def _load_columns(self, db: AsyncSession, units: List[Any], unit_filter: Any) -> Dict[str, np.ndarray]:
+        """Score inputs for the given units, matching calculate_negotiation_score"""
+        cities = {unit.city for unit in units}
+        property_ids = {unit.property_id for unit in units}
+        
+        # Segment averages over all available units, not just those being rescored
+        segment_rows = (await db.execute(
+            select(Property.city, Unit.bedrooms, func.avg(Unit.current_price))
+            .join(Property, Unit.property_id == Property.id)
+            .where(
+                and_(
+                    Property.city.in_(cities),
+                    Unit.is_available == True,
+                    Property.is_active == True
+                )
+            )
+            .group_by(Property.city, Unit.bedrooms)
+        )).all()
+        segment_rent = {(city, bedrooms): float(avg) for city, bedrooms, avg in segment_rows}
+        
+        available_rows = (await db.execute(
+            select(Unit.property_id, func.count(Unit.id))
+            .where(and_(Unit.property_id.in_(property_ids), Unit.is_available == True))
+            .group_by(Unit.property_id)
+        )).all()
+        available = dict(available_rows)
+        
+        previous_price = func.lag(PriceHistory.price).over(
+            partition_by=PriceHistory.unit_id,
+            order_by=PriceHistory.recorded_at
+        )
+        history = (
+            select(PriceHistory.unit_id, PriceHistory.price, previous_price.label('previous_price'))
+            .where(PriceHistory.unit_id.in_(
+                select(Unit.id).join(Property, Unit.property_id == Property.id).where(unit_filter)
+            ))
+            .subquery()
+        )
+        reduction_rows = (await db.execute(
+            select(
+                history.c.unit_id,
+                func.sum(case(
+                    (and_(history.c.previous_price > history.c.price, history.c.previous_price > 0), 1),
+                    else_=0
+                ))
+            ).group_by(history.c.unit_id)
+        )).all()
+        reductions = {unit_id: float(count) for unit_id, count in reduction_rows}
+        
+        return {
+            'days_on_market': np.array([float(days_on_market_for(unit)) for unit in units]),
+            'price_reductions': np.array([reductions.get(unit.id, np.nan) for unit in units]),
+            'concession_score': self.scorer.concession_scores([unit.concessions or {} for unit in units]),
+            'current_price': np.array([float(unit.current_price) for unit in units]),
+            'market_avg_rent': np.array([
+                segment_rent.get((unit.city, unit.bedrooms), float(unit.current_price))
+                for unit in units
+            ]),
+            'available_units': np.array([float(available.get(unit.property_id, np.nan)) for unit in units])
+        }
+    
+    async def get_page(self,
+                       db: AsyncSession,
+                       city: str,
+                       bedrooms: Optional[int] = None,
+                       skip: int = 0,
+                       limit: int = 20) -> List[NegotiationLeaderboard]:
+        """
+        Read a page of the leaderboard, best opportunities first
+        
+        Args:
+            db: Database session
+            city: City to rank
+            bedrooms: Bedroom count; required for an index-only ordering
+            skip: Rows to skip
+            limit: Page size
+        
+        Returns:
+            Leaderboard rows
+        """
+        query = select(NegotiationLeaderboard).where(NegotiationLeaderboard.city == city)
+        if bedrooms is not None:
+            query = query.where(NegotiationLeaderboard.bedrooms == bedrooms)
+        
+        query = query.order_by(
+            desc(NegotiationLeaderboard.total_score),
+            desc(NegotiationLeaderboard.unit_id)
+        ).offset(skip).limit(limit)
+        
+        return (await db.execute(query)).scalars().all()
+
+
+# Shared service for the process
+negotiation_leaderboard = NegotiationLeaderboardService()
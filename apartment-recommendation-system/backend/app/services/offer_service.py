@@ -2,14 +2,104 @@
 Offer generation and management service
 """
 import logging
-from typing import Optional
-from app.models.offer import Offer
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.core.templating import CompiledTemplate, MissingVariablesError, TemplateError, compile_template, template_cache
+from app.models.offer import Offer, OfferTemplate
 from app.models.property import Property
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class CompiledOfferTemplate:
+    """Compiled subject line and body of an OfferTemplate"""
+    subject: CompiledTemplate
+    body: CompiledTemplate
+    required: frozenset
+    
+    def render(self, context: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Render the subject line and body
+        
+        Raises:
+            MissingVariablesError: If a required variable is absent or None
+        """
+        missing = sorted(name for name in self.required if context.get(name) is None)
+        if missing:
+            raise MissingVariablesError(missing, f"Missing template variables: {', '.join(missing)}")
+        return self.subject.render(context), self.body.render(context)
+    
+    def render_many(self, contexts: Iterable[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Render once per context, for bulk offer generation"""
+        return [self.render(context) for context in contexts]
+
+
+def compile_offer_template(template: OfferTemplate) -> CompiledOfferTemplate:
+    """
+    Compile an offer template, checking it against its declared variables
+    
+    Templates that declare no variables at all may use any placeholder.
+    
+    Raises:
+        TemplateError: If a required variable is never used, or a
+            placeholder is neither required nor optional
+    """
+    required = frozenset(template.required_variables or [])
+    declared = None
+    if template.required_variables or template.optional_variables:
+        declared = required | set(template.optional_variables or [])
+    
+    subject = compile_template(template.subject_line, optional_variables=declared)
+    body = compile_template(template.body_template, optional_variables=declared)
+    
+    unused = required - subject.variables - body.variables
+    if unused:
+        raise TemplateError(f"Required variables not used by template: {', '.join(sorted(unused))}")
+    
+    return CompiledOfferTemplate(subject=subject, body=body, required=required)
+
+
+def get_compiled_offer_template(template: OfferTemplate) -> CompiledOfferTemplate:
+    """Compiled template, cached until the template is next updated"""
+    return template_cache.get(
+        (template.id, template.updated_at),
+        lambda: compile_offer_template(template)
+    )
+
+
+def offer_template_context(offer: Offer, unit, property: Property, user: User) -> Dict[str, Any]:
+    """
+    Variables available to offer templates
+    
+    Money and percentages are numbers so templates can format them,
+    e.g. {{offer_amount:,.0f}}.
+    """
+    return {
+        'user_name': user.full_name or user.username or user.email,
+        'user_email': user.email,
+        'user_phone': user.phone,
+        'property_name': property.name,
+        'property_address': property.address,
+        'city': property.city,
+        'state': property.state,
+        'unit_number': unit.unit_number,
+        'bedrooms': unit.bedrooms,
+        'bathrooms': float(unit.bathrooms) if unit.bathrooms is not None else None,
+        'square_feet': unit.square_feet,
+        'asking_price': float(offer.original_asking_price),
+        'offer_amount': float(offer.offer_amount),
+        'discount_amount': float(offer.discount_amount) if offer.discount_amount is not None else None,
+        'discount_percentage': offer.discount_percentage,
+        'lease_term_months': offer.lease_term_months,
+        'move_in_date': offer.move_in_date.strftime("%B %d, %Y") if offer.move_in_date else None,
+        'special_requests': offer.special_requests,
+        'date': date.today().strftime("%B %d, %Y")
+    }
+
+
 async def generate_offer_pdf(offer: Offer, unit, user: User) -> Optional[str]:
     """
     Generate PDF for an offer
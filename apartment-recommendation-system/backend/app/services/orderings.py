@@ -0,0 +1,138 @@
+"""
+Keyset orderings for search and listing endpoints
+
+Each ordering's keys match a composite index declared on its model, so a
+page is one index range scan at any depth.
+"""
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select
+
+from app.core.pagination import Keyset
+from app.models.offer import Offer
+from app.models.property import (
+    Property,
+    Unit,
+    UnitSearch,
+    PROPERTY_RATING_SORT,
+    PROPERTY_MIN_PRICE_SORT,
+    PROPERTY_MAX_PRICE_SORT,
+    PROPERTY_BEDROOMS_SORT,
+    PROPERTY_SQUARE_FEET_SORT,
+    PROPERTY_DAYS_ON_MARKET_SORT,
+    UNIT_SQUARE_FEET_SORT,
+    UNIT_AVAILABLE_DATE_SORT,
+    UNIT_SEARCH_SQUARE_FEET_SORT,
+    UNIT_SEARCH_AVAILABLE_DATE_SORT,
+    UNIT_SEARCH_RATING_SORT,
+    UNIT_SEARCH_DAYS_ON_MARKET_SORT
+)
+from app.schemas.search import PropertySortBy
+from app.services.geo_search import geo_search
+from app.services.unit_search import PROPERTY_AGGREGATES
+
+UNIT_SORT_KEYS = {
+    'price_low': [(Unit.current_price, False)],
+    'price_high': [(Unit.current_price, True)],
+    'newest': [(Unit.created_at, True)],
+    'bedrooms': [(Unit.bedrooms, True)],
+    'square_feet': [(UNIT_SQUARE_FEET_SORT, True)],
+    'available_date': [(UNIT_AVAILABLE_DATE_SORT, False)]
+}
+
+# The same orderings over unit_search; cursors are interchangeable with UNIT_SORT_KEYS
+UNIT_SEARCH_SORT_KEYS = {
+    'price_low': [(UnitSearch.current_price, False)],
+    'price_high': [(UnitSearch.current_price, True)],
+    'newest': [(UnitSearch.listed_at, True)],
+    'bedrooms': [(UnitSearch.bedrooms, True)],
+    'square_feet': [(UNIT_SEARCH_SQUARE_FEET_SORT, True)],
+    'available_date': [(UNIT_SEARCH_AVAILABLE_DATE_SORT, False)],
+    'rating': [(UNIT_SEARCH_RATING_SORT, True)],
+    'days_on_market': [(UNIT_SEARCH_DAYS_ON_MARKET_SORT, True)]
+}
+
+# Property sorts that rank by the property's units: (stored sort key, aggregate, descending).
+# The stored keys cover available units; other unit filters rank by the matching units.
+PROPERTY_UNIT_SORTS = {
+    PropertySortBy.PRICE_LOW: (PROPERTY_MIN_PRICE_SORT, 'min_price', False),
+    PropertySortBy.PRICE_HIGH: (PROPERTY_MAX_PRICE_SORT, 'max_price', True),
+    PropertySortBy.BEDROOMS: (PROPERTY_BEDROOMS_SORT, 'max_bedrooms', True),
+    PropertySortBy.SQUARE_FEET: (PROPERTY_SQUARE_FEET_SORT, 'max_square_feet', True),
+    PropertySortBy.DAYS_ON_MARKET: (PROPERTY_DAYS_ON_MARKET_SORT, 'max_days_on_market', True)
+}
+
+# A user's offers, newest first
+OFFER_KEYSET = Keyset("offers:newest", [(Offer.created_at, True)], Offer.id)
+
+
+def unit_keyset(sort: str) -> Keyset:
+    """
+    Keyset ordering for units
+    
+    Args:
+        sort: A key of UNIT_SORT_KEYS
+    
+    Returns:
+        Keyset ordering
+    """
+    return Keyset(f"units:{sort}", UNIT_SORT_KEYS[sort], Unit.id)
+
+
+def unit_search_keyset(sort: str, geo_center: Optional[Tuple[Any, Any]] = None) -> Keyset:
+    """
+    Keyset ordering for unit_search rows
+    
+    Args:
+        sort: A key of UNIT_SEARCH_SORT_KEYS, or "distance" with geo_center
+        geo_center: (latitude, longitude) of a radius search
+    
+    Returns:
+        Keyset ordering
+    """
+    if sort == "distance":
+        return Keyset("units:distance", [(geo_search.distance_order(*geo_center, UnitSearch), False)], UnitSearch.unit_id)
+    return Keyset(f"units:{sort}", UNIT_SEARCH_SORT_KEYS[sort], UnitSearch.unit_id)
+
+
+def property_keyset(sort_by: Optional[PropertySortBy],
+                    geo_center: Optional[Tuple[Any, Any]] = None,
+                    unit_conditions: Optional[List[Any]] = None) -> Keyset:
+    """
+    Keyset ordering for property search
+    
+    Price, bedroom, size and days-on-market sorts rank each property by
+    its units: by the aggregates stored on the property when only
+    availability is filtered, else by the units matching unit_conditions.
+    Distance needs a centre; without one, and for anything unsupported,
+    properties are in listing order, oldest first.
+    
+    Args:
+        sort_by: Requested sort
+        geo_center: (latitude, longitude) of a radius search
+        unit_conditions: Filters on unit_search a property's units must
+            meet, when they go beyond availability
+    
+    Returns:
+        Keyset ordering
+    """
+    if sort_by == PropertySortBy.DISTANCE and geo_center:
+        return Keyset("properties:distance", [(geo_search.distance_order(*geo_center), False)], Property.id)
+    if sort_by == PropertySortBy.NEWEST:
+        return Keyset("properties:newest", [(Property.created_at, True)], Property.id)
+    if sort_by == PropertySortBy.RATING:
+        return Keyset("properties:rating", [(PROPERTY_RATING_SORT, True)], Property.id)
+    
+    if sort_by in PROPERTY_UNIT_SORTS:
+        stored, aggregate, descending = PROPERTY_UNIT_SORTS[sort_by]
+        if not unit_conditions:
+            return Keyset(f"properties:{sort_by.value}:available", [(stored, descending)], Property.id)
+        key = select(PROPERTY_AGGREGATES[aggregate]).where(
+            UnitSearch.property_id == Property.id, *unit_conditions
+        ).scalar_subquery()
+        # Descending keys over nullable columns sort properties without a value last
+        if descending:
+            key = func.coalesce(key, literal_column("-1"))
+        return Keyset(f"properties:{sort_by.value}", [(key, descending)], Property.id)
+    
+    return Keyset("properties:listed", [(Property.created_at, False)], Property.id)
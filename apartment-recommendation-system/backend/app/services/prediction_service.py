@@ -0,0 +1,190 @@
+"""
+On-demand unit predictions with a cache keyed by the unit's market state
+"""
+from typing import Any, Dict, Optional, Tuple
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
+import bisect
+import hashlib
+import json
+import logging
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai.market_predictor import MarketPredictor
+from app.ai.negotiation_scorer import NegotiationScorer
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.executors import compute_executors
+from app.models.property import Property, Unit, PriceHistory
+
+logger = logging.getLogger(__name__)
+
+# Days-on-market bucket edges; matches the negotiation scorer thresholds
+DAYS_ON_MARKET_BUCKETS = [7, 14, 21, 30, 45, 60, 90]
+
+
+def days_on_market_for(unit: Unit, today: Optional[date] = None) -> int:
+    """Days on market as of today, falling back to the stored counter"""
+    today = today or datetime.now(timezone.utc).date()
+    if unit.first_seen_date:
+        return max((today - unit.first_seen_date).days, 0)
+    return unit.days_on_market or 0
+
+
+def next_rollover(now: Optional[datetime] = None) -> datetime:
+    """Next UTC midnight, when every unit's days on market ticks over"""
+    now = now or datetime.now(timezone.utc)
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+
+def prediction_cache_key(unit: Unit, days_on_market: int, model_version: str) -> str:
+    """
+    Hash of everything a cached unit prediction depends on
+    
+    Args:
+        unit: Unit being predicted
+        days_on_market: Current days on market
+        model_version: Market model version
+    
+    Returns:
+        Hex digest
+    """
+    state = json.dumps([
+        str(unit.id),
+        str(unit.current_price),
+        unit.concessions or {},
+        bisect.bisect_right(DAYS_ON_MARKET_BUCKETS, days_on_market),
+        model_version
+    ], sort_keys=True, default=str)
+    return hashlib.blake2b(state.encode(), digest_size=16).hexdigest()
+
+
+class PredictionService:
+    """
+    Computes MarketPredictor and NegotiationScorer outputs for a unit and
+    caches them until the unit's price, concessions or days-on-market
+    bucket change, the model is retrained, or the daily rollover passes
+    """
+    
+    def __init__(self,
+                 predictor: Optional[MarketPredictor] = None,
+                 scorer: Optional[NegotiationScorer] = None,
+                 cache: Optional[LRUCache] = None):
+        self.predictor = predictor or MarketPredictor()
+        self.scorer = scorer or NegotiationScorer()
+        self.cache = cache or LRUCache(max_size=settings.PREDICTION_CACHE_SIZE)
+    
+    async def get_unit_predictions(self, unit: Unit, db: AsyncSession) -> Tuple[Dict[str, Any], bool]:
+        """
+        Get predictions for a unit, computing them on a cache miss
+        
+        Args:
+            unit: Unit to predict
+            db: Database session
+        
+        Returns:
+            Tuple of (prediction payload, whether it came from the cache)
+        """
+        days_on_market = days_on_market_for(unit)
+        model_version = self.predictor.model_version
+        key = prediction_cache_key(unit, days_on_market, model_version)
+        
+        entry = self.cache.get_entry(key)
+        if entry is not None:
+            return entry.value, True
+        
+        unit_data = await self._load_unit_data(unit, days_on_market, db)
+        market_data = await self._load_market_data(unit, db)
+        payload = await compute_executors.run_numpy(self._compute, unit_data, market_data)
+        payload['model_version'] = model_version
+        
+        expires_at = next_rollover()
+        payload['expires_at'] = expires_at.isoformat()
+        self.cache.set(key, payload, expires_at=expires_at.timestamp())
+        return payload, False
+    
+    def _compute(self, unit_data: Dict, market_data: Dict) -> Dict[str, Any]:
+        """Run the models; called in the compute thread pool"""
+        strategy = self.scorer.calculate_negotiation_score(unit_data, market_data)
+        
+        return {
+            'price': self.predictor.predict_price_change(unit_data, market_data),
+            'days_to_lease': self.predictor.predict_days_to_lease(unit_data, market_data),
+            'concessions': self.predictor.predict_concession_probability(unit_data, market_data),
+            'offer': self.predictor.calculate_optimal_offer_price(unit_data, market_data),
+            'negotiation': asdict(strategy),
+            'computed_at': datetime.now(timezone.utc).isoformat()
+        }
+    
+    async def _load_unit_data(self, unit: Unit, days_on_market: int, db: AsyncSession) -> Dict[str, Any]:
+        history_result = await db.execute(
+            select(PriceHistory.price, PriceHistory.recorded_at)
+            .where(PriceHistory.unit_id == unit.id)
+            .order_by(PriceHistory.recorded_at)
+        )
+        property_name = (await db.execute(
+            select(Property.name).where(Property.id == unit.property_id)
+        )).scalar_one_or_none()
+        
+        return {
+            'id': str(unit.id),
+            'property_name': property_name or '',
+            'bedrooms': unit.bedrooms,
+            'bathrooms': float(unit.bathrooms) if unit.bathrooms else 1.0,
+            'square_feet': unit.square_feet or 800,
+            'current_price': float(unit.current_price) if unit.current_price else 0,
+            'concessions': unit.concessions or {},
+            'days_on_market': days_on_market,
+            'price_history': [
+                {'price': float(row.price), 'date': row.recorded_at}
+                for row in history_result.all()
+            ]
+        }
+    
+    async def _load_market_data(self, unit: Unit, db: AsyncSession) -> Dict[str, Any]:
+        """Comparable available units: same city and bedroom count"""
+        city = select(Property.city).where(Property.id == unit.property_id).scalar_subquery()
+        comparables = (await db.execute(
+            select(
+                func.avg(Unit.current_price).label('avg_rent'),
+                func.avg(Unit.days_on_market).label('avg_days_on_market'),
+                func.count(Unit.id).label('units')
+            )
+            .join(Property, Unit.property_id == Property.id)
+            .where(
+                and_(
+                    Property.city == city,
+                    Unit.bedrooms == unit.bedrooms,
+                    Unit.is_available == True,
+                    Property.is_active == True
+                )
+            )
+        )).one()
+        
+        property_result = await db.execute(
+            select(Property.name, func.count(Unit.id))
+            .join(Unit, Unit.property_id == Property.id)
+            .where(and_(Property.id == unit.property_id, Unit.is_available == True))
+            .group_by(Property.name)
+        )
+        
+        market_stats = {}
+        if comparables.units:
+            market_stats = {
+                'avg_rent': float(comparables.avg_rent),
+                'avg_days_on_market': float(comparables.avg_days_on_market or 0)
+            }
+        
+        return {
+            'market_stats': market_stats,
+            'property_stats': {
+                name: {'unit_number': available}
+                for name, available in property_result.all()
+            }
+        }
+
+
+# Shared service for the process
+prediction_service = PredictionService()
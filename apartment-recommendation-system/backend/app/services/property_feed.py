@@ -0,0 +1,61 @@
+"""
+Polling feed of property changes for in-process indexes
+"""
+from typing import Any, List, Optional
+from datetime import datetime, timedelta
+import time
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.property import Property
+
+# Re-read rows updated this long before the watermark; now() is the
+# transaction start, so a slow transaction can commit an older timestamp
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class PropertyChangeFeed:
+    """
+    Properties whose updated_at moved since the last poll
+    
+    Lets each worker's in-process index pick up writes made by other
+    workers; writes in the same worker arrive sooner through the
+    inventory hooks. Re-delivered rows must be safe to apply twice.
+    """
+    
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._watermark: Optional[datetime] = None
+        self._polled_at = 0.0
+    
+    async def start(self, db: AsyncSession) -> None:
+        """Mark everything committed so far as seen; call after a full load"""
+        self._watermark = (await db.execute(select(func.max(Property.updated_at)))).scalar()
+        self._polled_at = time.monotonic()
+    
+    async def poll(self, db: AsyncSession, columns: List[Any], force: bool = False) -> List[Any]:
+        """
+        Changed property rows, at most once per interval unless forced
+        
+        Args:
+            db: Database session
+            columns: Property columns to select
+            force: Poll regardless of when the last poll ran
+        
+        Returns:
+            Rows of the requested columns
+        """
+        if not force and time.monotonic() - self._polled_at < self.interval_seconds:
+            return []
+        self._polled_at = time.monotonic()
+        
+        query = select(*columns, Property.updated_at)
+        if self._watermark is not None:
+            query = query.where(Property.updated_at >= self._watermark - SYNC_OVERLAP)
+        rows = (await db.execute(query)).all()
+        
+        for row in rows:
+            if self._watermark is None or row.updated_at > self._watermark:
+                self._watermark = row.updated_at
+        return rows
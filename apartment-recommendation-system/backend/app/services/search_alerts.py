@@ -0,0 +1,498 @@
+"""
+Saved-search alerts by reverse matching inventory changes
+
+Re-running every saved search on a schedule costs searches x inventory.
+Instead the criteria of alerting searches are indexed by city, price
+band and bedroom count; a changed unit looks up only the searches whose
+buckets hold it, evaluates those in memory and writes MarketAlert rows
+in one statement. Alert cost grows with changes, not with saved searches.
+alert_frequency governs delivery of the alerts written here, not their
+creation.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import logging
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.features import UnknownFeatureError, search_feature_tags
+from app.core.geo import haversine_miles
+from app.models.market import MarketAlert, MarketVelocity
+from app.models.property import Property, Unit
+from app.models.user import SavedSearch
+from app.schemas.search import MarketStatus, PropertySearchBase
+from app.services.property_feed import SYNC_OVERLAP
+
+logger = logging.getLogger(__name__)
+
+# Width of a price band; prices past the last band share it
+ALERT_PRICE_BAND = 500
+ALERT_PRICE_BANDS = 20
+
+# Bedroom counts past this share its bucket
+ALERT_MAX_BEDROOMS = 5
+
+# City key of searches without a city filter
+ANY_CITY = ''
+
+# Indexes added after tables were first created; create_all covers new databases
+ALERT_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS ix_market_alerts_unit_type_created ON market_alerts (unit_id, alert_type, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_saved_searches_updated ON saved_searches (updated_at)"
+]
+
+ALERT_TITLES = {
+    'new_listing': "New listing for your search '{name}'",
+    'price_drop': "Price drop for your search '{name}'"
+}
+
+
+@dataclass
+class AlertCriteria:
+    """A saved search's criteria, parsed once when indexed"""
+    search_id: Any
+    user_id: Any
+    name: str
+    params: PropertySearchBase
+    city: str
+    required_tags: List[str]
+    excluded_tags: List[str]
+
+
+@dataclass
+class UnitChange:
+    """A unit write that may alert saved searches"""
+    unit: Unit
+    alert_type: str
+    previous_price: Optional[Decimal] = None
+
+
+def alert_type_for(unit: Unit,
+                   changed_fields: Iterable[str],
+                   created: bool,
+                   previous: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    The alert a unit write raises, if any
+    
+    New and relisted available units are new listings; a lower price on
+    an available unit is a price drop. Other writes raise nothing.
+    
+    Args:
+        unit: Unit as written
+        changed_fields: Names of the fields that changed
+        created: Whether the unit is new
+        previous: Values of changed fields before the write
+    
+    Returns:
+        Alert type or None
+    """
+    if not unit.is_available:
+        return None
+    changed_fields = set(changed_fields)
+    if created or 'is_available' in changed_fields:
+        return 'new_listing'
+    previous_price = (previous or {}).get('current_price')
+    if 'current_price' in changed_fields and previous_price is not None and unit.current_price < previous_price:
+        return 'price_drop'
+    return None
+
+
+def parse_criteria(saved_search: SavedSearch) -> Optional[AlertCriteria]:
+    """
+    Criteria of a saved search, or None when it can never match
+    
+    Args:
+        saved_search: Saved search row
+    
+    Returns:
+        Parsed criteria
+    """
+    try:
+        params = PropertySearchBase.model_validate(saved_search.search_criteria or {})
+        required, excluded = search_feature_tags(
+            required_amenities=params.required_amenities,
+            utilities_included=params.utilities_included,
+            pet_friendly=params.pet_friendly,
+            cats_allowed=params.cats_allowed,
+            dogs_allowed=params.dogs_allowed,
+            parking_required=params.parking_required,
+            garage_required=params.garage_required,
+            elevator_required=params.elevator_required
+        )
+    except (ValidationError, UnknownFeatureError) as e:
+        logger.debug(f"Saved search {saved_search.id} is not alertable: {e}")
+        return None
+    
+    return AlertCriteria(
+        search_id=saved_search.id,
+        user_id=saved_search.user_id,
+        name=saved_search.search_name,
+        params=params,
+        city=(params.city or '').strip().lower(),
+        required_tags=required,
+        excluded_tags=excluded
+    )
+
+
+def _price_band(price: Decimal) -> int:
+    return min(int(price // ALERT_PRICE_BAND), ALERT_PRICE_BANDS)
+
+
+def _bedroom_bucket(bedrooms: int) -> int:
+    return min(bedrooms, ALERT_MAX_BEDROOMS)
+
+
+def _keys(criteria: AlertCriteria) -> List[Tuple[str, int, int]]:
+    """Index buckets holding a search: every (city, band, bedrooms) it can match"""
+    params = criteria.params
+    # Zero bounds filter nothing in search either
+    low = _price_band(params.min_price or 0)
+    high = _price_band(params.max_price) if params.max_price else ALERT_PRICE_BANDS
+    bands = range(low, high + 1)
+    
+    low = _bedroom_bucket(params.min_bedrooms or 0)
+    high = _bedroom_bucket(params.max_bedrooms) if params.max_bedrooms else ALERT_MAX_BEDROOMS
+    bedrooms = range(low, high + 1)
+    
+    return [(criteria.city, band, count) for band in bands for count in bedrooms]
+
+
+def matches(criteria: AlertCriteria,
+            unit: Unit,
+            property: Property,
+            velocities: Sequence[MarketVelocity] = ()) -> bool:
+    """
+    Whether a unit would be returned by a saved search
+    
+    Mirrors the filters of property search, applied to a single unit.
+    
+    Args:
+        criteria: Search criteria
+        unit: Candidate unit
+        property: The unit's property
+        velocities: The property's market velocity rows
+    
+    Returns:
+        Whether it matches
+    """
+    params = criteria.params
+    if not property.is_active:
+        return False
+    
+    # Location
+    if criteria.city and criteria.city not in (property.city or '').lower():
+        return False
+    if params.state and property.state != params.state:
+        return False
+    if params.zip_codes and property.zip_code not in params.zip_codes:
+        return False
+    if params.latitude is not None and params.longitude is not None and params.radius_miles:
+        if property.latitude is None or property.longitude is None:
+            return False
+        distance = haversine_miles(
+            float(params.latitude), float(params.longitude), float(property.latitude), float(property.longitude)
+        )
+        if distance > params.radius_miles:
+            return False
+    
+    # Property and building
+    if params.property_types and property.property_type not in params.property_types:
+        return False
+    for minimum, value in (
+        (params.min_year_built, property.year_built),
+        (params.min_walk_score, property.walk_score),
+        (params.min_transit_score, property.transit_score),
+        (params.min_bike_score, property.bike_score),
+        (params.min_rating, property.rating)
+    ):
+        if minimum and (value is None or value < minimum):
+            return False
+    if params.max_floors and (property.floors is None or property.floors > params.max_floors):
+        return False
+    tags = set(property.feature_tags or [])
+    if not tags.issuperset(criteria.required_tags) or tags.intersection(criteria.excluded_tags):
+        return False
+    
+    # Unit
+    if params.available_only and not unit.is_available:
+        return False
+    if params.available_before and unit.available_date and unit.available_date > params.available_before:
+        return False
+    for minimum, maximum, value in (
+        (params.min_price, params.max_price, unit.current_price),
+        (params.min_bedrooms, params.max_bedrooms, unit.bedrooms),
+        (params.min_bathrooms, params.max_bathrooms, unit.bathrooms),
+        (params.min_square_feet, params.max_square_feet, unit.square_feet)
+    ):
+        if (minimum or maximum) and value is None:
+            return False
+        if minimum and value < minimum:
+            return False
+        if maximum and value > maximum:
+            return False
+    if params.has_concessions is not None and bool(unit.has_concessions) != params.has_concessions:
+        return False
+    
+    # Market: some velocity row of the property must meet every market filter
+    if params.market_status or params.max_days_on_market or params.recent_price_drop:
+        # Filter statuses are the velocity statuses plus ALL; compared by value
+        status_filter = params.market_status.value if params.market_status not in (None, MarketStatus.ALL) else None
+        if not any(
+            (status_filter is None or velocity.market_status == status_filter)
+            and (not params.max_days_on_market or velocity.days_on_market <= params.max_days_on_market)
+            and (not params.recent_price_drop or (velocity.price_drop_percentage or 0) > 0)
+            for velocity in velocities
+        ):
+            return False
+    
+    return True
+
+
+class SearchPercolator:
+    """
+    In-process index of alerting saved searches
+    
+    Searches saved or deleted in this worker are applied immediately;
+    other workers' changes arrive by polling saved_searches.updated_at.
+    Deleted searches are only dropped here locally, but every candidate
+    is re-checked against the table before alerting, so a stale entry
+    costs a lookup and never an alert.
+    """
+    
+    def __init__(self,
+                 sync_seconds: float = settings.SEARCH_ALERTS_SYNC_SECONDS,
+                 repeat_hours: float = settings.SEARCH_ALERTS_REPEAT_HOURS):
+        self.sync_seconds = sync_seconds
+        self.repeat_window = timedelta(hours=repeat_hours)
+        self.ready = False
+        
+        self._criteria: Dict[Any, AlertCriteria] = {}
+        self._buckets: Dict[Tuple[str, int, int], Set[Any]] = {}
+        self._cities: Dict[str, int] = {}
+        self._watermark: Optional[datetime] = None
+        self._polled_at = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._criteria)
+    
+    async def setup(self, engine: Any) -> None:
+        """Add the alert indexes on databases created before them"""
+        async with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                for statement in ALERT_SCHEMA:
+                    await conn.execute(text(statement))
+    
+    async def build(self, db: AsyncSession) -> int:
+        """
+        Index every alerting saved search
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Searches indexed
+        """
+        self._criteria, self._buckets, self._cities = {}, {}, {}
+        result = await db.execute(select(SavedSearch).where(SavedSearch.alert_enabled == True))
+        for saved_search in result.scalars().all():
+            self.apply_search(saved_search)
+        self._watermark = (await db.execute(select(func.max(SavedSearch.updated_at)))).scalar()
+        self._polled_at = time.monotonic()
+        self.ready = True
+        logger.info(f"Saved-search alert index built with {len(self)} searches")
+        return len(self)
+    
+    async def sync(self, db: AsyncSession, force: bool = False) -> int:
+        """
+        Apply saved searches other workers changed since the last poll
+        
+        Args:
+            db: Database session
+            force: Poll regardless of when the last poll ran
+        
+        Returns:
+            Searches re-applied
+        """
+        if not force and time.monotonic() - self._polled_at < self.sync_seconds:
+            return 0
+        self._polled_at = time.monotonic()
+        
+        query = select(SavedSearch)
+        if self._watermark is not None:
+            query = query.where(SavedSearch.updated_at >= self._watermark - SYNC_OVERLAP)
+        changed = (await db.execute(query)).scalars().all()
+        for saved_search in changed:
+            self.apply_search(saved_search)
+            if self._watermark is None or saved_search.updated_at > self._watermark:
+                self._watermark = saved_search.updated_at
+        return len(changed)
+    
+    def apply_search(self, saved_search: SavedSearch) -> None:
+        """Index, re-index or drop a saved search after it was written"""
+        self.remove_search(saved_search.id)
+        if not saved_search.alert_enabled:
+            return
+        criteria = parse_criteria(saved_search)
+        if criteria is None:
+            return
+        
+        self._criteria[criteria.search_id] = criteria
+        self._cities[criteria.city] = self._cities.get(criteria.city, 0) + 1
+        for key in _keys(criteria):
+            self._buckets.setdefault(key, set()).add(criteria.search_id)
+    
+    def remove_search(self, search_id: Any) -> None:
+        """Drop a saved search from the index"""
+        criteria = self._criteria.pop(search_id, None)
+        if criteria is None:
+            return
+        self._cities[criteria.city] -= 1
+        if not self._cities[criteria.city]:
+            del self._cities[criteria.city]
+        for key in _keys(criteria):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(search_id)
+                if not bucket:
+                    del self._buckets[key]
+    
+    def candidates(self, city: Optional[str], price: Decimal, bedrooms: int) -> Set[Any]:
+        """
+        Searches whose buckets hold a unit
+        
+        City filters match as substrings, like search itself, so every
+        substring of the unit's city that some search uses is looked up.
+        
+        Args:
+            city: The unit's property city
+            price: Unit price
+            bedrooms: Unit bedroom count
+        
+        Returns:
+            Candidate saved search ids
+        """
+        city = (city or '').lower()
+        cities = {
+            city[start:end] for start in range(len(city)) for end in range(start + 1, len(city) + 1)
+        } & self._cities.keys()
+        cities.add(ANY_CITY)
+        
+        band, bucket = _price_band(price), _bedroom_bucket(bedrooms)
+        found: Set[Any] = set()
+        for key in cities:
+            found |= self._buckets.get((key, band, bucket), set())
+        return found
+    
+    async def percolate(self, db: AsyncSession, changes: Sequence[UnitChange]) -> int:
+        """
+        Write alerts for the saved searches that unit changes now match
+        
+        Args:
+            db: Database session
+            changes: Unit writes, each with the alert it would raise
+        
+        Returns:
+            Alerts written
+        """
+        if not self.ready or not changes:
+            return 0
+        await self.sync(db)
+        
+        property_ids = {change.unit.property_id for change in changes}
+        properties = {
+            property.id: property
+            for property in (await db.execute(select(Property).where(Property.id.in_(property_ids)))).scalars().all()
+        }
+        
+        candidates: Dict[int, Set[Any]] = {}
+        for position, change in enumerate(changes):
+            property = properties.get(change.unit.property_id)
+            if property is not None:
+                found = self.candidates(property.city, change.unit.current_price, change.unit.bedrooms)
+                if found:
+                    candidates[position] = found
+        if not candidates:
+            return 0
+        
+        # Candidates still alerting in the table; the index may be behind
+        search_ids = set().union(*candidates.values())
+        live = set((await db.execute(
+            select(SavedSearch.id).where(SavedSearch.id.in_(search_ids), SavedSearch.alert_enabled == True)
+        )).scalars().all())
+        
+        velocities: Dict[Any, List[MarketVelocity]] = {}
+        if any(
+            self._criteria[search_id].params.market_status
+            or self._criteria[search_id].params.max_days_on_market
+            or self._criteria[search_id].params.recent_price_drop
+            for search_id in live if search_id in self._criteria
+        ):
+            for velocity in (await db.execute(
+                select(MarketVelocity).where(MarketVelocity.property_id.in_(property_ids))
+            )).scalars().all():
+                velocities.setdefault(velocity.property_id, []).append(velocity)
+        
+        matched: List[Tuple[UnitChange, AlertCriteria]] = []
+        for position, found in candidates.items():
+            change = changes[position]
+            property = properties[change.unit.property_id]
+            for search_id in found & live:
+                criteria = self._criteria.get(search_id)
+                if criteria is not None and matches(criteria, change.unit, property, velocities.get(property.id, ())):
+                    matched.append((change, criteria))
+        if not matched:
+            return 0
+        
+        # One alert per search, unit and change type within the repeat window
+        recent = set((await db.execute(
+            select(MarketAlert.saved_search_id, MarketAlert.unit_id, MarketAlert.alert_type).where(
+                MarketAlert.unit_id.in_({change.unit.id for change, _ in matched}),
+                MarketAlert.created_at >= datetime.now(timezone.utc) - self.repeat_window
+            )
+        )).all())
+        
+        rows = []
+        for change, criteria in matched:
+            key = (criteria.search_id, change.unit.id, change.alert_type)
+            if key in recent:
+                continue
+            recent.add(key)
+            rows.append(self._alert_row(change, criteria, properties[change.unit.property_id]))
+        if not rows:
+            return 0
+        
+        await db.execute(insert(MarketAlert), rows)
+        await db.commit()
+        return len(rows)
+    
+    def _alert_row(self, change: UnitChange, criteria: AlertCriteria, property: Property) -> Dict[str, Any]:
+        unit = change.unit
+        price = f"${unit.current_price:,.0f}/mo"
+        if change.alert_type == 'price_drop' and change.previous_price is not None:
+            price = f"{price} (was ${change.previous_price:,.0f})"
+        bedrooms = f"{unit.bedrooms} bd" if unit.bedrooms else "Studio"
+        return {
+            'user_id': criteria.user_id,
+            'alert_type': change.alert_type,
+            'title': ALERT_TITLES[change.alert_type].format(name=criteria.name),
+            'message': f"{bedrooms} at {property.name}, {property.city} for {price}",
+            'data': {
+                'price': float(unit.current_price),
+                'previous_price': float(change.previous_price) if change.previous_price is not None else None,
+                'bedrooms': unit.bedrooms,
+                'city': property.city
+            },
+            'property_id': property.id,
+            'unit_id': unit.id,
+            'saved_search_id': criteria.search_id
+        }
+
+
+# Shared instance; build() runs at startup
+search_percolator = SearchPercolator()
@@ -0,0 +1,275 @@
+"""
+Result cache for search endpoints
+
+Responses are cached under a canonical hash of the search parameters in
+two tiers: an in-process LRU and, when Redis is reachable, a shared Redis
+tier. Entries are stamped with the inventory version of the cities they
+cover. Inventory writes bump their city's version, which invalidates
+that city's entries and searches spanning every city, but nothing else.
+"""
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import time
+
+from pydantic import BaseModel
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Version a write to an unknown or every city bumps; every stamp includes it
+ALL_CITIES = '*'
+
+# Bump one city's version from the shared clock in a single round trip; a
+# missing clock restarts from the wall clock so versions never go back
+BUMP_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+local version = redis.call('INCR', KEYS[1])
+redis.call('HSET', KEYS[2], ARGV[1], version)
+return version
+"""
+
+
+def canonical_params(params: BaseModel) -> Dict[str, Any]:
+    """
+    Search parameters reduced to what selects the results
+    
+    Defaults are stripped, lists sorted and strings trimmed, so payloads
+    that request the same results compare equal. Page and cursor stay in.
+    
+    Args:
+        params: Search request
+    
+    Returns:
+        JSON-compatible parameters
+    """
+    canonical = {}
+    for name, value in params.model_dump(mode='json', exclude_defaults=True).items():
+        if isinstance(value, list):
+            value = sorted(value, key=lambda item: json.dumps(item, sort_keys=True))
+        elif isinstance(value, str):
+            value = value.strip()
+        canonical[name] = value
+    return canonical
+
+
+def search_cache_key(scope: str, params: BaseModel) -> str:
+    """
+    Cache key for a search request
+    
+    Args:
+        scope: Endpoint the request belongs to
+        params: Search request
+    
+    Returns:
+        Cache key
+    """
+    digest = hashlib.sha256(json.dumps(canonical_params(params), sort_keys=True).encode()).hexdigest()
+    return f"search:{scope}:{digest[:32]}"
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class InventoryVersions:
+    """
+    Per-city inventory versions drawn from one monotonic clock
+    
+    A search's stamp is the newest version among the cities it can
+    match, so it changes exactly when one of those cities is written.
+    With Redis the versions are shared between workers and re-read at
+    most every sync_seconds; without it each worker sees only its own
+    writes and cache TTLs bound staleness.
+    """
+    
+    def __init__(self, sync_seconds: float = settings.SEARCH_CACHE_VERSION_SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._versions: Dict[str, int] = {}
+        self._clock = 0
+        self._synced_at = 0.0
+    
+    def stamp(self, city: Optional[str] = None) -> int:
+        """
+        Version of the inventory a search covers
+        
+        Args:
+            city: The search's city filter, matched as a substring like
+                the search itself; None covers every city
+        
+        Returns:
+            Version stamp
+        """
+        if city is None or not city.strip():
+            return self._clock
+        city = city.strip().lower()
+        return max(
+            (version for name, version in self._versions.items() if name == ALL_CITIES or city in name),
+            default=0
+        )
+    
+    def apply(self, versions: Dict[str, int]) -> None:
+        """Merge versions read from the shared store"""
+        for name, version in versions.items():
+            version = int(version)
+            if version > self._versions.get(name, 0):
+                self._versions[name] = version
+            self._clock = max(self._clock, version)
+    
+    def bump_local(self, city: Optional[str]) -> int:
+        """Advance a city's version in this worker only"""
+        self._clock = max(self._clock + 1, _now_ms())
+        self._versions[city.strip().lower() if city else ALL_CITIES] = self._clock
+        return self._clock
+    
+    def due(self) -> bool:
+        """Whether the shared versions should be re-read"""
+        return time.monotonic() - self._synced_at >= self.sync_seconds
+    
+    def mark_synced(self) -> None:
+        self._synced_at = time.monotonic()
+
+
+class SearchResultCache:
+    """In-process and Redis tiers of cached search responses"""
+    
+    def __init__(self,
+                 local: Optional[LRUCache] = None,
+                 ttl_seconds: int = settings.SEARCH_CACHE_TTL_SECONDS,
+                 use_redis: bool = settings.SEARCH_CACHE_REDIS_ENABLED):
+        self.enabled = settings.SEARCH_CACHE_ENABLED
+        self.ttl_seconds = ttl_seconds
+        self.local = local or LRUCache(max_size=settings.SEARCH_CACHE_SIZE, default_ttl=ttl_seconds)
+        self.versions = InventoryVersions()
+        self.use_redis = use_redis
+        
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self.redis_hits = 0
+    
+    async def get(self, key: str, city: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Look up a cached response
+        
+        Args:
+            key: Key from search_cache_key()
+            city: The search's city filter, if any
+        
+        Returns:
+            The cached response body (None on a miss) and the stamp to
+            store a freshly computed response under
+        """
+        if not self.enabled:
+            return None, 0
+        
+        client = self._client()
+        if client is not None and self.versions.due():
+            try:
+                self.versions.apply(await client.hgetall(f"{settings.SEARCH_CACHE_PREFIX}:versions"))
+                self.versions.mark_synced()
+            except Exception as e:
+                self._drop_client(e)
+                client = None
+        stamp = self.versions.stamp(city)
+        
+        entry = self.local.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1], stamp
+        
+        if client is not None:
+            try:
+                raw = await client.get(f"{settings.SEARCH_CACHE_PREFIX}:{key}")
+            except Exception as e:
+                self._drop_client(e)
+                raw = None
+            if raw is not None:
+                cached_stamp, body = json.loads(raw)
+                if cached_stamp == stamp:
+                    self.redis_hits += 1
+                    self.local.set(key, (stamp, body))
+                    return body, stamp
+        return None, stamp
+    
+    async def set(self, key: str, stamp: int, response: BaseModel) -> None:
+        """
+        Cache a response computed after get() returned stamp
+        
+        Args:
+            key: Key from search_cache_key()
+            stamp: Stamp returned by the get() that missed
+            response: Response model
+        """
+        if not self.enabled:
+            return
+        
+        body = response.model_dump(mode='json')
+        self.local.set(key, (stamp, body))
+        
+        client = self._client()
+        if client is not None:
+            try:
+                await client.set(
+                    f"{settings.SEARCH_CACHE_PREFIX}:{key}", json.dumps([stamp, body]), ex=self.ttl_seconds
+                )
+            except Exception as e:
+                self._drop_client(e)
+    
+    async def invalidate(self, city: Optional[str]) -> None:
+        """
+        Invalidate cached searches that can include a city's inventory
+        
+        Args:
+            city: City written to; None invalidates every search
+        """
+        if not self.enabled:
+            return
+        
+        client = self._client()
+        if client is not None:
+            try:
+                version = await client.eval(
+                    BUMP_SCRIPT, 2,
+                    f"{settings.SEARCH_CACHE_PREFIX}:clock",
+                    f"{settings.SEARCH_CACHE_PREFIX}:versions",
+                    city.strip().lower() if city else ALL_CITIES,
+                    _now_ms()
+                )
+                self.versions.apply({city.strip().lower() if city else ALL_CITIES: version})
+                return
+            except Exception as e:
+                self._drop_client(e)
+        self.versions.bump_local(city)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Local tier counters plus Redis tier hits"""
+        return {**self.local.stats(), 'redis_hits': self.redis_hits, 'redis_connected': self._redis is not None}
+    
+    def _client(self) -> Any:
+        if not self.use_redis or self._redis is not None or time.monotonic() < self._redis_retry_at:
+            return self._redis
+        try:
+            from redis import asyncio as aioredis
+            self._redis = aioredis.from_url(
+                settings.REDIS_URL,
+                password=settings.REDIS_PASSWORD,
+                max_connections=settings.REDIS_POOL_SIZE,
+                decode_responses=True
+            )
+        except Exception as e:
+            self._drop_client(e)
+        return self._redis
+    
+    def _drop_client(self, error: Exception) -> None:
+        """Fall back to the local tier for a while after a Redis failure"""
+        logger.warning(f"Search cache Redis tier unavailable: {error}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + settings.SEARCH_CACHE_REDIS_RETRY_SECONDS
+
+
+# Shared instance
+search_cache = SearchResultCache()
@@ -0,0 +1,201 @@
+"""
+Result totals for paged searches
+
+A separate COUNT over the full filtered query roughly doubles the work of
+a search. Totals here come, cheapest first, from a short-lived cache of
+exact counts keyed by the normalised filters, from the planner's row
+estimate for broad queries, or from count(*) OVER () folded into the
+page query itself. A standalone COUNT runs only when none of those apply.
+"""
+from typing import Any, List, Mapping, Optional, Sequence, Union
+from dataclasses import dataclass
+import json
+import logging
+
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Request fields that page or order results without changing the total
+PAGING_FIELDS = {
+    'page', 'per_page', 'cursor', 'skip', 'limit', 'sort_by', 'sort_order', 'exact_total',
+    'include_units', 'include_reviews', 'include_market_data', 'include_facets'
+}
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN of a select, for the planner's row estimate"""
+    inherit_cache = False
+    
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(_Explain, 'postgresql')
+def _compile_explain(element: _Explain, compiler: Any, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def count_key(scope: str, filters: Union[BaseModel, Mapping[str, Any]]) -> str:
+    """
+    Cache key for a search's total
+    
+    Paging and ordering fields are dropped, unset filters ignored and
+    strings case-folded, so equivalent searches share one entry.
+    
+    Args:
+        scope: Endpoint the filters belong to
+        filters: Search request model or filter mapping
+    
+    Returns:
+        Cache key
+    """
+    if isinstance(filters, BaseModel):
+        filters = filters.model_dump(mode='json')
+    normalized = {}
+    for name, value in filters.items():
+        if name in PAGING_FIELDS or value is None or value == [] or value == '':
+            continue
+        if isinstance(value, str):
+            value = ' '.join(value.lower().split())
+        normalized[name] = value
+    return f"{scope}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+@dataclass
+class SearchCount:
+    """
+    Total for one search request
+    
+    Built by SearchCounter.begin(); pass the page query through fold()
+    and its rows through take(), then call SearchCounter.finish().
+    """
+    query: Any
+    key: str
+    total: Optional[int] = None
+    exact: bool = True
+    source: Optional[str] = None
+    folded: bool = False
+    
+    def fold(self, query: Any) -> Any:
+        """Add the window count column to the page query when it is needed"""
+        if not self.folded:
+            return query
+        return query.add_columns(func.count().over().label("total_count"))
+    
+    def take(self, rows: Sequence[Any]) -> List[Any]:
+        """Read the total from fetched page rows and drop its column"""
+        rows = list(rows)
+        if not self.folded:
+            return rows
+        if rows:
+            self.total = rows[0][-1]
+        return [tuple(row[:-1]) for row in rows]
+
+
+class SearchCounter:
+    """Chooses how each search's total is computed and caches exact totals"""
+    
+    def __init__(self,
+                 cache: Optional[LRUCache] = None,
+                 estimate_threshold: int = settings.COUNT_ESTIMATE_THRESHOLD):
+        self.cache = cache or LRUCache(max_size=settings.COUNT_CACHE_SIZE, default_ttl=settings.COUNT_CACHE_TTL_SECONDS)
+        self.estimate_threshold = estimate_threshold
+    
+    async def begin(self,
+                    db: AsyncSession,
+                    query: Any,
+                    key: str,
+                    exact_total: bool = False,
+                    cursor: Optional[str] = None) -> SearchCount:
+        """
+        Resolve the total up front where possible
+        
+        A cached exact total wins. Otherwise a broad query may settle for
+        the planner's estimate unless exact_total is set; anything else
+        is counted with a window over the first page, or with a separate
+        COUNT when paging by cursor.
+        
+        Args:
+            db: Database session
+            query: Filtered select, before ordering and paging
+            key: Cache key from count_key()
+            exact_total: Whether the caller needs an exact total
+            cursor: Cursor of the requested page, if any
+        
+        Returns:
+            Pending count
+        """
+        count = SearchCount(query=query, key=key)
+        cached = self.cache.get(key)
+        if cached is not None:
+            count.total, count.source = cached, 'cached'
+            return count
+        
+        if not exact_total:
+            estimate = await self.estimate(db, query)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                count.total, count.exact, count.source = estimate, False, 'estimate'
+                return count
+        
+        # count(*) OVER () only sees every match when no cursor bounds the scan
+        count.folded = not cursor
+        return count
+    
+    async def finish(self, db: AsyncSession, count: SearchCount) -> SearchCount:
+        """
+        Complete a count after the page query ran
+        
+        Args:
+            db: Database session
+            count: Count from begin()
+        
+        Returns:
+            The same count, with total set
+        """
+        if count.total is not None:
+            if count.folded:
+                count.source = 'window'
+                self.cache.set(count.key, count.total)
+            return count
+        
+        # Cursor page, or an offset past the last match
+        count.total = (await db.execute(select(func.count()).select_from(count.query.subquery()))).scalar() or 0
+        count.exact, count.source = True, 'count'
+        self.cache.set(count.key, count.total)
+        return count
+    
+    async def estimate(self, db: AsyncSession, query: Any) -> Optional[int]:
+        """
+        Planner's row estimate for a query, without running it
+        
+        Args:
+            db: Database session
+            query: Select to estimate
+        
+        Returns:
+            Estimated rows, or None where the database offers no estimate
+        """
+        if db.bind.dialect.name != 'postgresql':
+            return None
+        try:
+            # A failed statement aborts the transaction; the savepoint keeps the search's usable
+            async with db.begin_nested():
+                plan = (await db.execute(_Explain(query))).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            logger.warning(f"Row estimate failed: {e}")
+            return None
+
+
+# Shared instance
+search_counter = SearchCounter()
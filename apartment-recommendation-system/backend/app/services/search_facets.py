@@ -0,0 +1,171 @@
+"""
+Filter-sidebar facets for property search
+
+Every facet comes from one statement: a CTE of the matching properties
+and one of their matching units, with a UNION ALL of per-facet
+aggregates over them. PostgreSQL materialises a CTE referenced more than
+once, so the filters are evaluated a single time. Results are cached by
+normalised filters, which keeps popular combinations out of the database.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from decimal import Decimal
+import logging
+
+from sqlalchemy import select, func, literal, case, cast, and_, union_all, String, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.models.property import Property, UnitSearch
+from app.schemas.search import SearchFacets
+
+logger = logging.getLogger(__name__)
+
+# Fixed price bucket boundaries; the last bucket is open-ended
+PRICE_BUCKETS = [0, 1000, 1500, 2000, 2500, 3000, 4000, 5000]
+
+# Feature tags counted by the amenity facet, reported without the prefix
+AMENITY_TAG_PREFIX = 'amenity:'
+
+
+def _price_range(index: int) -> Dict[str, Any]:
+    low = PRICE_BUCKETS[index]
+    high = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+    label = f"${low:,} - ${high:,}" if high is not None else f"${low:,}+"
+    return {"min": low, "max": high, "label": label}
+
+
+class FacetService:
+    """Computes and caches SearchFacets for a filtered property query"""
+    
+    def __init__(self,
+                 cache: Optional[LRUCache] = None,
+                 top_values: int = settings.FACET_TOP_VALUES):
+        self.cache = cache or LRUCache(max_size=settings.FACET_CACHE_SIZE, default_ttl=settings.FACET_CACHE_TTL_SECONDS)
+        self.top_values = top_values
+    
+    async def facets(self,
+                     db: AsyncSession,
+                     query: Any,
+                     unit_conditions: Sequence[Any],
+                     key: str) -> SearchFacets:
+        """
+        Facets over a search's matching properties
+        
+        Args:
+            db: Database session
+            query: Filtered select of Property, before ordering and paging
+            unit_conditions: Filters on unit_search a property's units must
+                meet; price and bedroom facets count only those units
+            key: Cache key, e.g. from count_key()
+        
+        Returns:
+            Facet counts
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        rows = (await db.execute(self.statement(query, unit_conditions))).all()
+        facets = self._assemble(rows)
+        self.cache.set(key, facets)
+        return facets
+    
+    def statement(self, query: Any, unit_conditions: Sequence[Any]) -> Any:
+        """
+        The single facet statement
+        
+        Rows are (facet, value, properties, min_price, max_price); value
+        is text in every branch so the branches share one column type.
+        
+        Args:
+            query: Filtered select of Property
+            unit_conditions: Filters on unit_search a property's units must meet
+        
+        Returns:
+            Select
+        """
+        matched = query.with_only_columns(
+            Property.id, Property.city, Property.property_type, Property.feature_tags
+        ).order_by(None).cte("facet_properties")
+        
+        priced = (
+            select(matched.c.id, UnitSearch.bedrooms, UnitSearch.current_price)
+            .join(UnitSearch, and_(UnitSearch.property_id == matched.c.id, *unit_conditions))
+            .cte("facet_units")
+        )
+        bucket = case(
+            *[(priced.c.current_price < boundary, literal(str(i - 1))) for i, boundary in enumerate(PRICE_BUCKETS) if i],
+            else_=literal(str(len(PRICE_BUCKETS) - 1))
+        )
+        no_price = cast(literal(None), Numeric)
+        
+        # Postgres names an unaliased column after the alias, so render feature_tag(tag)
+        tag = func.unnest(matched.c.feature_tags).table_valued("tag").render_derived().alias("feature_tag")
+        amenity = func.substr(tag.c.tag, len(AMENITY_TAG_PREFIX) + 1)
+        
+        branches = [
+            select(literal("total"), cast(literal(None), String), func.count(), no_price, no_price)
+            .select_from(matched),
+            select(literal("city"), cast(matched.c.city, String), func.count(), no_price, no_price)
+            .group_by(matched.c.city),
+            select(literal("property_type"), cast(matched.c.property_type, String), func.count(), no_price, no_price)
+            .group_by(matched.c.property_type),
+            select(
+                literal("price"), cast(literal(None), String), func.count(priced.c.id.distinct()),
+                func.min(priced.c.current_price), func.max(priced.c.current_price)
+            ),
+            select(
+                literal("bedrooms"), cast(priced.c.bedrooms, String), func.count(priced.c.id.distinct()),
+                func.min(priced.c.current_price), func.max(priced.c.current_price)
+            ).group_by(priced.c.bedrooms),
+            select(literal("price_range"), bucket, func.count(priced.c.id.distinct()), no_price, no_price)
+            .group_by(bucket),
+            select(literal("amenity"), cast(amenity, String), func.count(), no_price, no_price)
+            .select_from(matched.join(tag, literal(True)))
+            .where(tag.c.tag.startswith(AMENITY_TAG_PREFIX))
+            .group_by(amenity)
+        ]
+        return union_all(*branches)
+    
+    def _assemble(self, rows: Sequence[Any]) -> SearchFacets:
+        grouped: Dict[str, List[Any]] = {}
+        for row in rows:
+            grouped.setdefault(row[0], []).append(row)
+        
+        def top(facet: str) -> List[Dict[str, Any]]:
+            entries = [
+                {"value": value, "count": count}
+                for _, value, count, _, _ in grouped.get(facet, []) if value is not None and count
+            ]
+            entries.sort(key=lambda entry: (-entry["count"], entry["value"]))
+            return entries[:self.top_values]
+        
+        bedroom_counts = sorted(
+            (
+                {"bedrooms": int(value), "count": count, "min_price": low, "max_price": high}
+                for _, value, count, low, high in grouped.get("bedrooms", []) if value is not None
+            ),
+            key=lambda entry: entry["bedrooms"]
+        )
+        buckets = {int(value): count for _, value, count, _, _ in grouped.get("price_range", [])}
+        price_ranges = [
+            {**_price_range(i), "count": buckets.get(i, 0)} for i in range(len(PRICE_BUCKETS))
+        ]
+        _, _, _, min_price, max_price = (grouped.get("price") or [(None, None, 0, None, None)])[0]
+        total = grouped["total"][0][2] if "total" in grouped else 0
+        
+        return SearchFacets(
+            cities=[{"city": entry["value"], "count": entry["count"]} for entry in top("city")],
+            property_types=[{"property_type": entry["value"], "count": entry["count"]} for entry in top("property_type")],
+            bedroom_counts=bedroom_counts,
+            price_ranges=price_ranges,
+            amenities=[{"amenity": entry["value"], "count": entry["count"]} for entry in top("amenity")],
+            min_price=Decimal(min_price) if min_price is not None else None,
+            max_price=Decimal(max_price) if max_price is not None else None,
+            total_count=total
+        )
+
+
+# Shared instance
+facet_service = FacetService()
@@ -0,0 +1,244 @@
+"""
+Search timing and slow-search log
+
+Each search request runs under a trace. Statement timings are collected
+from the engine's cursor events, so every query a search runs counts as
+database time without wrapping individual calls; building the response
+models is timed separately. Searches over SLOW_SEARCH_THRESHOLD_MS go to
+an in-process ring buffer with their parameters and SQL, and a sample of
+them is re-run under EXPLAIN (ANALYZE, BUFFERS) in the background to
+attach the plan. Each worker keeps its own log.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+from pydantic import BaseModel
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.schemas.search import SearchResponse
+from app.services.search_cache import canonical_params
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["SearchTrace"]] = ContextVar("search_trace", default=None)
+
+
+def _milliseconds(seconds: float) -> int:
+    return int(round(seconds * 1000))
+
+
+def _loggable(parameters: Any) -> Any:
+    """Driver parameters as JSON-compatible values"""
+    if isinstance(parameters, dict):
+        return {str(name): _loggable(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_loggable(value) for value in parameters]
+    if parameters is None or isinstance(parameters, (bool, int, float, str)):
+        return parameters
+    return str(parameters)
+
+
+class SearchTrace:
+    """Timings of one search request"""
+    
+    def __init__(self, endpoint: str, params: BaseModel):
+        self.search_id = uuid.uuid4().hex
+        self.endpoint = endpoint
+        self.params = params
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.statements: List[Dict[str, Any]] = []
+        
+        self._started = time.perf_counter()
+        self._slowest: Optional[Dict[str, Any]] = None
+    
+    @property
+    def elapsed_ms(self) -> int:
+        return _milliseconds(time.perf_counter() - self._started)
+    
+    @contextmanager
+    def serializing(self) -> Iterator[None]:
+        """Time building the response models"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.serialization_seconds += time.perf_counter() - started
+    
+    def record(self, statement: str, parameters: Any, seconds: float) -> None:
+        """Add a statement the search ran"""
+        self.db_seconds += seconds
+        entry = {'sql': statement, 'parameters': parameters, 'duration_ms': _milliseconds(seconds)}
+        self.statements.append(entry)
+        if self._slowest is None or seconds > self._slowest['seconds']:
+            self._slowest = {'sql': statement, 'parameters': parameters, 'seconds': seconds}
+    
+    @property
+    def slowest(self) -> Optional[Dict[str, Any]]:
+        """The statement that took longest, with its driver parameters"""
+        return self._slowest
+
+
+class SearchProfiler:
+    """Times search requests and keeps the slow ones"""
+    
+    def __init__(self,
+                 threshold_ms: int = settings.SLOW_SEARCH_THRESHOLD_MS,
+                 log_size: int = settings.SLOW_SEARCH_LOG_SIZE,
+                 sample_rate: float = settings.SLOW_SEARCH_EXPLAIN_SAMPLE_RATE):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.slow_searches: deque = deque(maxlen=log_size)
+        
+        self._engine: Any = None
+        self._explaining: Set[asyncio.Task] = set()
+    
+    def install(self, engine: Any) -> None:
+        """
+        Collect statement timings from an engine's cursor events
+        
+        Args:
+            engine: Async engine the searches run on
+        """
+        if self._engine is not None:
+            return
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+    
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _current_trace.get() is not None:
+            conn.info.setdefault('search_trace_started', []).append(time.perf_counter())
+    
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        trace = _current_trace.get()
+        started = conn.info.get('search_trace_started')
+        if trace is None or not started:
+            return
+        trace.record(statement, parameters, time.perf_counter() - started.pop())
+    
+    def start(self, endpoint: str, params: BaseModel) -> SearchTrace:
+        """
+        Begin timing a search request
+        
+        Args:
+            endpoint: Search endpoint name
+            params: Search request
+        
+        Returns:
+            Trace to pass to finish()
+        """
+        trace = SearchTrace(endpoint, params)
+        _current_trace.set(trace)
+        return trace
+    
+    def finish(self,
+               trace: SearchTrace,
+               response: Union[SearchResponse, Dict[str, Any]]) -> Union[SearchResponse, Dict[str, Any]]:
+        """
+        Stamp a search response with its id and timings
+        
+        Cached responses are dicts and are copied rather than changed.
+        Slow searches are added to the log.
+        
+        Args:
+            trace: Trace from start()
+            response: Response about to be returned
+        
+        Returns:
+            The stamped response
+        """
+        _current_trace.set(None)
+        timings = {
+            'search_id': trace.search_id,
+            'execution_time_ms': trace.elapsed_ms,
+            'db_time_ms': _milliseconds(trace.db_seconds),
+            'serialization_time_ms': _milliseconds(trace.serialization_seconds)
+        }
+        if isinstance(response, dict):
+            response = {**response, **timings}
+        else:
+            for name, value in timings.items():
+                setattr(response, name, value)
+        
+        if timings['execution_time_ms'] >= self.threshold_ms:
+            self._log_slow(trace, timings)
+        return response
+    
+    def _log_slow(self, trace: SearchTrace, timings: Dict[str, int]) -> None:
+        entry = {
+            **timings,
+            'endpoint': trace.endpoint,
+            'logged_at': datetime.now(timezone.utc).isoformat(),
+            'params': canonical_params(trace.params),
+            'statements': [
+                {**statement, 'parameters': _loggable(statement['parameters'])} for statement in trace.statements
+            ],
+            'plan': None,
+            'plan_status': 'not_sampled'
+        }
+        self.slow_searches.append(entry)
+        logger.warning(
+            f"Slow {trace.endpoint} search {trace.search_id}: {timings['execution_time_ms']}ms "
+            f"({timings['db_time_ms']}ms in {len(trace.statements)} statements) params={entry['params']}"
+        )
+        
+        slowest = trace.slowest
+        if slowest is None or random.random() >= self.sample_rate:
+            return
+        if self._engine is None or self._engine.dialect.name != 'postgresql':
+            entry['plan_status'] = 'unsupported'
+            return
+        if len(self._explaining) >= settings.SLOW_SEARCH_EXPLAIN_CONCURRENCY:
+            entry['plan_status'] = 'skipped_busy'
+            return
+        
+        entry['plan_status'] = 'pending'
+        task = asyncio.create_task(self._explain(entry, slowest['sql'], slowest['parameters']))
+        self._explaining.add(task)
+        task.add_done_callback(self._explaining.discard)
+    
+    async def _explain(self, entry: Dict[str, Any], statement: str, parameters: Any) -> None:
+        """Re-run a search's slowest statement under EXPLAIN and attach the plan"""
+        try:
+            async with self._engine.connect() as conn:
+                await conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {int(settings.SLOW_SEARCH_EXPLAIN_TIMEOUT_MS)}"
+                )
+                result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                entry['plan'] = '\n'.join(row[0] for row in result.all())
+                await conn.rollback()
+            entry['plan_status'] = 'captured'
+        except Exception as e:
+            entry['plan_status'] = 'failed'
+            entry['plan'] = str(e)
+            logger.error(f"Failed to capture plan for search {entry['search_id']}: {e}")
+    
+    def recent(self, limit: int, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Slow searches, newest first
+        
+        Args:
+            limit: Most entries to return
+            endpoint: Only searches on this endpoint
+        
+        Returns:
+            Log entries
+        """
+        entries = [entry for entry in reversed(self.slow_searches) if endpoint is None or entry['endpoint'] == endpoint]
+        return entries[:limit]
+
+
+# Shared instance; installed on the engine at startup
+search_profiler = SearchProfiler()
@@ -0,0 +1,136 @@
+"""
+Autocomplete suggestions for cities and property names
+
+Both indexes live in memory, so a suggestion lookup never touches the
+database. They are built at startup, updated through the inventory hooks
+for writes in this worker, and synced from the property change feed for
+writes made elsewhere.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.autocomplete import AutocompleteIndex
+from app.core.config import settings
+from app.models.property import Property
+from app.services.property_feed import PropertyChangeFeed
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionService:
+    """
+    City suggestions weighted by active-property count, and property
+    name suggestions
+    """
+    
+    def __init__(self,
+                 top_n: int = settings.AUTOCOMPLETE_TOP_N,
+                 sync_seconds: float = settings.AUTOCOMPLETE_SYNC_SECONDS):
+        self.cities = AutocompleteIndex(top_n)
+        self.properties = AutocompleteIndex(top_n)
+        self.feed = PropertyChangeFeed(sync_seconds)
+        self.ready = False
+        
+        self._indexed: Dict[Any, Tuple[str, str]] = {}
+        self._city_counts: Counter = Counter()
+    
+    async def build(self, db: AsyncSession) -> int:
+        """
+        Load every active property
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of indexed properties
+        """
+        rows = (await db.execute(
+            select(Property.id, Property.name, Property.city).where(Property.is_active == True)
+        )).all()
+        await self.feed.start(db)
+        
+        self._indexed = {row.id: (row.name, row.city) for row in rows}
+        self._city_counts = Counter(city for _, city in self._indexed.values())
+        
+        self.cities.load((city, city, count, None) for city, count in self._city_counts.items())
+        self.properties.load((property_id, name, 0.0, city) for property_id, (name, city) in self._indexed.items())
+        self.ready = True
+        
+        logger.info(f"Suggestion index built with {len(self._city_counts)} cities and {len(self._indexed)} properties")
+        return len(self._indexed)
+    
+    async def sync(self, db: AsyncSession, force: bool = False) -> int:
+        """
+        Apply property changes committed by other workers
+        
+        Args:
+            db: Database session
+            force: Sync regardless of when the last sync ran
+        
+        Returns:
+            Number of changed properties applied
+        """
+        if not self.ready:
+            return 0
+        
+        rows = await self.feed.poll(db, [Property.id, Property.name, Property.city, Property.is_active], force)
+        for row in rows:
+            self.apply(row.id, row.name, row.city, row.is_active)
+        return len(rows)
+    
+    def apply(self, property_id: Any, name: Optional[str], city: Optional[str], is_active: bool = True) -> None:
+        """
+        Insert, rename, move or drop one property
+        
+        Args:
+            property_id: Property ID
+            name: Property name
+            city: City
+            is_active: Whether the property should be suggested
+        """
+        if not self.ready:
+            return
+        
+        previous = self._indexed.get(property_id)
+        current = (name, city) if is_active else None
+        if previous == current:
+            return
+        
+        if previous is not None:
+            del self._indexed[property_id]
+            self._count_city(previous[1], -1)
+        if current is None:
+            self.properties.remove(property_id)
+            return
+        
+        self._indexed[property_id] = current
+        self._count_city(city, 1)
+        self.properties.upsert(property_id, name, 0.0, city)
+    
+    def apply_property(self, property: Property) -> None:
+        """Apply a property object's current name, city and status"""
+        self.apply(property.id, property.name, property.city, property.is_active)
+    
+    def _count_city(self, city: str, delta: int) -> None:
+        self._city_counts[city] += delta
+        if self._city_counts[city] > 0:
+            self.cities.upsert(city, city, self._city_counts[city])
+        else:
+            del self._city_counts[city]
+            self.cities.remove(city)
+    
+    def suggest_cities(self, query: str, limit: int) -> List[Tuple[str, int]]:
+        """(city, active property count) pairs for a typed query"""
+        return [(entry.display, int(entry.weight)) for entry in self.cities.suggest(query, limit)]
+    
+    def suggest_properties(self, query: str, limit: int) -> List[Tuple[Any, str, str]]:
+        """(property id, name, city) triples for a typed query"""
+        return [(entry.entry_id, entry.display, entry.payload) for entry in self.properties.suggest(query, limit)]
+
+
+# Shared instance; built at startup
+suggestion_service = SuggestionService()
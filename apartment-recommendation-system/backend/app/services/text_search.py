@@ -0,0 +1,181 @@
+"""
+Full-text property search
+
+With PostgreSQL, properties carry a generated, weighted tsvector column
+(name > address and city > description) behind a GIN index, matched
+with to_tsquery and ranked with ts_rank. Other databases fall back to an
+in-process BM25 index, built on first use and kept current from property
+writes in this worker and the property change feed for other workers.
+"""
+from typing import Any, Optional, Tuple
+import logging
+
+from sqlalchemy import case, false, func, literal, literal_column, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.text import BM25Index, tokenize
+from app.models.property import Property
+from app.services.property_feed import PropertyChangeFeed
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEARCH_CONFIG = 'english'
+
+# Property fields feeding the search document, and their BM25 weights;
+# mirrors the tsvector weights A, B and C
+TEXT_SEARCH_WEIGHTS = {
+    'name': 3.0,
+    'address': 2.0,
+    'city': 2.0,
+    'description': 1.0
+}
+
+TEXT_SEARCH_SCHEMA = [
+    f"""
+    ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(address, '') || ' ' || coalesce(city, '')), 'B')
+        || setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_properties_search_vector ON properties USING gin (search_vector)"
+]
+
+
+def tsquery_text(query: str) -> Optional[str]:
+    """
+    to_tsquery input ANDing the words of a free-text query
+    
+    The last word matches as a prefix so results follow typing. Only word
+    characters survive tokenising, so no tsquery syntax can be injected.
+    
+    Args:
+        query: Free text
+    
+    Returns:
+        tsquery source, or None when the query has no words
+    """
+    terms = tokenize(query)
+    if not terms:
+        return None
+    return ' & '.join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+class TextSearch:
+    """Builds full-text match and rank expressions for the active backend"""
+    
+    def __init__(self, sync_seconds: float = settings.TEXT_SEARCH_SYNC_SECONDS):
+        self.postgres_enabled = False
+        self.index = BM25Index(TEXT_SEARCH_WEIGHTS)
+        self.feed = PropertyChangeFeed(sync_seconds)
+        self.ready = False
+        self._vector = literal_column("properties.search_vector")
+    
+    async def setup(self, engine: Any) -> None:
+        """
+        Add the tsvector column and GIN index on PostgreSQL
+        
+        Args:
+            engine: Async engine
+        """
+        async with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                for statement in TEXT_SEARCH_SCHEMA:
+                    await conn.execute(text(statement))
+                self.postgres_enabled = True
+        
+        logger.info(f"Text search backend: {'tsvector' if self.postgres_enabled else 'bm25'}")
+    
+    async def build(self, db: AsyncSession) -> int:
+        """
+        Load active properties into the BM25 index; a no-op on PostgreSQL
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of indexed properties
+        """
+        if self.postgres_enabled:
+            return 0
+        
+        rows = (await db.execute(
+            select(Property.id, *[getattr(Property, field) for field in TEXT_SEARCH_WEIGHTS])
+            .where(Property.is_active == True)
+        )).all()
+        await self.feed.start(db)
+        
+        self.index = BM25Index(TEXT_SEARCH_WEIGHTS)
+        for row in rows:
+            self.index.add(row.id, row._mapping)
+        self.ready = True
+        
+        logger.info(f"Text index built with {len(self.index)} properties")
+        return len(self.index)
+    
+    async def refresh(self, db: AsyncSession) -> int:
+        """
+        Make the BM25 index current before a query: build it on first use,
+        then apply property changes committed by other workers
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of properties loaded or applied
+        """
+        if self.postgres_enabled:
+            return 0
+        if not self.ready:
+            return await self.build(db)
+        
+        rows = await self.feed.poll(
+            db, [Property.id, Property.is_active, *[getattr(Property, field) for field in TEXT_SEARCH_WEIGHTS]]
+        )
+        for row in rows:
+            self._apply(row.id, row.is_active, row._mapping)
+        return len(rows)
+    
+    def apply_property(self, property: Property) -> None:
+        """Reindex or drop one property in the BM25 index"""
+        if self.postgres_enabled or not self.ready:
+            return  # The generated column follows the row; an unbuilt index loads it on first use
+        
+        self._apply(property.id, property.is_active, {field: getattr(property, field) for field in TEXT_SEARCH_WEIGHTS})
+    
+    def _apply(self, property_id: Any, is_active: bool, fields: Any) -> None:
+        if is_active:
+            self.index.add(property_id, {field: fields[field] for field in TEXT_SEARCH_WEIGHTS})
+        else:
+            self.index.remove(property_id)
+    
+    def match(self, query: str) -> Tuple[Any, Any]:
+        """
+        WHERE clause and rank expression for a free-text query
+        
+        Call refresh() first so the BM25 fallback is built and current.
+        
+        Args:
+            query: Free text
+        
+        Returns:
+            (condition, rank); order by rank descending for best first
+        """
+        if self.postgres_enabled:
+            source = tsquery_text(query)
+            if source is None:
+                return false(), literal(0.0)
+            tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, source)
+            return self._vector.op('@@')(tsquery), func.ts_rank(self._vector, tsquery)
+        
+        hits = self.index.search(query)
+        if not hits:
+            return false(), literal(0.0)
+        scores = dict(hits)
+        return Property.id.in_(list(scores)), case(scores, value=Property.id, else_=0.0)
+
+
+# Shared instance; setup() runs at startup, refresh() before each query
+text_search = TextSearch()
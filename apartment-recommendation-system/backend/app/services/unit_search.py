@@ -0,0 +1,271 @@
+"""
+Maintenance of the denormalized unit_search table
+
+unit_search holds one row per unit of an active property with the unit,
+property and market velocity columns searches filter and sort on, so
+search reads one table through its composite indexes instead of joining
+three. Rows are replaced from the source tables on every inventory write
+that touches a mirrored column; rebuild() regenerates the whole table.
+Each replacement also recomputes the aggregates of available units kept
+on properties (min_price, max_days_on_market, ...), which property search
+sorts on without joining units.
+"""
+from typing import Any, Iterable
+import logging
+
+from sqlalchemy import and_, delete, func, insert, or_, select, text, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.market import MarketVelocity
+from app.models.property import Property, Unit, UnitSearch
+
+logger = logging.getLogger(__name__)
+
+# Unit fields mirrored into unit_search; concessions feed has_concessions
+UNIT_SEARCH_UNIT_FIELDS = {
+    'property_id',
+    'is_available',
+    'bedrooms',
+    'bathrooms',
+    'square_feet',
+    'current_price',
+    'available_date',
+    'concessions'
+}
+
+# Property fields mirrored into unit_search; is_active adds or drops its units
+UNIT_SEARCH_PROPERTY_FIELDS = {
+    'city',
+    'state',
+    'zip_code',
+    'property_type',
+    'latitude',
+    'longitude',
+    'rating',
+    'is_active'
+}
+
+# unit_search columns in the order _source() selects them
+UNIT_SEARCH_COLUMNS = [
+    UnitSearch.unit_id,
+    UnitSearch.property_id,
+    UnitSearch.is_available,
+    UnitSearch.bedrooms,
+    UnitSearch.bathrooms,
+    UnitSearch.square_feet,
+    UnitSearch.current_price,
+    UnitSearch.available_date,
+    UnitSearch.has_concessions,
+    UnitSearch.listed_at,
+    UnitSearch.city,
+    UnitSearch.state,
+    UnitSearch.zip_code,
+    UnitSearch.property_type,
+    UnitSearch.latitude,
+    UnitSearch.longitude,
+    UnitSearch.geohash,
+    UnitSearch.rating,
+    UnitSearch.market_status,
+    UnitSearch.days_on_market,
+    UnitSearch.price_drop_percentage
+]
+
+
+# Property columns aggregated from the property's available unit_search rows
+PROPERTY_AGGREGATES = {
+    'min_price': func.min(UnitSearch.current_price),
+    'max_price': func.max(UnitSearch.current_price),
+    'max_bedrooms': func.max(UnitSearch.bedrooms),
+    'max_square_feet': func.max(UnitSearch.square_feet),
+    'max_days_on_market': func.max(UnitSearch.days_on_market)
+}
+
+# Columns added after tables were first created; create_all covers new databases
+UNIT_SEARCH_SCHEMA = [
+    "ALTER TABLE unit_search ADD COLUMN IF NOT EXISTS latitude numeric(10, 8)",
+    "ALTER TABLE unit_search ADD COLUMN IF NOT EXISTS longitude numeric(11, 8)",
+    "ALTER TABLE unit_search ADD COLUMN IF NOT EXISTS geohash varchar(12)",
+    "ALTER TABLE unit_search ADD COLUMN IF NOT EXISTS rating numeric(2, 1)",
+    "CREATE INDEX IF NOT EXISTS ix_unit_search_geohash ON unit_search (geohash)",
+    "CREATE INDEX IF NOT EXISTS ix_unit_search_rating ON unit_search (is_available, coalesce(rating, -1), unit_id)",
+    "CREATE INDEX IF NOT EXISTS ix_unit_search_days_on_market "
+    "ON unit_search (is_available, coalesce(days_on_market, -1), unit_id)",
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS min_price numeric(10, 2)",
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS max_price numeric(10, 2)",
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS max_bedrooms integer",
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS max_square_feet integer",
+    "ALTER TABLE properties ADD COLUMN IF NOT EXISTS max_days_on_market integer",
+    "CREATE INDEX IF NOT EXISTS ix_properties_active_min_price "
+    "ON properties (is_active, coalesce(min_price, 99999999.99), id)",
+    "CREATE INDEX IF NOT EXISTS ix_properties_active_max_price ON properties (is_active, coalesce(max_price, -1), id)",
+    "CREATE INDEX IF NOT EXISTS ix_properties_active_bedrooms ON properties (is_active, coalesce(max_bedrooms, -1), id)",
+    "CREATE INDEX IF NOT EXISTS ix_properties_active_square_feet "
+    "ON properties (is_active, coalesce(max_square_feet, -1), id)",
+    "CREATE INDEX IF NOT EXISTS ix_properties_active_days_on_market "
+    "ON properties (is_active, coalesce(max_days_on_market, -1), id)"
+]
+
+
+def _source(unit_filter: Any) -> Any:
+    """unit_search rows for the units matching unit_filter, from the source tables"""
+    # A unit's most recently updated velocity row, if it has any
+    latest_velocity = (
+        select(MarketVelocity.id)
+        .where(MarketVelocity.unit_id == Unit.id)
+        .order_by(MarketVelocity.updated_at.desc(), MarketVelocity.id.desc())
+        .limit(1)
+        .correlate(Unit)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Unit.id,
+            Unit.property_id,
+            Unit.is_available,
+            Unit.bedrooms,
+            Unit.bathrooms,
+            Unit.square_feet,
+            Unit.current_price,
+            Unit.available_date,
+            Unit.has_concessions,
+            Unit.created_at,
+            Property.city,
+            Property.state,
+            Property.zip_code,
+            Property.property_type,
+            Property.latitude,
+            Property.longitude,
+            Property.geohash,
+            Property.rating,
+            MarketVelocity.market_status,
+            MarketVelocity.days_on_market,
+            MarketVelocity.price_drop_percentage
+        )
+        .join(Property, Unit.property_id == Property.id)
+        .outerjoin(MarketVelocity, MarketVelocity.id == latest_velocity)
+        .where(Property.is_active == True, unit_filter)
+    )
+
+
+class UnitSearchIndex:
+    """Keeps unit_search rows in step with units, properties and market velocity"""
+    
+    async def setup(self, engine: Any) -> None:
+        """
+        Add columns where missing and regenerate unit_search when it is
+        empty or predates them, e.g. on its first deploy
+        
+        Args:
+            engine: Async engine
+        """
+        async with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                for statement in UNIT_SEARCH_SCHEMA:
+                    await conn.execute(text(statement))
+        
+        # Rows written before the geo columns, or properties before their aggregates
+        stale = (
+            select(UnitSearch.unit_id)
+            .join(Property, Property.id == UnitSearch.property_id)
+            .where(or_(
+                and_(UnitSearch.geohash.is_(None), Property.geohash.isnot(None)),
+                and_(UnitSearch.is_available == True, Property.min_price.is_(None))
+            ))
+            .limit(1)
+        )
+        async with engine.connect() as conn:
+            filled = (await conn.execute(select(UnitSearch.unit_id).limit(1))).first() is not None
+            if filled and (await conn.execute(stale)).first() is None:
+                return
+            written = await self._replace(conn, true(), true(), true())
+        logger.info(f"Filled unit_search with {written} units")
+    
+    async def refresh_units(self, db: AsyncSession, unit_ids: Iterable[Any]) -> int:
+        """
+        Replace the rows of specific units
+        
+        Args:
+            db: Database session
+            unit_ids: Units that were written
+        
+        Returns:
+            Number of rows written
+        """
+        unit_ids = list(unit_ids)
+        if not unit_ids:
+            return 0
+        return await self._replace(db, UnitSearch.unit_id.in_(unit_ids), Unit.id.in_(unit_ids))
+    
+    async def refresh_properties(self, db: AsyncSession, property_ids: Iterable[Any]) -> int:
+        """
+        Replace the rows of every unit of specific properties
+        
+        Args:
+            db: Database session
+            property_ids: Properties that were written
+        
+        Returns:
+            Number of rows written
+        """
+        property_ids = list(property_ids)
+        if not property_ids:
+            return 0
+        return await self._replace(db, UnitSearch.property_id.in_(property_ids), Unit.property_id.in_(property_ids))
+    
+    async def rebuild(self, db: AsyncSession) -> int:
+        """
+        Regenerate the whole table in one transaction
+        
+        Searches keep reading the previous rows until it commits. Picks up
+        writes that bypassed the application, such as bulk imports.
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of rows written
+        """
+        written = await self._replace(db, true(), true(), true())
+        logger.info(f"Rebuilt unit_search with {written} units")
+        return written
+    
+    async def _replace(self, db: Any, row_filter: Any, unit_filter: Any, property_filter: Any = None) -> int:
+        """
+        Delete the rows matching row_filter, insert the units matching
+        unit_filter and recompute the aggregates of the properties touched
+        
+        Args:
+            db: Database session or connection; committed
+            row_filter: Condition on UnitSearch selecting the rows to replace
+            unit_filter: Condition on Unit selecting the rows to insert
+            property_filter: Properties whose aggregates to recompute;
+                by default those of the rows deleted and inserted
+        
+        Returns:
+            Number of rows written
+        """
+        if property_filter is None:
+            property_ids = set((await db.execute(select(UnitSearch.property_id).where(row_filter))).scalars().all())
+        await db.execute(delete(UnitSearch).where(row_filter))
+        result = await db.execute(insert(UnitSearch).from_select(UNIT_SEARCH_COLUMNS, _source(unit_filter)))
+        if property_filter is None:
+            property_ids.update((await db.execute(select(Unit.property_id).where(unit_filter))).scalars().all())
+            property_filter = Property.id.in_(property_ids)
+        
+        await self._aggregate(db, property_filter)
+        await db.commit()
+        return result.rowcount
+    
+    async def _aggregate(self, db: Any, property_filter: Any) -> None:
+        """Recompute the unit aggregates of the properties matching property_filter"""
+        values = {
+            name: select(aggregate).where(
+                UnitSearch.property_id == Property.id, UnitSearch.is_available == True
+            ).scalar_subquery()
+            for name, aggregate in PROPERTY_AGGREGATES.items()
+        }
+        # Derived columns; not an edit of the property, so updated_at stays
+        await db.execute(update(Property).where(property_filter).values(**values, updated_at=Property.updated_at))
+
+# Shared instance
+unit_search_index = UnitSearchIndex()
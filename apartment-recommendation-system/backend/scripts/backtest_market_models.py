@@ -0,0 +1,50 @@
+"""
+Backtest the market prediction models against recorded price history
+
+Usage:
+    python scripts/backtest_market_models.py [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--step-days N] [--trace-memory]
+"""
+import argparse
+import asyncio
+import json
+import logging
+from datetime import date
+
+from app.ai.backtest import MarketBacktest, HISTORY_CHUNK_SIZE
+from app.db.base import AsyncSessionLocal, close_db
+
+logger = logging.getLogger(__name__)
+
+
+async def main(start: date = None,
+               end: date = None,
+               step_days: int = 7,
+               chunk_size: int = HISTORY_CHUNK_SIZE,
+               trace_memory: bool = False) -> None:
+    backtest = MarketBacktest(step_days=step_days, chunk_size=chunk_size)
+    
+    async with AsyncSessionLocal() as db:
+        report = await backtest.run(db, start=start, end=end, trace_memory=trace_memory)
+    
+    print(json.dumps(report.to_dict(), indent=2))
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="Backtest market prediction models")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="First as-of date")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last history date to replay")
+    parser.add_argument("--step-days", type=int, default=7, help="Days between as-of dates")
+    parser.add_argument("--chunk-size", type=int, default=HISTORY_CHUNK_SIZE, help="History rows per fetch")
+    parser.add_argument("--trace-memory", action="store_true", help="Record peak Python allocations")
+    args = parser.parse_args()
+    
+    asyncio.run(main(
+        start=args.start,
+        end=args.end,
+        step_days=args.step_days,
+        chunk_size=args.chunk_size,
+        trace_memory=args.trace_memory
+    ))
@@ -0,0 +1,97 @@
+"""
+Build the commute travel-time grid from local network files
+
+Usage:
+    python scripts/build_commute_grid.py --osm city.osm.bz2 [--gtfs feed.zip] [--modes driving,walking]
+        [--output PATH] [--precision N] [--max-minutes N] [--batch-size N] [--transit-window 07:00-10:00]
+
+Streets come from an OpenStreetMap XML extract; convert .pbf extracts
+first, e.g. `osmium cat city.osm.pbf -o city.osm.bz2`. Transit needs a
+GTFS feed and walks to and between stops over the extract when given.
+Each build writes versioned files and switches manifest.json last; the
+previous build is kept for workers that have not reloaded yet. Running
+API workers pick up the new grid on their next commute search.
+"""
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+from typing import Tuple
+
+from app.core.commute import COMMUTE_MODES
+from app.core.config import settings
+from app.db.base import AsyncSessionLocal, close_db
+from app.services.commute_builder import (
+    build_commute_grid,
+    property_points,
+    read_gtfs,
+    read_osm,
+    road_network,
+    transit_network
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _window(text: str) -> Tuple[int, int]:
+    """Seconds after midnight of an HH:MM-HH:MM window"""
+    bounds = []
+    for clock in text.split('-'):
+        hours, minutes = clock.split(':')
+        bounds.append(int(hours) * 3600 + int(minutes) * 60)
+    return bounds[0], bounds[1]
+
+
+async def main(args: argparse.Namespace) -> None:
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(COMMUTE_MODES)
+    if unknown:
+        raise SystemExit(f"Unknown modes: {', '.join(sorted(unknown))}")
+    
+    extract = read_osm(args.osm) if args.osm else None
+    feed = read_gtfs(args.gtfs, _window(args.transit_window)) if args.gtfs else None
+    
+    networks = {}
+    for mode in modes:
+        if mode == 'transit':
+            if feed is None:
+                raise SystemExit("Transit needs --gtfs")
+            networks[mode] = transit_network(feed, extract)
+            networks[mode].sources = [path for path in (args.gtfs, args.osm) if path]
+        else:
+            if extract is None:
+                raise SystemExit(f"{mode.capitalize()} needs --osm")
+            networks[mode] = road_network(extract, mode)
+            networks[mode].sources = [args.osm]
+    
+    async with AsyncSessionLocal() as db:
+        points = await property_points(db)
+    await close_db()
+    
+    manifest = build_commute_grid(
+        Path(args.output),
+        networks,
+        points,
+        precision=args.precision,
+        max_minutes=args.max_minutes,
+        batch_size=args.batch_size,
+        places=extract.places if extract else None
+    )
+    logger.info(f"Commute grid {manifest['version']} written to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="Build the commute travel-time grid")
+    parser.add_argument("--osm", help="OpenStreetMap XML extract (.osm, .osm.gz or .osm.bz2)")
+    parser.add_argument("--gtfs", help="GTFS feed zip, for transit")
+    parser.add_argument("--modes", default="driving,walking,bicycling", help="Comma-separated commute modes")
+    parser.add_argument("--output", default=str(settings.COMMUTE_GRID_PATH), help="Override COMMUTE_GRID_PATH")
+    parser.add_argument("--precision", type=int, default=settings.COMMUTE_GRID_PRECISION, help="Geohash precision of cells")
+    parser.add_argument("--max-minutes", type=int, default=settings.COMMUTE_MAX_MINUTES, help="Longest commute recorded")
+    parser.add_argument("--batch-size", type=int, default=16, help="Origins routed per Dijkstra pass")
+    parser.add_argument("--transit-window", default="07:00-10:00", help="Departure window for transit headways")
+    args = parser.parse_args()
+    
+    asyncio.run(main(args))
@@ -0,0 +1,43 @@
+"""
+Compile the search facet statement for PostgreSQL and check its shape
+
+Usage:
+    python scripts/check_search_sql.py
+
+The facet statement is built with SQLAlchemy constructs whose rendering
+differs by dialect, and its branches run as one UNION ALL, so one bad
+branch fails every include_facets search. This compiles it with the
+postgresql dialect without needing a database, and exits non-zero when
+the amenity branch's unnest lacks its derived column list.
+"""
+import logging
+import sys
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.property import Property, UnitSearch
+from app.services.search_facets import facet_service
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    statement = facet_service.statement(
+        select(Property).where(Property.is_active == True),
+        [UnitSearch.is_available == True]
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    
+    # unnest aliased without a column list names its column after the alias, not "tag"
+    if "AS feature_tag(tag)" not in sql:
+        logger.error(f"Facet statement does not alias unnest as feature_tag(tag):\n{sql}")
+        return 1
+    
+    logger.info("Facet statement compiles for PostgreSQL")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Re-derive feature tags and concession flags from the listing JSON
+
+Usage:
+    python scripts/rebuild_feature_tags.py
+
+Startup only fills rows that have none; run this after the extraction
+rules in app/core/features change, then rebuild_unit_search.py so its
+has_concessions column follows.
+"""
+import asyncio
+import logging
+
+from app.db.base import close_db, engine
+from app.services.feature_search import feature_search
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    await feature_search.rebuild(engine)
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
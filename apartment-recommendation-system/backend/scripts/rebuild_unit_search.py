@@ -0,0 +1,29 @@
+"""
+Regenerate the denormalized unit_search table from units, properties and market velocity
+
+Usage:
+    python scripts/rebuild_unit_search.py
+
+Inventory written through the API keeps unit_search current; run this
+after bulk imports or direct database edits, or to pick up market
+velocity recomputed outside the API.
+"""
+import asyncio
+import logging
+
+from app.db.base import AsyncSessionLocal, close_db
+from app.services.unit_search import unit_search_index
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        await unit_search_index.rebuild(db)
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+"""
+Recompute MarketTrend rows for every city and zip code
+
+Usage:
+    python scripts/refresh_market_trends.py [--period daily|weekly|monthly]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.ai.trend_analysis import refresh_market_trends, PERIOD_DAYS
+from app.db.base import AsyncSessionLocal, close_db
+
+logger = logging.getLogger(__name__)
+
+
+async def main(period_type: str = 'monthly') -> None:
+    async with AsyncSessionLocal() as db:
+        await refresh_market_trends(db, period_type=period_type)
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="Refresh market trend metrics")
+    parser.add_argument("--period", choices=sorted(PERIOD_DAYS), default="monthly", help="Trend period type")
+    args = parser.parse_args()
+    
+    asyncio.run(main(period_type=args.period))
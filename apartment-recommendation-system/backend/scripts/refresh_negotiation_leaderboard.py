@@ -0,0 +1,29 @@
+"""
+Rescore every available unit on the negotiation leaderboard (daily sweep)
+
+Usage:
+    python scripts/refresh_negotiation_leaderboard.py
+
+Nothing in the app schedules this; run it daily from cron, e.g.
+    15 3 * * * cd /app && python scripts/refresh_negotiation_leaderboard.py
+It also repairs leaderboard rows missed when an inventory hook failed.
+"""
+import asyncio
+import logging
+
+from app.db.base import AsyncSessionLocal, close_db
+from app.services.negotiation_leaderboard import negotiation_leaderboard
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        await negotiation_leaderboard.sweep(db)
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+"""
+Train MarketPredictor models from the database and save them under MODEL_PATH
+
+Usage:
+    python scripts/train_market_models.py [--version VERSION] [--model-path PATH]
+"""
+import argparse
+import asyncio
+import logging
+
+from app.ai.model_registry import save_market_models
+from app.ai.training import train_market_models
+from app.db.base import AsyncSessionLocal, close_db
+
+logger = logging.getLogger(__name__)
+
+
+async def main(version: str = None, model_path: str = None) -> None:
+    async with AsyncSessionLocal() as db:
+        bundle = await train_market_models(db, version=version)
+    
+    if bundle is None:
+        logger.warning("No models trained")
+    else:
+        save_market_models(bundle, model_path=model_path)
+    
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="Train market prediction models")
+    parser.add_argument("--version", help="Artifact version (defaults to a UTC timestamp)")
+    parser.add_argument("--model-path", help="Override MODEL_PATH")
+    args = parser.parse_args()
+    
+    asyncio.run(main(version=args.version, model_path=args.model_path))